@@ -0,0 +1,481 @@
+"""Archiving of data through a persistent queue.
+
+Tasks add the files to archive to an `ArchiveQueue` and carry on. The queue is
+drained by a separate process archiving the files to an `ArchiveBackend`.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .logs import logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Block size when reading files for checksums
+CHECKSUM_BUFSIZE = 1024 * 1024
+
+
+class ArchiveBackendError(Exception):
+    """Error raised when data could not be archived."""
+
+
+class ArchiveSourceChangedError(ArchiveBackendError):
+    """Error raised when a queued file changed before it was archived."""
+
+
+def file_checksum(path):
+    """Return the sha256 checksum of a file.
+
+    Args:
+        path (str): File.
+
+    Returns:
+        str: Hexadecimal digest.
+
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fhandler:
+        for block in iter(lambda: fhandler.read(CHECKSUM_BUFSIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArchiveBackend:
+    """Base archive backend."""
+
+    def put(self, local_path, remote):
+        """Archive a file.
+
+        Args:
+            local_path (str): Local file.
+            remote (str): Archive identifier.
+
+        Raises:
+            NotImplementedError: Should be implemented
+
+        """
+        raise NotImplementedError
+
+    def get(self, remote, local_path):
+        """Retrieve an archived file.
+
+        Args:
+            remote (str): Archive identifier.
+            local_path (str): Local file.
+
+        Raises:
+            NotImplementedError: Should be implemented
+
+        """
+        raise NotImplementedError
+
+    def checksum(self, remote):
+        """Return the sha256 checksum of an archived file.
+
+        Args:
+            remote (str): Archive identifier.
+
+        Returns:
+            str: Hexadecimal digest, or None if not supported by the archive.
+
+        """
+        return None
+
+
+class DirectoryArchive(ArchiveBackend):
+    """Archive in a local directory.
+
+    Stand-in for a real archive. An identifier like "ectmp:/2023/01/01/00/FILE"
+    is stored as "<directory>/ectmp/2023/01/01/00/FILE".
+    """
+
+    def __init__(self, directory):
+        """Construct the object.
+
+        Args:
+            directory (str): Archive directory.
+
+        """
+        self.directory = Path(directory)
+
+    def path(self, remote):
+        """Return the path of an archived file.
+
+        Args:
+            remote (str): Archive identifier.
+
+        Returns:
+            pathlib.Path: Path in the archive directory.
+
+        """
+        scheme, sep, path = remote.partition(":")
+        if not sep:
+            scheme, path = "", remote
+        return self.directory / scheme / path.lstrip("/")
+
+    def put(self, local_path, remote):
+        """Archive a file.
+
+        Args:
+            local_path (str): Local file.
+            remote (str): Archive identifier.
+
+        """
+        path = self.path(remote)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            shutil.copyfile(local_path, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def get(self, remote, local_path):
+        """Retrieve an archived file.
+
+        Args:
+            remote (str): Archive identifier.
+            local_path (str): Local file.
+
+        Raises:
+            ArchiveBackendError: If the file is not archived.
+
+        """
+        path = self.path(remote)
+        if not path.exists():
+            raise ArchiveBackendError(f"{remote} is not archived")
+        shutil.copyfile(path, local_path)
+
+    def checksum(self, remote):
+        """Return the sha256 checksum of an archived file.
+
+        Args:
+            remote (str): Archive identifier.
+
+        Returns:
+            str: Hexadecimal digest.
+
+        """
+        return file_checksum(self.path(remote))
+
+
+ARCHIVE_BACKENDS = {"directory": DirectoryArchive}
+
+
+def get_archive_backend(backend, directory=None):
+    """Return an archive backend.
+
+    Args:
+        backend (str): Name of the backend. "none" for no archiving.
+        directory (str, optional): Directory of the directory backend.
+
+    Returns:
+        ArchiveBackend: The backend, or None.
+
+    Raises:
+        NotImplementedError: If the backend is not defined.
+
+    """
+    if backend in ["none", None]:
+        return None
+    if backend in ARCHIVE_BACKENDS:
+        return ARCHIVE_BACKENDS[backend](directory)
+    raise NotImplementedError(f"Archive backend {backend} not implemented")
+
+
+class ArchiveQueue:
+    """Persistent queue of files to archive.
+
+    Every entry is a small JSON file in `pending`, which is moved to `active`
+    while being archived and to `failed` when all attempts have failed. Moving
+    the entry files is atomic, so any number of processes can add entries while
+    one drains the queue. The size and modification time of a file are recorded
+    when it is queued, and a file that has changed since then is not archived.
+    The checksum is computed by the drainer, so queueing a file is cheap.
+    """
+
+    def __init__(self, directory):
+        """Construct the object.
+
+        Args:
+            directory (str): Queue directory.
+
+        """
+        self.directory = Path(directory)
+        self.pending_dir = self.directory / "pending"
+        self.active_dir = self.directory / "active"
+        self.failed_dir = self.directory / "failed"
+
+    def put(self, local_path, remote):
+        """Add a file to archive.
+
+        Args:
+            local_path (str): Local file.
+            remote (str): Archive identifier.
+
+        Returns:
+            pathlib.Path: The queue entry.
+
+        """
+        try:
+            stat = os.stat(local_path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except FileNotFoundError:
+            # Reported when the queue is drained
+            size, mtime_ns = None, None
+        entry = {
+            "local_path": os.path.abspath(local_path),
+            "remote": remote,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "queued": datetime.now(timezone.utc).isoformat(),
+            "attempts": 0,
+            "not_before": 0.0,
+            "error": None,
+        }
+        name = f"{time.time_ns():020d}_{uuid.uuid4().hex}.json"
+        entry_path = self.pending_dir / name
+        self._write_entry(entry_path, entry)
+        logger.debug("Queued {} for archiving to {}", local_path, remote)
+        return entry_path
+
+    def pending(self):
+        """Return the pending entries in order.
+
+        Returns:
+            list: Paths of the entries.
+
+        """
+        return sorted(self.pending_dir.glob("*.json"))
+
+    def failed(self):
+        """Return the failed entries in order.
+
+        Returns:
+            list: Paths of the entries.
+
+        """
+        return sorted(self.failed_dir.glob("*.json"))
+
+    def drain(
+        self, backend, max_workers=4, max_attempts=3, retry_delay=10.0, metrics=None
+    ):
+        """Archive the queued files.
+
+        Runs until the queue is empty. Failed files are retried with exponential
+        backoff, and the checksums of archived files are verified if the backend
+        supports it. Returns immediately if the queue is drained by another
+        process.
+
+        Args:
+            backend (ArchiveBackend): Archive backend.
+            max_workers (int, optional): Concurrent transfers. Defaults to 4.
+            max_attempts (int, optional): Attempts per file. Defaults to 3.
+            retry_delay (float, optional): Delay in seconds before the first
+                retry. Defaults to 10.0.
+            metrics (TransferMetrics, optional): Writer of the transfer metrics.
+                Defaults to None.
+
+        Returns:
+            dict: Number of "archived" and "failed" files. None if the queue was
+                drained by another process.
+
+        """
+        summary = {"archived": 0, "failed": 0}
+        with self._drain_lock() as locked:
+            if not locked:
+                logger.info("Archive queue {} is drained by another process", self)
+                return None
+
+            # Entries left active by a drainer that died
+            for entry_path in sorted(self.active_dir.glob("*.json")):
+                os.replace(entry_path, self.pending_dir / entry_path.name)
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                while True:
+                    claimed = self._claim()
+                    if not claimed:
+                        pending = self._read_pending()
+                        if not pending:
+                            break
+                        # Wait for the next retry
+                        not_before = min(
+                            entry["not_before"] for entry in pending.values()
+                        )
+                        time.sleep(max(0.0, not_before - time.time()))
+                        continue
+                    for status in executor.map(
+                        lambda item: self._archive(
+                            backend, item, max_attempts, retry_delay, metrics
+                        ),
+                        claimed,
+                    ):
+                        if status in summary:
+                            summary[status] += 1
+        logger.info("Archived {archived} files, {failed} failed", **summary)
+        return summary
+
+    def _claim(self):
+        """Move the entries ready for archiving to active.
+
+        Returns:
+            list: Tuples of the active entry path and the entry.
+
+        """
+        claimed = []
+        now = time.time()
+        for entry_path, entry in self._read_pending().items():
+            if entry["not_before"] > now:
+                continue
+            active_path = self.active_dir / entry_path.name
+            try:
+                os.replace(entry_path, active_path)
+            except FileNotFoundError:
+                continue
+            claimed.append((active_path, entry))
+        return claimed
+
+    def _read_pending(self):
+        """Read the pending entries.
+
+        Returns:
+            dict: Entries by path.
+
+        """
+        entries = {}
+        for entry_path in self.pending():
+            try:
+                with open(entry_path, mode="r", encoding="utf-8") as fhandler:
+                    entries[entry_path] = json.load(fhandler)
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _archive(self, backend, claimed, max_attempts, retry_delay, metrics=None):
+        """Archive the file of an active entry.
+
+        Args:
+            backend (ArchiveBackend): Archive backend.
+            claimed (tuple): Active entry path and entry.
+            max_attempts (int): Attempts per file.
+            retry_delay (float): Delay in seconds before the first retry.
+            metrics (TransferMetrics, optional): Writer of the transfer metrics.
+                Defaults to None.
+
+        Returns:
+            str: "archived", "failed" or "retry".
+
+        """
+        entry_path, entry = claimed
+        local_path, remote = entry["local_path"], entry["remote"]
+        start = time.perf_counter()
+        try:
+            stat = os.stat(local_path)
+            if entry.get("size") is not None and (
+                stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]
+            ):
+                raise ArchiveSourceChangedError(
+                    f"{local_path} has changed since it was queued"
+                )
+            checksum = file_checksum(local_path)
+            backend.put(local_path, remote)
+            archived_checksum = backend.checksum(remote)
+            if archived_checksum is not None and archived_checksum != checksum:
+                raise ArchiveBackendError(f"Checksum mismatch for {remote}")
+        except (ArchiveBackendError, OSError) as error:
+            entry["attempts"] += 1
+            entry["error"] = str(error)
+            if entry["attempts"] >= max_attempts or isinstance(
+                error, ArchiveSourceChangedError
+            ):
+                logger.error("Could not archive {} to {}: {}", local_path, remote, error)
+                if metrics is not None:
+                    metrics.record(
+                        type(backend).__name__,
+                        local_path,
+                        remote,
+                        None,
+                        time.perf_counter() - start,
+                        success=False,
+                        direction="store",
+                        retries=entry["attempts"] - 1,
+                    )
+                self._write_entry(self.failed_dir / entry_path.name, entry)
+                entry_path.unlink()
+                return "failed"
+            logger.warning(
+                "Attempt {} to archive {} to {} failed: {}",
+                entry["attempts"],
+                local_path,
+                remote,
+                error,
+            )
+            entry["not_before"] = time.time() + retry_delay * 2 ** (entry["attempts"] - 1)
+            self._write_entry(self.pending_dir / entry_path.name, entry)
+            entry_path.unlink()
+            return "retry"
+        logger.info("Archived {} to {}", local_path, remote)
+        if metrics is not None:
+            metrics.record(
+                type(backend).__name__,
+                local_path,
+                remote,
+                os.path.getsize(local_path),
+                time.perf_counter() - start,
+                direction="store",
+                retries=entry["attempts"],
+            )
+        entry_path.unlink()
+        return "archived"
+
+    @staticmethod
+    def _write_entry(entry_path, entry):
+        """Write a queue entry atomically.
+
+        Args:
+            entry_path (pathlib.Path): Entry path.
+            entry (dict): Entry.
+
+        """
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.parent / f".{entry_path.name}.tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as fhandler:
+            json.dump(entry, fhandler)
+        os.replace(tmp_path, entry_path)
+
+    @contextlib.contextmanager
+    def _drain_lock(self):
+        """Try to lock the queue for draining.
+
+        Yields:
+            bool: True if the lock was acquired.
+
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in [self.pending_dir, self.active_dir]:
+            path.mkdir(exist_ok=True)
+        with open(self.directory / "drain.lock", mode="a", encoding="utf-8") as lock:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+
+    def __str__(self):
+        """Return the queue directory."""
+        return str(self.directory)
@@ -6,12 +6,16 @@ from argparse import ArgumentParser
 
 from . import PACKAGE_NAME, __version__
 from .config_parser import ParsedConfig
+from .datetime_utils import as_datetime
 from .experiment import ExpFromConfig, ExpFromFilesDepFile
-from .logs import logger
+from .logs import GLOBAL_LOGLEVEL, logger
+from .manifest import SetupManifest
+from .metrics import METRICS_GROUPS, aggregate_metrics, format_metrics, read_metrics
+from .scheduler.local import LocalExecutor
 from .scheduler.scheduler import EcflowServerFromConfig
 from .scheduler.submission import NoSchedulerSubmission, TaskSettings
-from .suites import get_defs
-from .toolbox import Platform
+from .suites import get_dag, get_defs
+from .toolbox import FileManager, Platform
 
 
 def parse_surfex_script(argv):
@@ -21,7 +25,16 @@ def parse_surfex_script(argv):
         "action",
         type=str,
         help="Action",
-        choices=["start", "prod", "continue", "testbed", "install", "climate", "co"],
+        choices=[
+            "start",
+            "prod",
+            "continue",
+            "testbed",
+            "install",
+            "climate",
+            "co",
+            "run-local",
+        ],
     )
     parser.add_argument(
         "-config", dest="config", help="Config file", type=str, default=None
@@ -152,7 +165,7 @@ def surfex_script(**kwargs):
             if dtg is not None:
                 progress.update({"basetime": dtg})
         else:
-            if action == "start":
+            if action == "start" or (action == "run-local" and dtg is not None):
                 if dtg is None:
                     raise RuntimeError("No DTG was provided!")
 
@@ -175,7 +188,18 @@ def surfex_script(**kwargs):
                 config = json.load(fhandler)
             sfx_exp = ExpFromConfig(config, progress)
         sfx_exp.dump_json(config_file, indent=2)
-        config = ParsedConfig.from_file(config_file)
+        config = ParsedConfig.from_file(config_file, use_snapshot=False)
+        config.write_snapshot()
+
+        if action == "run-local":
+            # Run the tasks in local processes instead of an ecflow server
+            executor = LocalExecutor.from_config(get_dag(config, suite), config)
+            if not executor.run():
+                raise RuntimeError(
+                    f"Not all tasks completed, see {executor.checkpoint.path}. "
+                    "Run again to resume."
+                )
+            return
 
         # Create and start the suite
         case = config.get_value("general.case")
@@ -199,6 +223,12 @@ def parse_update_config(argv):
     parser.add_argument(
         "--wd", help="Experiment working directory", type=str, default=None
     )
+    parser.add_argument(
+        "--force",
+        dest="force",
+        action="store_true",
+        help="Update the configuration even if the input files are unchanged",
+    )
     parser.add_argument("--version", action="version", version=__version__)
 
     args = parser.parse_args(argv)
@@ -209,10 +239,15 @@ def parse_update_config(argv):
 
 
 def update_config(**kwargs):
-    """Update the experiment json file configurations."""
+    """Update the experiment json file configurations.
+
+    The configuration is only updated if an input file changed since the last
+    update, or with force.
+    """
     logger.enable(PACKAGE_NAME)
     exp = kwargs.get("exp")
     work_dir = kwargs.get("wd")
+    force = kwargs.get("force", False)
 
     # Find experiment
     if work_dir is None:
@@ -225,12 +260,48 @@ def update_config(**kwargs):
 
     # Set experiment from files. Should be existing now after setup
     exp_dependencies_file = f"{work_dir}/exp_dependencies.json"
+    config_file = f"{work_dir}/exp_configuration.json"
+    manifest = SetupManifest.from_exp_dir(work_dir)
+    inputs = exp_config_inputs(exp_dependencies_file)
+    settings = {"version": __version__, "loglevel": GLOBAL_LOGLEVEL}
+    if not force and manifest.up_to_date(
+        "exp_configuration.json", inputs, config_file, settings
+    ):
+        logger.info("Configuration {} is up to date", config_file)
+        return
+
     sfx_exp = ExpFromFilesDepFile(exp_dependencies_file)
-    sfx_exp.dump_json(f"{work_dir}/exp_configuration.json", indent=2)
+    sfx_exp.dump_json(config_file, indent=2)
+    ParsedConfig.from_file(config_file, use_snapshot=False).write_snapshot()
+    manifest.record("exp_configuration.json", inputs, config_file, settings)
+    manifest.save()
 
     logger.info("Configuration was updated!")
 
 
+def exp_config_inputs(exp_dependencies_file):
+    """Return the input files of the experiment configuration.
+
+    Args:
+        exp_dependencies_file (str): File with exp dependencies
+
+    Returns:
+        list: Input files.
+
+    """
+    inputs = [exp_dependencies_file]
+    if not os.path.exists(exp_dependencies_file):
+        return inputs
+    with open(exp_dependencies_file, mode="r", encoding="utf-8") as fhandler:
+        exp_dependencies = json.load(fhandler)
+    for key in ["env_system", "input_paths", "env_submit", "env_server", "domain_file"]:
+        if exp_dependencies.get(key) is not None:
+            inputs.append(exp_dependencies[key])
+    inputs += list(exp_dependencies["config"]["config_files"].values())
+    inputs += list(exp_dependencies["config"]["other_files"].values())
+    return inputs
+
+
 def surfex_exp(argv=None):
     """Surfex exp script entry point."""
     if argv is None:
@@ -338,3 +409,125 @@ def run_submit_cmd_exp(argv=None):
         argv = sys.argv[1:]
     kwargs = parse_submit_cmd_exp(argv)
     submit_cmd_exp(**kwargs)
+
+
+def parse_archive(argv):
+    """Parse the command line input arguments."""
+    parser = ArgumentParser("Archive the data in the archive queue")
+    parser.add_argument(
+        "-config", dest="config", help="Config file", type=str, required=True
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    args = parser.parse_args(argv)
+    kwargs = {}
+    for arg in vars(args):
+        kwargs.update({arg: getattr(args, arg)})
+    return kwargs
+
+
+def archive(**kwargs):
+    """Archive the data in the archive queue.
+
+    Args:
+        kwargs (dict): Input arguments.
+
+    Raises:
+        SystemExit: If some files could not be archived.
+
+    """
+    logger.enable(PACKAGE_NAME)
+    config = ParsedConfig.from_file(kwargs["config"])
+    summary = FileManager(config).drain_archive()
+    if summary is not None and summary["failed"] > 0:
+        raise SystemExit(1)
+
+
+def run_archive(argv=None):
+    """Archive entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+    kwargs = parse_archive(argv)
+    archive(**kwargs)
+
+
+def parse_transfer_metrics(argv):
+    """Parse the command line input arguments."""
+    parser = ArgumentParser("Summarize the transfer metrics of the tasks")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help="Metrics files or directories. Defaults to the metrics of the experiment",
+    )
+    parser.add_argument(
+        "-config", dest="config", help="Config file", type=str, default=None
+    )
+    parser.add_argument(
+        "-basetime",
+        dest="basetime",
+        help="Only the cycle with this base time, e.g. 2023-01-01T03:00:00Z",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "-by",
+        dest="by",
+        help="Group by",
+        choices=METRICS_GROUPS,
+        default="provider",
+    )
+    parser.add_argument(
+        "-o", dest="output", help="Write the summary as JSON", type=str, default=None
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    args = parser.parse_args(argv)
+    kwargs = {}
+    for arg in vars(args):
+        kwargs.update({arg: getattr(args, arg)})
+    return kwargs
+
+
+def transfer_metrics(**kwargs):
+    """Summarize the transfer metrics of a cycle or an experiment.
+
+    Args:
+        kwargs (dict): Input arguments.
+
+    Raises:
+        SystemExit: If there are neither paths nor config.
+
+    """
+    logger.enable(PACKAGE_NAME)
+    paths = kwargs.get("paths")
+    if not paths:
+        if kwargs.get("config") is None:
+            logger.error("Set the metrics files or the config file")
+            raise SystemExit(1)
+        config = ParsedConfig.from_file(kwargs["config"])
+        joboutdir = Platform(config).get_system_value("joboutdir")
+        paths = [f"{joboutdir}/metrics"]
+    records = read_metrics(paths)
+    if kwargs.get("basetime") is not None:
+        basetime = as_datetime(kwargs["basetime"])
+        records = (
+            record
+            for record in records
+            if record.get("basetime") is not None
+            and as_datetime(record["basetime"]) == basetime
+        )
+
+    by = kwargs.get("by", "provider")
+    summaries = aggregate_metrics(records, by=by)
+    for line in format_metrics(summaries, by=by):
+        logger.info(line)
+    output = kwargs.get("output")
+    if output is not None:
+        with open(output, mode="w", encoding="utf-8") as fhandler:
+            json.dump(summaries, fhandler, indent=2)
+
+
+def run_transfer_metrics(argv=None):
+    """Transfer metrics entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+    kwargs = parse_transfer_metrics(argv)
+    transfer_metrics(**kwargs)
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 """Registration and validation of options passed in the config file."""
 import copy
+import hashlib
+import importlib.machinery
+import importlib.util
 import json
 import os
+import pickle
+import py_compile
+import uuid
 from collections import defaultdict
 from functools import cached_property, reduce
 from operator import getitem
@@ -14,11 +20,39 @@ import tomlkit
 import yaml
 from fastjsonschema import JsonSchemaValueException
 
-from . import PACKAGE_NAME
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+from . import PACKAGE_NAME, __version__
 from .datetime_utils import ISO_8601_TIME_DURATION_REGEX
 from .logs import logger
 
 NO_DEFAULT_PROVIDED = object()
+_NOT_FOUND = object()
+
+# Compiled json schema validators, shared by all configs in the process
+_VALIDATORS = {}
+
+# Bump if the layout of the pickled config snapshots changes
+CONFIG_SNAPSHOT_FORMAT_VERSION = 1
+
+# Root-level schema keywords that constrain each top-level section independently
+_SECTION_LOCAL_SCHEMA_KEYWORDS = {
+    "$schema",
+    "$id",
+    "title",
+    "description",
+    "type",
+    "properties",
+    "required",
+    "additionalProperties",
+    "definitions",
+}
 
 MAIN_CONFIG_JSON_SCHEMA_PATH = (
     Path(__file__).parent
@@ -46,6 +80,27 @@ def get_default_config_path():
     return default_conf_path
 
 
+def get_cache_dir():
+    """Return the directory used to cache data between runs.
+
+    Defaults to "$HOME/.<package>/cache" and can be overridden by the environment
+    variable PYSURFEX_EXPERIMENT_CACHE_DIR. An empty value, or no HOME, disables
+    the cache.
+
+    Returns:
+        Optional[pathlib.Path]: The cache directory, or None if caching is disabled.
+    """
+    cache_dir = os.getenv("PYSURFEX_EXPERIMENT_CACHE_DIR")
+    if cache_dir is None:
+        home = os.getenv("HOME")
+        if not home:
+            return None
+        return Path(home) / f".{PACKAGE_NAME}" / "cache"
+    if not cache_dir:
+        return None
+    return Path(cache_dir)
+
+
 class BasicConfig:
     """Base class for configs. Arbitrary entries allowed, but no validation performed."""
 
@@ -58,6 +113,22 @@ class BasicConfig:
             super().__setattr__(field_name, field_value)
         super().__setattr__("__field_names__", tuple(kwargs))
 
+    @classmethod
+    def _from_fields(cls, fields):
+        """Create an instance from already normalised fields, bypassing `__init__`.
+
+        Args:
+            fields (dict): Field values, with sub-sections as BasicConfig instances.
+
+        Returns:
+            BasicConfig: New instance holding (not copying) the values in `fields`.
+        """
+        instance = cls.__new__(cls)
+        for field_name, field_value in fields.items():
+            object.__setattr__(instance, field_name, field_value)
+        object.__setattr__(instance, "__field_names__", tuple(fields))
+        return instance
+
     def items(self):
         """Emulate the "items" method from the dictionary type."""
         for field_name in self.__field_names__:
@@ -82,9 +153,10 @@ class BasicConfig:
 
         Returns:
             Any: Copy of the instance, with any values mapped from `update` updated.
+                Sections not touched by `update` are shared with the original.
         """
         if update is not None:
-            return BasicConfig(**_update_nested_dict(self.dict(), update))
+            return BasicConfig._from_fields(_updated_fields(self, update))
         return copy.deepcopy(self)
 
     def get_value(self, items, default=NO_DEFAULT_PROVIDED):
@@ -104,21 +176,41 @@ class BasicConfig:
             AttributeError: If the attribute does not exist and no default is provided.
         """
 
-        def get_attr_or_item(obj, item):
-            try:
-                return getattr(obj, item)
-            except AttributeError as attr_error:
-                try:
-                    return obj[item]
-                except (KeyError, TypeError) as error:
-                    raise AttributeError(attr_error) from error
-
-        try:
-            return reduce(get_attr_or_item, items.split("."), self)
-        except AttributeError as error:
+        value = self._lookup(items)
+        if value is _NOT_FOUND:
             if default is NO_DEFAULT_PROVIDED:
-                raise error
+                # Walk the tree again to raise the original error
+                return reduce(_get_attr_or_item, items.split("."), self)
             return default
+        return value
+
+    def _lookup(self, items):
+        """Resolve a dot-separated path using the instance's flat value index.
+
+        The index maps full paths (e.g. "SURFEX.IO.CSURFFILE") to their values and is
+        populated lazily. Paths that cannot be resolved are cached as `_NOT_FOUND`.
+        Instances are immutable, so the index never needs to be invalidated.
+
+        Args:
+            items (str): Attributes to be retrieved, as dot-separated strings.
+
+        Returns:
+            Any: Value of the config item, or `_NOT_FOUND` if it does not exist.
+        """
+        index = self.__dict__.get("__value_index__")
+        if index is None:
+            index = {}
+            object.__setattr__(self, "__value_index__", index)
+        try:
+            return index[items]
+        except KeyError:
+            pass
+        try:
+            value = reduce(_get_attr_or_item, items.split("."), self)
+        except AttributeError:
+            value = _NOT_FOUND
+        index[items] = value
+        return value
 
     def dumps(
         self,
@@ -155,6 +247,16 @@ class BasicConfig:
     def __setattr__(self, key, value):
         raise TypeError(f"cannot assign to {self.__class__.__name__} objects.")
 
+    def __getstate__(self):
+        # The value index may hold the _NOT_FOUND sentinel, which does not survive
+        # pickling. It is rebuilt lazily anyway.
+        state = self.__dict__.copy()
+        state.pop("__value_index__", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     def __getattr__(self, items):
         """Get attribute.
 
@@ -168,6 +270,11 @@ class BasicConfig:
             Any: Value of the parsed config item.
         """
 
+        if "." in items:
+            value = self._lookup(items)
+            if value is not _NOT_FOUND:
+                return value
+
         def regular_getattribute(obj, item):
             if type(obj) is type(self):
                 return super().__getattribute__(item)
@@ -200,23 +307,7 @@ class ParsedConfig(BasicConfig):
         try:
             super().__init__(**self._validate(kwargs))
         except JsonSchemaValueException as err:
-            error_path = " -> ".join(err.path[1:])
-            human_readable_msg = err.message.replace(err.name, "").strip()
-
-            # Give a better err msg when times/date-times/durations don't follow ISO 8601
-            human_readable_msg = human_readable_msg.replace(
-                f"must match pattern {ISO_8601_TIME_DURATION_REGEX}",
-                "must be an ISO 8601 duration string",
-            )
-            for spec in ["date-time", "date", "time"]:
-                human_readable_msg = human_readable_msg.replace(
-                    f"must be {spec}", f"must be an ISO 8601 {spec} string"
-                )
-
-            raise ConfigFileValidationError(
-                f'"{error_path}" {human_readable_msg}. '
-                + f'Received type "{type(err.value).__name__}" with value "{err.value}".'
-            ) from err
+            raise _validation_error(err) from err
 
     @classmethod
     def parse_obj(cls, obj, json_schema=None):
@@ -224,17 +315,29 @@ class ParsedConfig(BasicConfig):
         return cls(json_schema=json_schema, **obj)
 
     @classmethod
-    def from_file(cls, config_path, json_schema=None):
+    def from_file(cls, config_path, json_schema=None, use_snapshot=True):
         """Read config file at location "config_path".
 
+        If a snapshot of the config (see `write_snapshot`) exists, is newer than the
+        config file and was made from the same file contents and json schema, then
+        the snapshot is loaded instead, skipping parsing and validation.
+
         Args:
             config_path (typing.Union[pathlib.Path, str]): The path to the config file.
             json_schema (dict): JSON schema to be used for validation.
+            use_snapshot (bool): Load the snapshot if it is up to date.
+                Default value = True.
 
         Returns:
             .config_parser.ParsedConfig: Parsed configs from config_path.
         """
         config_path = Path(config_path).expanduser().resolve()
+        if use_snapshot:
+            config = cls._read_snapshot(config_path, json_schema=json_schema)
+            if config is not None:
+                logger.info("Read config snapshot of {}", config_path)
+                return config
+
         logger.info("Reading config file {}", config_path)
         raw_config = read_raw_config_file(config_path)
 
@@ -246,11 +349,133 @@ class ParsedConfig(BasicConfig):
 
         return cls.parse_obj(obj=raw_config, json_schema=json_schema)
 
-    def copy(self, **kwargs):
-        """Return a copy of the instance. Same API as `copy` from class BasicConfig."""
-        return self.__class__.parse_obj(
-            super().copy(**kwargs).dict(), json_schema=self.json_schema
-        )
+    def write_snapshot(self):
+        """Write a pre-validated snapshot of a config read with `from_file`.
+
+        The snapshot is written next to the config file, and records a hash of
+        the config file and of the json schema so that stale snapshots are ignored.
+
+        Returns:
+            pathlib.Path: Path to the snapshot.
+
+        Raises:
+            ValueError: If the instance was not read from a config file.
+        """
+        config_path = self.get_value("metadata.source_file_path", default=None)
+        if config_path is None:
+            raise ValueError("Only configs read from a file can be snapshotted")
+        config_path = Path(config_path)
+        snapshot_path = config_snapshot_path(config_path)
+        snapshot = {
+            "format_version": CONFIG_SNAPSHOT_FORMAT_VERSION,
+            "package_version": __version__,
+            "source_hash": _file_hash(config_path),
+            "schema_hash": _schema_hash(self.json_schema),
+            "config": self,
+        }
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, mode="wb") as snapshot_file:
+            pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+        logger.info("Wrote config snapshot {}", snapshot_path)
+        return snapshot_path
+
+    @classmethod
+    def _read_snapshot(cls, config_path, json_schema=None):
+        """Return the config from an up to date snapshot of `config_path`, if any."""
+        snapshot_path = config_snapshot_path(config_path)
+        try:
+            if snapshot_path.stat().st_mtime < config_path.stat().st_mtime:
+                logger.debug("Config snapshot {} is outdated", snapshot_path)
+                return None
+            with open(snapshot_path, mode="rb") as snapshot_file:
+                # Snapshots are written by the experiment itself
+                snapshot = pickle.load(snapshot_file)  # noqa: S301
+        except FileNotFoundError:
+            return None
+        except (
+            OSError,
+            EOFError,
+            AttributeError,
+            ImportError,
+            pickle.UnpicklingError,
+        ) as error:
+            logger.debug("Could not read config snapshot {}: {}", snapshot_path, error)
+            return None
+
+        if json_schema is None:
+            json_schema = MAIN_CONFIG_JSON_SCHEMA
+        config = snapshot.get("config")
+        if (
+            snapshot.get("format_version") != CONFIG_SNAPSHOT_FORMAT_VERSION
+            or snapshot.get("package_version") != __version__
+            or not isinstance(config, cls)
+            or snapshot.get("schema_hash") != _schema_hash(json_schema)
+            or snapshot.get("source_hash") != _file_hash(config_path)
+        ):
+            logger.debug("Config snapshot {} does not match", snapshot_path)
+            return None
+        return config
+
+    def copy(self, update=None):
+        """Return a copy of the instance. Same API as `copy` from class BasicConfig.
+
+        Copies are copy-on-write: sections not touched by `update` are shared with
+        the original instance, and only the updated top-level sections are validated
+        again, each against its own part of the json schema.
+
+        Args:
+            update (dict): Mapping containing the fields to be updated upon copying.
+                Default value = None.
+
+        Returns:
+            ParsedConfig: Copy of the instance, with any values from `update` updated.
+
+        Raises:
+            ConfigFileValidationError: If the updated sections fail validation.
+        """
+        if update is None:
+            return self.__class__.parse_obj(
+                super().copy().dict(), json_schema=self.json_schema
+            )
+
+        fields = _updated_fields(self, update)
+        if not self._sections_validate_independently:
+            return self.__class__.parse_obj(
+                BasicConfig._from_fields(fields).dict(), json_schema=self.json_schema
+            )
+
+        for section in update:
+            validate_section = self._section_validator(section)
+            if validate_section is None:
+                continue
+            section_config = {}
+            if section in fields:
+                section_value = fields[section]
+                if isinstance(section_value, BasicConfig):
+                    section_value = section_value.dict()
+                section_config[section] = section_value
+            try:
+                section_config = validate_section(section_config)
+            except JsonSchemaValueException as err:
+                raise _validation_error(err) from err
+            if section in section_config:
+                # Validation may have filled in defaults, so rebuild the section
+                fields[section] = getattr(BasicConfig(**section_config), section)
+
+        new_config = self.__class__._from_fields(fields)
+        object.__setattr__(new_config, "json_schema", self.json_schema)
+        for compiled in ["_validate", "_section_validators"]:
+            if compiled in self.__dict__:
+                object.__setattr__(new_config, compiled, self.__dict__[compiled])
+        return new_config
+
+    def __getstate__(self):
+        # Compiled validators can not be pickled
+        state = super().__getstate__()
+        state.pop("_validate", None)
+        state.pop("_section_validators", None)
+        return state
 
     def __repr__(self):
         rtn = f"{self.__class__.__name__}(**{self.dumps(style='json')}, "
@@ -263,7 +488,176 @@ class ParsedConfig(BasicConfig):
         if not self.json_schema:
             # No json schema: bypassing validation
             return lambda obj: obj
-        return fastjsonschema.compile(self.json_schema)
+        return get_validator(self.json_schema)
+
+    @property
+    def _sections_validate_independently(self):
+        """Whether each top-level section can be validated on its own."""
+        additional_properties = self.json_schema.get("additionalProperties", True)
+        return (
+            set(self.json_schema) <= _SECTION_LOCAL_SCHEMA_KEYWORDS
+            and additional_properties is True
+        )
+
+    @cached_property
+    def _section_validators(self):
+        """Return a cache of compiled validation functions for top-level sections."""
+        return {}
+
+    def _section_validator(self, section):
+        """Return a validation function for the top-level section `section`.
+
+        The function validates a dict holding (at most) the key `section`, so that
+        both the contents of the section and whether it is required are checked.
+
+        Args:
+            section (str): Name of the top-level section.
+
+        Returns:
+            Optional[Callable]: The validation function, or None if the schema puts
+                no constraints on the section.
+        """
+        if not self.json_schema:
+            return None
+        try:
+            return self._section_validators[section]
+        except KeyError:
+            pass
+
+        properties = self.json_schema.get("properties", {})
+        required = self.json_schema.get("required", [])
+        if section not in properties and section not in required:
+            validator = None
+        else:
+            section_schema = dict(self.json_schema)
+            section_schema["properties"] = {
+                key: value for key, value in properties.items() if key == section
+            }
+            section_schema["required"] = [key for key in required if key == section]
+            validator = get_validator(section_schema)
+        self._section_validators[section] = validator
+        return validator
+
+
+def _get_attr_or_item(obj, item):
+    """Get `item` from `obj` either as an attribute or via `__getitem__`."""
+    try:
+        return getattr(obj, item)
+    except AttributeError as attr_error:
+        try:
+            return obj[item]
+        except (KeyError, TypeError) as error:
+            raise AttributeError(attr_error) from error
+
+
+def get_validator(json_schema):
+    """Return a validation function for `json_schema`.
+
+    Validators are cached in memory for the lifetime of the process, keyed by a hash
+    of the schema contents. The code generated by fastjsonschema is also stored in
+    the cache directory (see `get_cache_dir`), so that new processes can import the
+    validator instead of compiling the schema again.
+
+    Args:
+        json_schema (dict): The json schema.
+
+    Returns:
+        Callable: Function validating an object against the schema. It returns the
+            object, with any defaults from the schema filled in.
+    """
+    schema_hash = _schema_hash(json_schema)
+    try:
+        return _VALIDATORS[schema_hash]
+    except KeyError:
+        pass
+
+    validator = None
+    cache_dir = get_cache_dir()
+    if cache_dir is not None:
+        module_path = (
+            cache_dir
+            / "validators"
+            / f"validator_{fastjsonschema.VERSION.replace('.', '_')}_{schema_hash}.py"
+        )
+        try:
+            validator = _load_validator(module_path, json_schema)
+        except (
+            OSError,
+            ImportError,
+            AttributeError,
+            py_compile.PyCompileError,
+        ) as error:
+            logger.debug("Could not use cached validator {}: {}", module_path, error)
+    if validator is None:
+        validator = fastjsonschema.compile(json_schema)
+
+    _VALIDATORS[schema_hash] = validator
+    return validator
+
+
+def _schema_hash(json_schema):
+    """Return a hash of the contents of `json_schema`."""
+    return hashlib.sha256(
+        json.dumps(json_schema, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def _file_hash(path):
+    """Return a hash of the contents of the file at `path`."""
+    with open(path, mode="rb") as file_handler:
+        return hashlib.sha256(file_handler.read()).hexdigest()
+
+
+def config_snapshot_path(config_path):
+    """Return the path of the snapshot belonging to the config file `config_path`."""
+    config_path = Path(config_path)
+    return config_path.with_name(f"{config_path.name}.snapshot")
+
+
+def _load_validator(module_path, json_schema):
+    """Import a validator from `module_path`, generating the module if needed.
+
+    The module is byte-compiled explicitly, so the compiled code is reused by new
+    processes even if writing bytecode is disabled in the environment.
+    """
+    code_path = Path(importlib.util.cache_from_source(module_path))
+    if not code_path.exists():
+        module_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = module_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(fastjsonschema.compile_to_code(json_schema), encoding="utf-8")
+        os.replace(tmp_path, module_path)
+        py_compile.compile(module_path, cfile=code_path, doraise=True)
+        logger.debug("Wrote validator {}", module_path)
+
+    loader = importlib.machinery.SourcelessFileLoader(
+        module_path.stem, code_path.as_posix()
+    )
+    module = importlib.util.module_from_spec(
+        importlib.util.spec_from_loader(module_path.stem, loader)
+    )
+    loader.exec_module(module)
+    return module.validate
+
+
+def _validation_error(err):
+    """Convert a fastjsonschema error into a human-readable ConfigFileValidationError."""
+    error_path = " -> ".join(err.path[1:])
+    human_readable_msg = err.message.replace(err.name, "").strip()
+
+    # Give a better err msg when times/date-times/durations don't follow ISO 8601
+    human_readable_msg = human_readable_msg.replace(
+        f"must match pattern {ISO_8601_TIME_DURATION_REGEX}",
+        "must be an ISO 8601 duration string",
+    )
+    for spec in ["date-time", "date", "time"]:
+        human_readable_msg = human_readable_msg.replace(
+            f"must be {spec}", f"must be an ISO 8601 {spec} string"
+        )
+
+    return ConfigFileValidationError(
+        f'"{error_path}" {human_readable_msg}. '
+        + f'Received type "{type(err.value).__name__}" with value "{err.value}".'
+    )
 
 
 def _convert_lists_into_tuples(values):
@@ -308,13 +702,69 @@ def _update_nested_dict(my_dictionary, dict_with_updates):
     return new_dict
 
 
+def _updated_fields(config, dict_with_updates):
+    """Return the fields of `config` updated according to `dict_with_updates`.
+
+    This is the copy-on-write counterpart of `_update_nested_dict`: only the sections
+    touched by `dict_with_updates` are rebuilt, and all other sub-sections are the
+    very same (immutable) BasicConfig instances as in `config`.
+
+    Args:
+        config (BasicConfig): Config to be updated.
+        dict_with_updates (dict): Nested mapping with the values to be updated. As in
+            the BasicConfig constructor, None values remove the corresponding entry.
+
+    Returns:
+        dict: Mapping from field names to (normalised) field values.
+    """
+    fields = dict(config.items())
+    for key, value in dict_with_updates.items():
+        if value is None:
+            fields.pop(key, None)
+        elif isinstance(value, dict):
+            current_value = fields.get(key)
+            if isinstance(current_value, BasicConfig):
+                fields[key] = BasicConfig._from_fields(
+                    _updated_fields(current_value, value)
+                )
+            else:
+                fields[key] = BasicConfig(**value)
+        elif isinstance(value, list):
+            fields[key] = tuple(value)
+        else:
+            fields[key] = value
+    return fields
+
+
+def read_toml(path, preserve=False):
+    """Read a toml file.
+
+    Documents only read for their values are parsed with the fast tomllib (or
+    tomli) parser into plain dicts. tomlkit is used to preserve the structure and
+    comments of documents that are written back to toml.
+
+    Args:
+        path (typing.Union[pathlib.Path, str]): Toml file.
+        preserve (bool): Return a tomlkit document. Default value = False.
+
+    Returns:
+        typing.Union[dict, tomlkit.TOMLDocument]: Parsed document.
+    """
+    with open(path, "rb") as toml_file:
+        if preserve:
+            return tomlkit.load(toml_file)
+        if tomllib is None:
+            return tomlkit.load(toml_file).unwrap()
+        return tomllib.load(toml_file)
+
+
 def read_raw_config_file(config_path):
     """Read raw configs from files in miscellaneous formats."""
     config_path = Path(config_path)
-    with open(config_path, "rb") as config_file:
-        if config_path.suffix == ".toml":
-            return tomlkit.load(config_file)
+    if config_path.suffix == ".toml":
+        return read_toml(config_path)
 
+    with open(config_path, "rb") as config_file:
         if config_path.suffix == ".yaml":
             return yaml.load(config_file, Loader=yaml.loader.SafeLoader)
 
@@ -0,0 +1,473 @@
+"""Calendar of the cycles of an experiment.
+
+The cycles of an experiment are every general.times.cycle_length from the
+basetime, as in the tasks, with forecast lengths from "ll_list" (see
+config_exp.toml). The cycles repeat with a period, one day if the cycle length
+divides the day, else the least common multiple of the cycle length and the day.
+A cycle is identified by its global index, period * (cycles per period) +
+position in the period, counted from the epoch, so that lookups are O(1) and the
+list of cycles is generated with NumPy.
+"""
+from datetime import datetime, timedelta, timezone
+from math import gcd
+
+import numpy as np
+
+from .datetime_utils import ProgressFromConfig, as_datetime, as_timedelta
+
+SECONDS_PER_DAY = 86400
+
+
+class CycleCalendar:
+    """Cycles between a start and an end time."""
+
+    def __init__(self, start, end, cycle_hours, lead_times=None, period=None):
+        """Construct the calendar.
+
+        Args:
+            start (datetime.datetime): First possible cycle.
+            end (datetime.datetime): Last possible cycle.
+            cycle_hours (list): Cycle times of the period, as hours or timedeltas
+                from the start of the period.
+            lead_times (dict, optional): Forecast length by cycle time of the
+                period. Defaults to None.
+            period (Union[float, datetime.timedelta], optional): Period of the
+                cycles, as hours or a timedelta. The periods are counted from the
+                epoch. Defaults to None for one day.
+
+        Raises:
+            ValueError: If there are no cycle times or a cycle time is not within
+                the period.
+
+        """
+        self.period = SECONDS_PER_DAY if period is None else _seconds(period)
+        offsets = sorted({_seconds(hour) for hour in cycle_hours})
+        if len(offsets) == 0:
+            raise ValueError("No cycle times")
+        if offsets[0] < 0 or offsets[-1] >= self.period:
+            raise ValueError(f"Cycle times must be within the period: {cycle_hours}")
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.ncycles = len(offsets)
+        self._position = {offset: position for position, offset in enumerate(offsets)}
+        self._lead_times = None
+        if lead_times is not None:
+            lead_times = {
+                _seconds(hour): _seconds(lead) for hour, lead in lead_times.items()
+            }
+            self._lead_times = np.array(
+                [lead_times.get(offset, 0) for offset in offsets], dtype=np.int64
+            )
+        self.start = as_datetime(start)
+        self.end = as_datetime(end)
+        self._first = self._index_at_or_after(_timestamp(self.start))
+        self._last = self._index_after(_timestamp(self.end)) - 1
+
+    @classmethod
+    def from_config(cls, config, start=None, end=None, realization=None):
+        """Construct the calendar of an experiment.
+
+        The cycles are every general.times.cycle_length from the start, the
+        interval the tasks use as fcint and fgint. The period of the calendar is a
+        multiple of the cycle lengths of all realizations. The cycle times are the
+        union of those of the realizations, with the longest forecast of the
+        "ll_list".
+        Member settings are read from eps.member_settings.general.
+
+        Args:
+            config (ParsedConfig): Configuration
+            start (datetime.datetime, optional): First possible cycle. Defaults to
+                general.times.basetime.
+            end (datetime.datetime, optional): Last possible cycle. Defaults to
+                general.times.end.
+            realization (int, optional): Only use the cycles of this realization.
+                Defaults to None.
+
+        Returns:
+            CycleCalendar: Calendar
+
+        """
+        if start is None or end is None:
+            progress = ProgressFromConfig(config)
+            if start is None:
+                start = progress.basetime
+            if end is None:
+                end = progress.endtime
+        if realization is not None:
+            members = [realization]
+        else:
+            members = list(config.get_value("general.realizations", default=None) or [])
+            if len(members) == 0:
+                members = [None]
+
+        cycle_lengths = [
+            as_timedelta(_member_setting(config, "times.cycle_length", member))
+            for member in members
+        ]
+        period = cycle_period(*cycle_lengths)
+        lead_times = {}
+        for member, cycle_length in zip(members, cycle_lengths):
+            hours = cycle_hours_from_length(cycle_length, anchor=start, period=period)
+            ll_list = _member_setting(config, "ll_list", member)
+            if ll_list is None or str(ll_list).strip() == "":
+                lengths = [None] * len(hours)
+            else:
+                lengths = parse_ll_list(ll_list, len(hours))
+            for hour, length in zip(hours, lengths):
+                previous = lead_times.get(hour)
+                if previous is None or (length is not None and length > previous):
+                    lead_times[hour] = length
+        period = timedelta(seconds=period)
+        if any(length is None for length in lead_times.values()):
+            return cls(start, end, list(lead_times), period=period)
+        return cls(start, end, list(lead_times), lead_times=lead_times, period=period)
+
+    def __len__(self):
+        """Return the number of cycles."""
+        return max(self._last - self._first + 1, 0)
+
+    def __iter__(self):
+        """Iterate over the cycles."""
+        return iter(self.basetimes())
+
+    def __contains__(self, dtg):
+        """Check if a time is a cycle of the calendar.
+
+        Args:
+            dtg (datetime.datetime): Time.
+
+        Returns:
+            bool: True if dtg is a cycle between the start and the end.
+
+        """
+        index = self._index_of(_timestamp(dtg))
+        return index is not None and self._first <= index <= self._last
+
+    def as_datetime64(self):
+        """Return the cycles.
+
+        Returns:
+            numpy.ndarray: Cycles as datetime64[s] (UTC).
+
+        """
+        indices = np.arange(self._first, self._last + 1, dtype=np.int64)
+        return self._time(indices).astype("datetime64[s]")
+
+    def basetimes(self):
+        """Return the cycles.
+
+        Returns:
+            list: Cycles as datetime.datetime (UTC).
+
+        """
+        seconds = self.as_datetime64().astype(np.int64).tolist()
+        return [datetime.fromtimestamp(second, tz=timezone.utc) for second in seconds]
+
+    def index(self, dtg):
+        """Return the position of a cycle in the calendar.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+
+        Raises:
+            ValueError: If dtg is not a cycle of the calendar.
+
+        Returns:
+            int: Position.
+
+        """
+        if dtg not in self:
+            raise ValueError(f"{dtg} is not a cycle of the calendar")
+        return self._index_of(_timestamp(dtg)) - self._first
+
+    def previous(self, dtg):
+        """Return the last cycle before a time.
+
+        Args:
+            dtg (datetime.datetime): Time.
+
+        Returns:
+            datetime.datetime: Cycle.
+
+        """
+        return _datetime(int(self._time(self._index_at_or_after(_timestamp(dtg)) - 1)))
+
+    def next(self, dtg):
+        """Return the first cycle after a time.
+
+        Args:
+            dtg (datetime.datetime): Time.
+
+        Returns:
+            datetime.datetime: Cycle.
+
+        """
+        return _datetime(int(self._time(self._index_after(_timestamp(dtg)))))
+
+    def ahead(self, dtg, hours):
+        """Return the first cycle at least a number of hours after a time.
+
+        Args:
+            dtg (datetime.datetime): Time.
+            hours (float): Hours ahead.
+
+        Returns:
+            datetime.datetime: Cycle.
+
+        """
+        seconds = _timestamp(dtg) + int(hours * 3600)
+        return _datetime(int(self._time(self._index_at_or_after(seconds))))
+
+    def shift(self, dtg, cycles):
+        """Return the cycle a number of cycles after a cycle.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+            cycles (int): Number of cycles. Negative values go back in time.
+
+        Raises:
+            ValueError: If dtg is not a cycle time.
+
+        Returns:
+            datetime.datetime: Cycle.
+
+        """
+        index = self._index_of(_timestamp(dtg))
+        if index is None:
+            raise ValueError(f"{dtg} is not a cycle time")
+        return _datetime(int(self._time(index + cycles)))
+
+    def first_guess(self, dtg):
+        """Return the cycle providing the first guess of a cycle.
+
+        This is the last cycle before dtg with a forecast reaching dtg, or the
+        previous cycle if the forecast lengths are unknown.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+
+        Returns:
+            datetime.datetime: First guess cycle.
+
+        """
+        seconds = _timestamp(dtg)
+        index = self._index_at_or_after(seconds) - 1
+        if self._lead_times is not None:
+            # Only cycles within the longest forecast can reach dtg
+            max_lead_time = int(self._lead_times.max())
+            candidate = index
+            while seconds - self._time(candidate) <= max_lead_time:
+                lead_time = self._lead_times[candidate % self.ncycles]
+                if self._time(candidate) + lead_time >= seconds:
+                    return _datetime(int(self._time(candidate)))
+                candidate -= 1
+        return _datetime(int(self._time(index)))
+
+    def fcint(self, dtg):
+        """Return the time until the next cycle.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+
+        Returns:
+            pandas.Timedelta: Interval.
+
+        """
+        return self.next(dtg) - as_datetime(dtg)
+
+    def lead_time(self, dtg):
+        """Return the forecast length of a cycle.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+
+        Raises:
+            ValueError: If dtg is not a cycle time.
+
+        Returns:
+            pandas.Timedelta: Forecast length. None if unknown.
+
+        """
+        index = self._index_of(_timestamp(dtg))
+        if index is None:
+            raise ValueError(f"{dtg} is not a cycle time")
+        if self._lead_times is None:
+            return None
+        return as_timedelta(f"PT{int(self._lead_times[index % self.ncycles])}S")
+
+    def _time(self, index):
+        """Return the time of cycles.
+
+        Args:
+            index (Union[int, numpy.ndarray]): Global cycle indices.
+
+        Returns:
+            Union[int, numpy.ndarray]: Seconds since the epoch.
+
+        """
+        periods, positions = np.divmod(index, self.ncycles)
+        return periods * self.period + self.offsets[positions]
+
+    def _index_of(self, seconds):
+        """Return the global index of a cycle.
+
+        Args:
+            seconds (int): Seconds since the epoch.
+
+        Returns:
+            int: Global index. None if not a cycle time.
+
+        """
+        period, offset = divmod(seconds, self.period)
+        position = self._position.get(offset)
+        if position is None:
+            return None
+        return period * self.ncycles + position
+
+    def _index_at_or_after(self, seconds):
+        """Return the global index of the first cycle at or after a time."""
+        period, offset = divmod(seconds, self.period)
+        return period * self.ncycles + int(np.searchsorted(self.offsets, offset, "left"))
+
+    def _index_after(self, seconds):
+        """Return the global index of the first cycle after a time."""
+        period, offset = divmod(seconds, self.period)
+        return period * self.ncycles + int(np.searchsorted(self.offsets, offset, "right"))
+
+
+def parse_ll_list(ll_list, ncycles):
+    """Parse the forecast lengths of the cycles of the period.
+
+    The list is wrapped around to fit the number of cycles, starting with the
+    first cycle of the period.
+
+    Args:
+        ll_list (str): Comma separated forecast lengths in hours, e.g. "48,3".
+        ncycles (int): Number of cycles of the period.
+
+    Returns:
+        list: Forecast lengths in hours.
+
+    """
+    lengths = [int(length) for length in str(ll_list).split(",") if length.strip()]
+    return [lengths[index % len(lengths)] for index in range(ncycles)]
+
+
+def cycle_period(*cycle_lengths):
+    """Return the period of the cycles of fixed cycle lengths.
+
+    This is one day if the cycle lengths divide the day, else the least common
+    multiple of the cycle lengths and the day, e.g. three days for PT36H.
+
+    Args:
+        cycle_lengths (pandas.Timedelta): Cycle lengths.
+
+    Raises:
+        ValueError: If a cycle length is not a positive number of seconds.
+
+    Returns:
+        int: Period in seconds.
+
+    """
+    period = SECONDS_PER_DAY
+    for cycle_length in cycle_lengths:
+        seconds = int(cycle_length.total_seconds())
+        if seconds <= 0 or seconds != cycle_length.total_seconds():
+            raise ValueError(f"Invalid cycle length {cycle_length}")
+        period = period * seconds // gcd(period, seconds)
+    return period
+
+
+def cycle_hours_from_length(cycle_length, anchor=None, period=None):
+    """Return the cycle times of the period for a fixed cycle length.
+
+    Args:
+        cycle_length (pandas.Timedelta): Cycle length.
+        anchor (datetime.datetime, optional): A cycle. Defaults to None for cycles
+            from the start of the period.
+        period (int, optional): Period in seconds, see `cycle_period`. Defaults
+            to None for the period of the cycle length.
+
+    Raises:
+        ValueError: If the cycle length does not divide the period.
+
+    Returns:
+        list: Cycle times of the period as hours.
+
+    """
+    if period is None:
+        period = cycle_period(cycle_length)
+    seconds = int(cycle_length.total_seconds())
+    if seconds <= 0 or period % seconds != 0:
+        raise ValueError(f"Cycle length {cycle_length} does not divide {period} s")
+    first = 0
+    if anchor is not None:
+        first = _timestamp(anchor) % seconds
+    return [(first + offset) / 3600 for offset in range(0, period, seconds)]
+
+
+def _member_setting(config, setting, member):
+    """Return a general setting of a realization.
+
+    Args:
+        config (ParsedConfig): Configuration
+        setting (str): Setting in general.
+        member (int): Realization. None for the general setting.
+
+    Returns:
+        any: The setting. None if not set.
+
+    """
+    if member is not None:
+        member_settings = config.get_value(
+            f"eps.member_settings.general.{setting}", default=None
+        )
+        if member_settings is not None:
+            value = member_settings.dict().get(str(member))
+            if value is not None:
+                return value
+    return config.get_value(f"general.{setting}", default=None)
+
+
+def _seconds(hours):
+    """Return a time of the period or a duration in seconds.
+
+    Args:
+        hours (Union[float, datetime.timedelta]): Hours or a timedelta.
+
+    Returns:
+        int: Seconds.
+
+    """
+    if hasattr(hours, "total_seconds"):
+        return int(hours.total_seconds())
+    return int(round(float(hours) * 3600))
+
+
+def _timestamp(dtg):
+    """Return the seconds since the epoch of a time.
+
+    Args:
+        dtg (datetime.datetime): Time. Naive times are UTC.
+
+    Returns:
+        int: Seconds.
+
+    """
+    if not isinstance(dtg, datetime):
+        dtg = as_datetime(dtg)
+    elif dtg.tzinfo is None:
+        dtg = dtg.replace(tzinfo=timezone.utc)
+    return int(dtg.timestamp())
+
+
+def _datetime(seconds):
+    """Return the time of seconds since the epoch.
+
+    Args:
+        seconds (int): Seconds.
+
+    Returns:
+        datetime.datetime: Time (UTC).
+
+    """
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
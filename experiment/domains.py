@@ -0,0 +1,334 @@
+"""Catalogue of the named domains in Harmonie_domains.json.
+
+The domain file is parsed once into an index keyed by domain name, which is
+pickled in the cache directory (see `get_cache_dir`) and invalidated when the
+domain file changes. Derived properties of a domain, like the lon/lat ranges of
+its ConfProj geometry, are computed on first use and stored in the index.
+"""
+import hashlib
+import json
+import os
+import pickle
+import uuid
+from pathlib import Path
+
+import numpy as np
+from pysurfex.geo import ConfProj
+
+from .config_parser import get_cache_dir
+from .logs import logger
+
+DOMAIN_INDEX_FORMAT_VERSION = 1
+
+# Indexes read in this process, by domain file
+_INDEXES = {}
+
+
+class DomainCatalogue:
+    """Named domains of a Harmonie domain file."""
+
+    def __init__(self, domain_file):
+        """Construct the object.
+
+        Args:
+            domain_file (str): Harmonie domain json file.
+
+        """
+        self.domain_file = Path(domain_file).resolve()
+        self.index_file = None
+        cache_dir = get_cache_dir()
+        if cache_dir is not None:
+            name = hashlib.sha256(str(self.domain_file).encode("utf-8")).hexdigest()
+            self.index_file = cache_dir / "domains" / f"{name[:32]}.pickle"
+        self.index = self._load_index()
+
+    def __contains__(self, name):
+        """Check if a domain is in the catalogue.
+
+        Args:
+            name (str): Domain name.
+
+        Returns:
+            bool: True if the domain is defined.
+
+        """
+        return name in self.index["domains"]
+
+    def names(self):
+        """Return the domain names.
+
+        Returns:
+            list: Domain names.
+
+        """
+        return list(self.index["domains"])
+
+    def get(self, name):
+        """Return a domain in Harmonie syntax.
+
+        Args:
+            name (str): Domain name.
+
+        Raises:
+            KeyError: Domain definition not found
+
+        Returns:
+            dict: Domain properties, e.g. "NLON" and "GSIZE".
+
+        """
+        return self._entry(name)["hm"].copy()
+
+    def surfex_domain(self, name):
+        """Return a domain in the syntax of the domain config section.
+
+        Args:
+            name (str): Domain name.
+
+        Raises:
+            KeyError: Domain definition not found or incomplete
+
+        Returns:
+            dict: Domain settings, e.g. "nimax" and "xdx".
+
+        """
+        domain = self._entry(name)["surfex"]
+        if domain is None:
+            raise KeyError(f"Domain definition of {name} is incomplete")
+        return domain.copy()
+
+    def properties(self, name):
+        """Return derived properties of a domain.
+
+        Args:
+            name (str): Domain name.
+
+        Raises:
+            KeyError: Domain definition not found or incomplete
+
+        Returns:
+            dict: The "lonrange" and "latrange" of the ConfProj geometry, and the
+                "bbox" of the domain, see `bbox_from_ranges`.
+
+        """
+        entry = self._entry(name)
+        if entry.get("properties") is None:
+            geo = ConfProj(conf_proj_dict(self.surfex_domain(name)))
+            lonrange = [float(geo.lonrange[0]), float(geo.lonrange[1])]
+            latrange = [float(geo.latrange[0]), float(geo.latrange[1])]
+            entry["properties"] = {
+                "lonrange": lonrange,
+                "latrange": latrange,
+                "bbox": bbox_from_ranges(lonrange, latrange),
+            }
+            self._write_index()
+        properties = entry["properties"]
+        return {
+            "lonrange": list(properties["lonrange"]),
+            "latrange": list(properties["latrange"]),
+            "bbox": properties["bbox"].copy(),
+        }
+
+    def _entry(self, name):
+        """Return the index entry of a domain.
+
+        Args:
+            name (str): Domain name.
+
+        Raises:
+            KeyError: Domain definition not found
+
+        Returns:
+            dict: Entry.
+
+        """
+        try:
+            return self.index["domains"][name]
+        except KeyError:
+            raise KeyError("Domain definition not found") from None
+
+    def _stamp(self):
+        """Return the modification stamp of the domain file.
+
+        Returns:
+            list: Modification time and size.
+
+        """
+        stat = os.stat(self.domain_file)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _load_index(self):
+        """Load the index, or build it if outdated.
+
+        Returns:
+            dict: Index.
+
+        """
+        stamp = self._stamp()
+        key = str(self.domain_file)
+        index = _INDEXES.get(key)
+        if index is not None and index["stamp"] == stamp:
+            return index
+
+        index = None
+        if self.index_file is not None:
+            try:
+                with open(self.index_file, mode="rb") as fhandler:
+                    index = pickle.load(fhandler)
+            except FileNotFoundError:
+                pass
+            except (OSError, pickle.UnpicklingError, EOFError) as error:
+                logger.debug("Could not read domain index {}: {}", self.index_file, error)
+        if (
+            not isinstance(index, dict)
+            or index.get("format_version") != DOMAIN_INDEX_FORMAT_VERSION
+            or index.get("stamp") != stamp
+        ):
+            index = self._build_index(stamp)
+        _INDEXES[key] = index
+        return index
+
+    def _build_index(self, stamp):
+        """Parse the domain file into an index.
+
+        Args:
+            stamp (list): Modification stamp of the domain file.
+
+        Returns:
+            dict: Index.
+
+        """
+        logger.info("Index domain file {}", self.domain_file)
+        with open(self.domain_file, mode="r", encoding="utf-8") as fhandler:
+            domain_props = json.load(fhandler)
+        domains = {}
+        for name, hm_domain in domain_props.items():
+            try:
+                surfex_domain = surfex_domain_from_hm(hm_domain)
+            except KeyError:
+                surfex_domain = None
+            domains[name] = {"hm": hm_domain, "surfex": surfex_domain}
+        self.index = {
+            "format_version": DOMAIN_INDEX_FORMAT_VERSION,
+            "stamp": stamp,
+            "domains": domains,
+        }
+        self._write_index()
+        return self.index
+
+    def _write_index(self):
+        """Write the index to the cache directory."""
+        if self.index_file is None:
+            return
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_name(
+                f"{self.index_file.name}.{uuid.uuid4().hex}.tmp"
+            )
+            with open(tmp_file, mode="wb") as fhandler:
+                pickle.dump(self.index, fhandler, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.index_file)
+        except OSError as error:
+            logger.debug("Could not write domain index {}: {}", self.index_file, error)
+
+
+def surfex_domain_from_hm(hm_domain):
+    """Convert a domain in Harmonie syntax to the domain config section syntax.
+
+    Args:
+        hm_domain (dict): Domain properties, e.g. "NLON" and "GSIZE".
+
+    Raises:
+        KeyError: Key not found
+
+    Returns:
+        dict: Domain settings, e.g. "nimax" and "xdx".
+
+    """
+    gsize = hm_domain["GSIZE"]
+    ezone = hm_domain.get("EZONE", 11)
+    return {
+        "nimax": hm_domain["NLON"],
+        "njmax": hm_domain["NLAT"],
+        "xloncen": hm_domain["LONC"],
+        "xlatcen": hm_domain["LATC"],
+        "xdx": gsize,
+        "xdy": gsize,
+        "ilone": ezone,
+        "ilate": ezone,
+        "xlon0": hm_domain["LON0"],
+        "xlat0": hm_domain["LAT0"],
+    }
+
+
+def conf_proj_dict(domain):
+    """Return the ConfProj definition of a domain.
+
+    Args:
+        domain (dict): Domain settings, e.g. "nimax" and "xdx".
+
+    Returns:
+        dict: Definition for pysurfex.geo.ConfProj.
+
+    """
+    return {
+        "nam_conf_proj_grid": {
+            "nimax": domain["nimax"],
+            "njmax": domain["njmax"],
+            "xloncen": domain["xloncen"],
+            "xlatcen": domain["xlatcen"],
+            "xdx": domain["xdx"],
+            "xdy": domain["xdy"],
+            "ilone": domain.get("ilone"),
+            "ilate": domain.get("ilate"),
+        },
+        "nam_conf_proj": {
+            "xlon0": domain["xlon0"],
+            "xlat0": domain["xlat0"],
+        },
+    }
+
+
+def bbox_from_ranges(lonrange, latrange):
+    """Return the bounding box of a domain with a margin of one degree.
+
+    Args:
+        lonrange (list): Minimum and maximum longitude.
+        latrange (list): Minimum and maximum latitude.
+
+    Returns:
+        dict: "minlat", "minlon", "maxlat" and "maxlon".
+
+    """
+    return {
+        "minlat": float(np.max([latrange[0] - 1, -90])),
+        "minlon": float(np.max([lonrange[0] - 1, -180])),
+        "maxlat": float(np.min([latrange[1] + 1, 90])),
+        "maxlon": float(np.min([lonrange[1] + 1, 180])),
+    }
+
+
+def catalogue_domain_properties(config):
+    """Return the derived properties of the domain of a configuration.
+
+    Args:
+        config (ParsedConfig): Configuration
+
+    Returns:
+        dict: Properties, see `DomainCatalogue.properties`. None if the domain is
+            not in the catalogue, or if its settings differ from the catalogue.
+
+    """
+    domain_file = config.get_value("system.domain_file", default=None)
+    name = config.get_value("domain.name", default=None)
+    if domain_file is None or name is None:
+        return None
+    try:
+        catalogue = DomainCatalogue(domain_file)
+        domain = catalogue.surfex_domain(name)
+    except (OSError, KeyError):
+        return None
+    for key, value in domain.items():
+        if config.get_value(f"domain.{key}", default=None) != value:
+            logger.debug("Domain {} differs from the catalogue in {}", name, key)
+            return None
+    return catalogue.properties(name)
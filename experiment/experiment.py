@@ -7,8 +7,10 @@ import shutil
 import tomlkit
 from pysurfex.configuration import Configuration
 
-from .config_parser import ParsedConfig
+from .config_parser import ParsedConfig, read_toml
+from .domains import DomainCatalogue, surfex_domain_from_hm
 from .logs import GLOBAL_LOGLEVEL, logger
+from .manifest import SetupManifest
 from .system import System
 
 NO_DEFAULT_PROVIDED = object()
@@ -148,6 +150,7 @@ class Exp(ExpFromConfig):
                 "obs_dir": f"{sfx_data}/archive/observations/@YYYY@/@MM@/@DD@/@HH@/",
                 "namelist_defs": exp_dependencies.get("namelist_defs"),
                 "binary_input_files": exp_dependencies.get("binary_input_files"),
+                "domain_file": exp_dependencies.get("domain_file"),
                 "exp_dir": exp_dir,
                 "sfx_exp_lib": system.get_var("sfx_exp_lib", host),
                 "sfx_exp_data": system.get_var("sfx_exp_data", host),
@@ -263,42 +266,10 @@ class ExpFromFiles(Exp):
         domain_file = exp_dependencies.get("domain_file")
         domain = config_settings["domain"]
         domain_name = domain["name"]
-        with open(domain_file, mode="r", encoding="utf-8") as fhandler:
-            domain_props = json.load(fhandler)
-            if domain_name in domain_props:
-                fill_domain = domain_props[domain_name]
-                try:
-                    gsize = fill_domain["GSIZE"]
-                    lat0 = fill_domain["LAT0"]
-                    latc = fill_domain["LATC"]
-                    lon0 = fill_domain["LON0"]
-                    lonc = fill_domain["LONC"]
-                    nlat = fill_domain["NLAT"]
-                    nlon = fill_domain["NLON"]
-                    if "EZONE" in fill_domain:
-                        ezone = fill_domain["EZONE"]
-                    else:
-                        ezone = 11
-                except KeyError as exc:
-                    raise KeyError from exc
-
-                domain_from_file = {
-                    "name": domain_name,
-                    "nimax": nlon,
-                    "njmax": nlat,
-                    "xloncen": lonc,
-                    "xlatcen": latc,
-                    "xdx": gsize,
-                    "xdy": gsize,
-                    "ilone": ezone,
-                    "ilate": ezone,
-                    "xlon0": lon0,
-                    "xlat0": lat0,
-                }
-                domain = self.merge_dict(domain_from_file, domain)
-                config_settings.update({"domain": domain})
-            else:
-                raise KeyError("Domain definition not found")
+        domain_from_file = DomainCatalogue(domain_file).surfex_domain(domain_name)
+        domain_from_file.update({"name": domain_name})
+        domain = self.merge_dict(domain_from_file, domain)
+        config_settings.update({"domain": domain})
 
         Exp.__init__(
             self,
@@ -327,14 +298,8 @@ class ExpFromFiles(Exp):
         Returns:
             dict: Updated domain
         """
-        with open(domain_file, mode="r", encoding="utf-8") as fhandler:
-            domain_props = json.load(fhandler)
-            domain_name = keep_domain["name"]
-            if domain_name in domain_props:
-                fill_domain = domain_props[domain_name]
-                return ExpFromFiles.update_domain(keep_domain, fill_domain, hm_mode=True)
-            else:
-                raise KeyError("Domain definition not found")
+        fill_domain = DomainCatalogue(domain_file).get(keep_domain["name"])
+        return ExpFromFiles.update_domain(keep_domain, fill_domain, hm_mode=True)
 
     @staticmethod
     def update_domain(keep_doman, fill_domain, hm_mode=True):
@@ -353,52 +318,29 @@ class ExpFromFiles(Exp):
         """
         if hm_mode:
             try:
-                gsize = fill_domain["GSIZE"]
-                lat0 = fill_domain["LAT0"]
-                latc = fill_domain["LATC"]
-                lon0 = fill_domain["LON0"]
-                lonc = fill_domain["LONC"]
-                nlat = fill_domain["NLAT"]
-                nlon = fill_domain["NLON"]
-                if "EZONE" in fill_domain:
-                    ezone = fill_domain["EZONE"]
-                else:
-                    ezone = 11
+                fill_domain = surfex_domain_from_hm(fill_domain)
             except KeyError as exc:
                 raise KeyError from exc
-
-            fill_domain = {
-                "nimax": nlon,
-                "njmax": nlat,
-                "xloncen": lonc,
-                "xlatcen": latc,
-                "xdx": gsize,
-                "xdy": gsize,
-                "ilone": ezone,
-                "ilate": ezone,
-                "xlon0": lon0,
-                "xlat0": lat0,
-            }
         keep_doman = ExpFromFiles.merge_dict(fill_domain, keep_doman)
         return keep_doman
 
     @staticmethod
-    def toml_load(fname):
+    def toml_load(fname, preserve=False):
         """Load from toml file.
 
-        Using tomlkit to preserve stucture
+        Using tomlkit to preserve stucture if the document is written back to
+        toml, otherwise the fast tomllib parser.
 
         Args:
             fname (str): Filename
+            preserve (bool, optional): Preserve structure and comments.
+                                       Defaults to False.
 
         Returns:
-            _type_: _description_
+            dict: Parsed document. A tomlkit document if preserve.
 
         """
-        f_h = open(fname, "r", encoding="utf-8")
-        res = tomlkit.parse(f_h.read())
-        f_h.close()
-        return res
+        return read_toml(fname, preserve=preserve)
 
     @staticmethod
     def toml_dump(to_dump, fname):
@@ -474,12 +416,14 @@ class ExpFromFiles(Exp):
         return ExpFromFiles.deep_update(old_env, mods)
 
     @staticmethod
-    def get_config_files(config_files_in, blocks):
+    def get_config_files(config_files_in, blocks, preserve=False):
         """Get the config files.
 
         Args:
             config_files_in (dict): config file and path
             blocks (dict): Blocks
+            preserve (bool, optional): Load tomlkit documents to be written back
+                                       to toml. Defaults to False.
 
         Raises:
             FileNotFoundError: Did not find config file.
@@ -492,7 +436,7 @@ class ExpFromFiles(Exp):
         config_files = {}
         for ftype, fname in config_files_in.items():
             if os.path.exists(fname):
-                toml_dict = ExpFromFiles.toml_load(fname)
+                toml_dict = ExpFromFiles.toml_load(fname, preserve=preserve)
             else:
                 raise FileNotFoundError("No config file found for " + fname)
             config_files.update(
@@ -527,13 +471,17 @@ class ExpFromFiles(Exp):
             logger.debug("This config file {}", this_config_file)
             hm_exp = config_files[this_config_file]["toml"].copy()
 
-            block_config = tomlkit.document()
-            if configuration is not None:
-                fff = this_config_file.split("/")[-1]
-                if fff == "config_exp.toml":
-                    block_config.add(
-                        tomlkit.comment("\n# SURFEX experiment configuration file\n#")
-                    )
+            if isinstance(hm_exp, tomlkit.TOMLDocument):
+                block_config = tomlkit.document()
+                if configuration is not None:
+                    fff = this_config_file.split("/")[-1]
+                    if fff == "config_exp.toml":
+                        block_config.add(
+                            tomlkit.comment("\n# SURFEX experiment configuration file\n#")
+                        )
+            else:
+                # Read-only, not written back to toml
+                block_config = {}
 
             for block in config_files[this_config_file]["blocks"]:
                 block_config.update({block: hm_exp[block]})
@@ -719,8 +667,8 @@ class ExpFromFiles(Exp):
             else:
                 raise FileNotFoundError
 
-        c_files = ExpFromFiles.toml_load(config)["config_files"]
         blocks = ExpFromFiles.toml_load(config)
+        c_files = blocks["config_files"]
         pysurfex_files = ["config_exp_surfex.toml", "first_guess.yml", "config.yml"]
         c_files = c_files + ["config_exp_surfex.toml"]
         logger.info("Set up toml config files {}", str(c_files))
@@ -802,32 +750,31 @@ class ExpFromFiles(Exp):
         return exp_dependencies
 
     @staticmethod
-    def write_exp_config(
-        exp_dependencies,
+    def load_configuration(
+        pysurfex_experiment,
+        wdir,
         configuration=None,
         configuration_file=None,
-        write_config_files=True,
+        preserve=False,
     ):
-        """Write the exp config to files.
+        """Load the settings of a configuration.
 
         Args:
-            exp_dependencies (dict): Experiment dependencies
+            pysurfex_experiment (str): Pysurfex experiment script system path
+            wdir (str): Experiment directory
             configuration (str, optional): Configuration name. Defaults to None.
             configuration_file (str, optional): Configuration filename with settings.
                                                 Defaults to None.
-            write_config_files (bool, optional): Write updated config files.
-                                                 Defaults to True.
+            preserve (bool, optional): Load a tomlkit document to be written back to
+                                       toml. Defaults to False.
 
         Raises:
-            FileNotFoundError: Config files not found
+            FileNotFoundError: Configuration not found
 
         Returns:
-            config_files (dict): Config files dict with settings and file names
+            dict: Configuration settings. None if no configuration is given.
 
         """
-        wdir = exp_dependencies["exp_dir"]
-        pysurfex_experiment = exp_dependencies["pysurfex_experiment"]
-        other_files = exp_dependencies["config"]["other_files"]
         # First priority is config
         if configuration is not None:
             logger.info("Using configuration {}", configuration)
@@ -837,12 +784,12 @@ class ExpFromFiles(Exp):
                 lconf = f"{wdir}/data/config/configurations/{configuration.lower()}.toml"
                 if os.path.exists(lconf):
                     logger.info("Using local configuration file {}", lconf)
-                    configuration = ExpFromFiles.toml_load(lconf)
+                    configuration = ExpFromFiles.toml_load(lconf, preserve=preserve)
                     found = True
             if not found:
                 if os.path.exists(gconf):
                     logger.info("Using general configuration file {}", gconf)
-                    configuration = ExpFromFiles.toml_load(gconf)
+                    configuration = ExpFromFiles.toml_load(gconf, preserve=preserve)
                 else:
                     raise FileNotFoundError
 
@@ -851,14 +798,75 @@ class ExpFromFiles(Exp):
             if configuration_file is not None:
                 if os.path.exists(configuration_file):
                     logger.info("Using configuration from file {}", configuration_file)
-                    configuration = ExpFromFiles.toml_load(configuration_file)
+                    configuration = ExpFromFiles.toml_load(
+                        configuration_file, preserve=preserve
+                    )
                 else:
                     raise FileNotFoundError(configuration_file)
+        return configuration
+
+    @staticmethod
+    def write_exp_config(
+        exp_dependencies,
+        configuration=None,
+        configuration_file=None,
+        write_config_files=True,
+        incremental=False,
+    ):
+        """Write the exp config to files.
+
+        With incremental, the config files written by a previous setup from the
+        same input files and settings are neither merged nor rewritten, and are
+        left out of the returned config files. See `SetupManifest`.
+
+        Args:
+            exp_dependencies (dict): Experiment dependencies
+            configuration (str, optional): Configuration name. Defaults to None.
+            configuration_file (str, optional): Configuration filename with settings.
+                                                Defaults to None.
+            write_config_files (bool, optional): Write updated config files.
+                                                 Defaults to True.
+            incremental (bool, optional): Only write outdated config files.
+                                          Defaults to False.
+
+        Raises:
+            FileNotFoundError: Config files not found
+
+        Returns:
+            config_files (dict): Config files dict with settings and file names
+
+        """
+        wdir = exp_dependencies["exp_dir"]
+        pysurfex_experiment = exp_dependencies["pysurfex_experiment"]
+        other_files = exp_dependencies["config"]["other_files"]
+        configuration = ExpFromFiles.load_configuration(
+            pysurfex_experiment,
+            wdir,
+            configuration=configuration,
+            configuration_file=configuration_file,
+            preserve=write_config_files,
+        )
+
+        config_files_in = exp_dependencies["config"]["config_files"]
+        blocks = exp_dependencies["config"]["blocks"]
+        manifest = None
+        if incremental and wdir is not None and write_config_files:
+            manifest = SetupManifest.from_exp_dir(wdir)
+            outdated = {}
+            for fname, source in config_files_in.items():
+                settings = ExpFromFiles.config_file_settings(
+                    blocks[fname]["blocks"], configuration
+                )
+                output = f"{wdir}/config/{fname}"
+                if manifest.up_to_date(f"config/{fname}", [source], output, settings):
+                    logger.info("Config file {} is up to date", output)
+                else:
+                    outdated.update({fname: source})
+            config_files_in = outdated
 
         # Load config files
         config_files = ExpFromFiles.get_config_files(
-            exp_dependencies["config"]["config_files"],
-            exp_dependencies["config"]["blocks"],
+            config_files_in, blocks, preserve=write_config_files
         )
         # Merge dicts and write to toml config files
         ExpFromFiles.merge_to_toml_config_files(
@@ -867,6 +875,18 @@ class ExpFromFiles(Exp):
             configuration=configuration,
             write_config_files=write_config_files,
         )
+        if manifest is not None and config_files:
+            for fname in config_files:
+                settings = ExpFromFiles.config_file_settings(
+                    blocks[fname]["blocks"], configuration
+                )
+                manifest.record(
+                    f"config/{fname}",
+                    [config_files_in[fname]],
+                    f"{wdir}/config/{fname}",
+                    settings,
+                )
+            manifest.save()
 
         logger.debug("Configuration is: {}", configuration)
         if wdir is not None and write_config_files:
@@ -879,20 +899,44 @@ class ExpFromFiles(Exp):
                     logger.info("File {} exists", fname)
         return config_files
 
+    @staticmethod
+    def config_file_settings(blocks, configuration=None):
+        """Return the settings a config file is merged with.
+
+        Args:
+            blocks (list): Blocks of the config file.
+            configuration (dict, optional): Configuration. Defaults to None.
+
+        Returns:
+            dict: Settings, see `SetupManifest`.
+
+        """
+        if configuration is None:
+            configuration = {}
+        return {
+            "blocks": list(blocks),
+            "configuration": {block: configuration.get(block) for block in blocks},
+        }
+
     @staticmethod
     def dump_exp_dependencies(exp_dependencies, exp_dependencies_file, indent=2):
         """Dump an experimet dependency file.
 
+        The file is left untouched if it already has the same contents.
+
         Args:
             exp_dependencies (dict): Experiment dependencies
             exp_dependencies_file (str): Filename to dump to
             indent (int, optional): Intendation. Defaults to 2.
         """
-        json.dump(
-            exp_dependencies,
-            open(exp_dependencies_file, mode="w", encoding="utf-8"),
-            indent=indent,
-        )
+        contents = json.dumps(exp_dependencies, indent=indent)
+        if os.path.exists(exp_dependencies_file):
+            with open(exp_dependencies_file, mode="r", encoding="utf-8") as fhandler:
+                if fhandler.read() == contents:
+                    logger.info("{} is up to date", exp_dependencies_file)
+                    return
+        with open(exp_dependencies_file, mode="w", encoding="utf-8") as fhandler:
+            fhandler.write(contents)
 
 
 class ExpFromFilesDep(ExpFromFiles):
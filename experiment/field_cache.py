@@ -0,0 +1,465 @@
+"""Persistent cache of fields read from remote data sources.
+
+Fields that pysurfex reads from remote netCDF files, e.g. OPeNDAP URLs on
+thredds, are stored on disk and shared by all tasks. Forcing and FirstGuess4OI
+for the same hour then read the remote data once. Each field is stored with
+its coordinates as `.npy` files, subset to the bounding box of the domain and
+read back memory-mapped.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import netCDF4
+import numpy as np
+import pysurfex.forcing
+from pysurfex.cache import Cache
+from pysurfex.geo import Geo
+from pysurfex.netcdf import Netcdf
+
+from .logs import logger
+from .toolbox import Platform
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_FIELD_CACHE_SIZE = 10 * 1024 * 1024 * 1024
+DEFAULT_FIELD_CACHE_TTL = 24 * 3600
+
+# Grid points kept around the bounding box of the domain
+BBOX_MARGIN = 2
+
+# Suffix of the file with the mask of a masked array
+MASK_SUFFIX = ".mask"
+
+
+class FieldStore:
+    """Arrays on disk with a time to live and a size limit.
+
+    An entry is a directory of `.npy` files, one per array and one per mask of a
+    masked array, under the sha256 digest of its key. Entries are written to a temporary directory and renamed,
+    so readers never see partial entries. Entries older than the time to live are
+    ignored, and the oldest entries are removed when the store grows beyond its
+    size.
+    """
+
+    def __init__(
+        self, directory, max_size=DEFAULT_FIELD_CACHE_SIZE, ttl=DEFAULT_FIELD_CACHE_TTL
+    ):
+        """Construct the object.
+
+        Args:
+            directory (str): Store directory.
+            max_size (int, optional): Maximum size in bytes. Defaults to
+                DEFAULT_FIELD_CACHE_SIZE.
+            ttl (float, optional): Time to live in seconds. Defaults to
+                DEFAULT_FIELD_CACHE_TTL.
+
+        """
+        self.directory = Path(directory)
+        self.max_size = int(max_size)
+        self.ttl = float(ttl)
+        self.counts = {"hits": 0, "misses": 0}
+
+    @classmethod
+    def from_config(cls, config):
+        """Return the field store set in the config.
+
+        The store is set in general.field_cache. It should be on a node-local
+        file system, and an empty directory disables the store.
+
+        Args:
+            config (deode.ParsedConfig): Configuration
+
+        Returns:
+            FieldStore: The store, or None if caching is disabled.
+
+        """
+        directory = config.get_value("general.field_cache.directory", default="")
+        max_size = config.get_value(
+            "general.field_cache.max_size", default=DEFAULT_FIELD_CACHE_SIZE
+        )
+        ttl = config.get_value("general.field_cache.ttl", default=DEFAULT_FIELD_CACHE_TTL)
+        if not directory:
+            return None
+        directory = Platform(config).substitute(directory)
+        return cls(directory, max_size=max_size, ttl=ttl)
+
+    def get(self, key):
+        """Return the arrays of an entry.
+
+        Args:
+            key (list): Key of the entry. Must be serializable to JSON.
+
+        Returns:
+            dict: Memory-mapped arrays by name, masked as they were stored, or
+                None if the entry is missing or expired.
+
+        """
+        path = self._entry_path(key)
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age > self.ttl:
+                logger.debug("Entry {} has expired", path)
+                self._remove(path)
+                self.counts["misses"] += 1
+                return None
+            # Copy on write, as the readers may modify the fields in place
+            arrays = {}
+            masks = {}
+            for array_path in path.glob("*.npy"):
+                array = np.load(array_path, mmap_mode="c")
+                if array_path.stem.endswith(MASK_SUFFIX):
+                    masks[array_path.stem[: -len(MASK_SUFFIX)]] = array
+                else:
+                    arrays[array_path.stem] = array
+            for name, mask in masks.items():
+                arrays[name] = np.ma.MaskedArray(arrays[name], mask=mask)
+        except (FileNotFoundError, KeyError, ValueError):
+            arrays = None
+        if not arrays:
+            self.counts["misses"] += 1
+            return None
+        self.counts["hits"] += 1
+        return arrays
+
+    def put(self, key, arrays):
+        """Store the arrays of an entry.
+
+        Args:
+            key (list): Key of the entry. Must be serializable to JSON.
+            arrays (dict): Arrays by name. Masked arrays keep their mask.
+
+        """
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        tmp_path.mkdir()
+        try:
+            for name, array in arrays.items():
+                np.save(tmp_path / f"{name}.npy", np.ma.getdata(array))
+                if isinstance(array, np.ma.MaskedArray):
+                    mask = np.ma.getmaskarray(array)
+                    np.save(tmp_path / f"{name}{MASK_SUFFIX}.npy", mask)
+            with open(tmp_path / "key.json", mode="w", encoding="utf-8") as fhandler:
+                json.dump(key, fhandler)
+            self._remove(path)
+            try:
+                os.replace(tmp_path, path)
+            except OSError:
+                # Stored by another process in the meantime
+                pass
+        finally:
+            self._remove(tmp_path)
+        self.evict(keep=path)
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """Hold an exclusive lock on an entry.
+
+        Makes sure that concurrent processes do not read the same remote data.
+
+        Args:
+            key (list): Key of the entry.
+
+        Yields:
+            None
+
+        """
+        lock_path = self.directory / "locks" / f"{self._digest(key)}.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, mode="a", encoding="utf-8") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def evict(self, keep=None):
+        """Remove expired entries and the oldest entries beyond the size.
+
+        Args:
+            keep (pathlib.Path, optional): Entry never to remove. Defaults to None.
+
+        """
+        entries = []
+        total_size = 0
+        now = time.time()
+        for path in self.directory.glob("entries/*/*"):
+            if path.name.endswith(".tmp"):
+                continue
+            try:
+                mtime = path.stat().st_mtime
+                size = sum(array_path.stat().st_size for array_path in path.iterdir())
+            except FileNotFoundError:
+                continue
+            if now - mtime > self.ttl and path != keep:
+                self._remove(path)
+                continue
+            total_size += size
+            entries.append((mtime, size, path))
+
+        for __, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+            logger.debug("Evict {} from the field cache", path)
+            self._remove(path)
+            total_size -= size
+
+    def _entry_path(self, key):
+        """Return the directory of an entry.
+
+        Args:
+            key (list): Key of the entry.
+
+        Returns:
+            pathlib.Path: Path.
+
+        """
+        digest = self._digest(key)
+        return self.directory / "entries" / digest[:2] / digest[2:]
+
+    @staticmethod
+    def _digest(key):
+        """Return the digest of a key.
+
+        Args:
+            key (list): Key of the entry.
+
+        Returns:
+            str: Hexadecimal digest.
+
+        """
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _remove(path):
+        """Remove an entry directory, if it exists.
+
+        Args:
+            path (pathlib.Path): Entry directory.
+
+        """
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class CachedNetcdf(Netcdf):
+    """Remote netCDF file read through a field store.
+
+    The file is only opened if a field is missing in the store. Fields are
+    stored subset to the bounding box of the domain.
+    """
+
+    def __init__(self, filename, store, bbox=None):
+        """Construct the object.
+
+        Args:
+            filename (str): File name or URL.
+            store (FieldStore): Field store.
+            bbox (list, optional): Longitude and latitude range of the domain,
+                as [lon_min, lon_max, lat_min, lat_max]. Defaults to None, which
+                means the whole field.
+
+        """
+        self.filename = filename
+        self.store = store
+        self.bbox = bbox
+        self._file = None
+
+    @property
+    def file(self):
+        """Open the file on first use."""
+        if self._file is None:
+            logger.info("Read remote file {}", self.filename)
+            self._file = netCDF4.Dataset(self.filename, "r")
+        return self._file
+
+    def field(self, var_name, level=None, member=None, validtime=None, units=None):
+        """Read field.
+
+        Args:
+            var_name (str): Variable name
+            level (int, optional): Level. Defaults to None.
+            member (int, optional): Realization. Defaults to None.
+            validtime (datetime.datetime, optional): Validtime, or time index.
+                Defaults to None.
+            units (str, optional): Units. Defaults to None.
+
+        Returns:
+            tuple: Field, Geo
+
+        """
+        key = [
+            self.filename,
+            var_name,
+            level,
+            member,
+            validtime.isoformat() if hasattr(validtime, "isoformat") else validtime,
+            units,
+            self.bbox,
+        ]
+        key = json.loads(json.dumps(key, default=str))
+        with self.store.lock(key):
+            arrays = self.store.get(key)
+            if arrays is None:
+                field, geo_in = Netcdf.field(
+                    self,
+                    var_name,
+                    level=level,
+                    member=member,
+                    validtime=validtime,
+                    units=units,
+                )
+                arrays = self._subset(field, geo_in)
+                self.store.put(key, arrays)
+            else:
+                logger.debug("Found {} {} in the field cache", self.filename, var_name)
+        return arrays["field"], Geo(arrays["lons"], arrays["lats"])
+
+    def _subset(self, field, geo_in):
+        """Subset a field to the bounding box of the domain.
+
+        Args:
+            field (numpy.ndarray): Field.
+            geo_in (pysurfex.geo.Geo): Geometry of the field.
+
+        Returns:
+            dict: Field, longitudes and latitudes.
+
+        """
+        lons = np.asarray(geo_in.lons)
+        lats = np.asarray(geo_in.lats)
+        if self.bbox is not None and lons.ndim == 2 and lons.shape == field.shape:
+            lon_min, lon_max, lat_min, lat_max = self.bbox
+            inside = (lons >= lon_min) & (lons <= lon_max)
+            inside &= (lats >= lat_min) & (lats <= lat_max)
+            if inside.any():
+                rows = _index_range(inside.any(axis=1), lons.shape[0])
+                cols = _index_range(inside.any(axis=0), lons.shape[1])
+                field, lons, lats = field[rows, cols], lons[rows, cols], lats[rows, cols]
+        return {"field": field, "lons": lons, "lats": lats}
+
+
+def _index_range(inside, size):
+    """Return the index range covering the points inside, with a margin.
+
+    Args:
+        inside (numpy.ndarray): Whether the points along an axis are inside.
+        size (int): Length of the axis.
+
+    Returns:
+        slice: Index range.
+
+    """
+    indices = np.flatnonzero(inside)
+    start = max(indices[0] - BBOX_MARGIN, 0)
+    return slice(start, min(indices[-1] + BBOX_MARGIN + 1, size))
+
+
+class RemoteFieldCache(Cache):
+    """Pysurfex cache reading remote netCDF files through a field store.
+
+    File names with a scheme, like "https://...", are read with CachedNetcdf.
+    Other files are read by pysurfex as before.
+    """
+
+    def __init__(self, max_age, store, geo=None):
+        """Construct the object.
+
+        Args:
+            max_age (int): Maximum age in seconds of the fields kept in memory.
+            store (FieldStore): Field store.
+            geo (pysurfex.geo.Geo, optional): Domain. The stored fields are
+                subset to its bounding box. Defaults to None.
+
+        """
+        Cache.__init__(self, max_age)
+        self.store = store
+        self.bbox = None
+        if geo is not None:
+            self.bbox = [
+                float(np.min(geo.lons)),
+                float(np.max(geo.lons)),
+                float(np.min(geo.lats)),
+                float(np.max(geo.lats)),
+            ]
+
+    def file_open(self, filename):
+        """Test if file is open.
+
+        Remote files are always "open", so pysurfex gets their file handler
+        from the cache.
+
+        Args:
+            filename (str): Filename
+
+        Returns:
+            bool: True if the file handler is in the cache.
+
+        """
+        return "://" in filename or Cache.file_open(self, filename)
+
+    def get_file_handler(self, filename):
+        """Get the file handler.
+
+        Args:
+            filename (str): Filename
+
+        Returns:
+            Netcdf: File handler.
+
+        """
+        file_handler = Cache.get_file_handler(self, filename)
+        if file_handler is None and "://" in filename:
+            file_handler = CachedNetcdf(filename, self.store, bbox=self.bbox)
+            self.set_file_handler(filename, file_handler)
+        return file_handler
+
+
+def get_field_cache(config, max_age, geo=None):
+    """Return the pysurfex cache to read input fields with.
+
+    Args:
+        config (deode.ParsedConfig): Configuration
+        max_age (int): Maximum age in seconds of the fields kept in memory.
+        geo (pysurfex.geo.Geo, optional): Domain. Defaults to None.
+
+    Returns:
+        pysurfex.cache.Cache: RemoteFieldCache, or a plain Cache if the field
+            cache is disabled.
+
+    """
+    store = FieldStore.from_config(config)
+    if store is None:
+        return Cache(max_age)
+    return RemoteFieldCache(max_age, store, geo=geo)
+
+
+@contextlib.contextmanager
+def forcing_field_cache(config, geo=None):
+    """Make the pysurfex forcing time loop read through the field cache.
+
+    pysurfex.forcing.run_time_loop creates its own cache, so its constructor is
+    replaced while the context is active.
+
+    Args:
+        config (deode.ParsedConfig): Configuration
+        geo (pysurfex.geo.Geo, optional): Domain. Defaults to None.
+
+    Yields:
+        None
+
+    """
+    original = pysurfex.forcing.Cache
+    pysurfex.forcing.Cache = lambda max_age: get_field_cache(config, max_age, geo=geo)
+    try:
+        yield
+    finally:
+        pysurfex.forcing.Cache = original
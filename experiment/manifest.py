@@ -0,0 +1,147 @@
+"""Manifest of the files written by the experiment setup.
+
+The setup records a hash of the inputs, of the settings and of the output of
+every file it writes, in "<exp_dir>/config/.setup_manifest.json". Re-running the
+setup, or PySurfexExpConfig, only rewrites the files whose inputs changed.
+"""
+import hashlib
+import json
+import os
+import uuid
+
+from .logs import logger
+
+SETUP_MANIFEST_FORMAT_VERSION = 1
+
+
+class SetupManifest:
+    """Hashes of the inputs and outputs of the files written by the setup."""
+
+    def __init__(self, path):
+        """Construct the object.
+
+        Args:
+            path (str): Manifest file. Read if it exists.
+
+        """
+        self.path = path
+        self.entries = {}
+        try:
+            with open(path, mode="r", encoding="utf-8") as fhandler:
+                manifest = json.load(fhandler)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            logger.warning("Ignore invalid setup manifest {}", path)
+            return
+        if manifest.get("format_version") == SETUP_MANIFEST_FORMAT_VERSION:
+            self.entries = manifest.get("entries", {})
+
+    @classmethod
+    def from_exp_dir(cls, exp_dir):
+        """Construct the manifest of an experiment.
+
+        Args:
+            exp_dir (str): Experiment directory
+
+        Returns:
+            SetupManifest: Manifest
+
+        """
+        return cls(f"{exp_dir}/config/.setup_manifest.json")
+
+    def up_to_date(self, name, inputs, output, settings=None):
+        """Check if an output was written from the same inputs and settings.
+
+        An input which is the output itself, like a config file already copied
+        to the experiment, is checked by the hash of the output.
+
+        Args:
+            name (str): Entry name.
+            inputs (list): Input files.
+            output (str): Output file.
+            settings (any, optional): JSON serializable settings used to write
+                the output. Defaults to None.
+
+        Returns:
+            bool: True if the output does not need to be rewritten.
+
+        """
+        entry = self.entries.get(name)
+        if entry is None or entry.get("settings") != settings_hash(settings):
+            return False
+        output_hash = file_hash(output)
+        if output_hash is None or output_hash != entry.get("output"):
+            return False
+        recorded = entry.get("inputs", {})
+        for path in inputs:
+            if path == output:
+                continue
+            if path not in recorded or file_hash(path) != recorded[path]:
+                return False
+        return True
+
+    def record(self, name, inputs, output, settings=None):
+        """Record the inputs, the settings and the output of an entry.
+
+        Args:
+            name (str): Entry name.
+            inputs (list): Input files.
+            output (str): Output file, already written.
+            settings (any, optional): JSON serializable settings used to write
+                the output. Defaults to None.
+
+        """
+        output_hash = file_hash(output)
+        self.entries[name] = {
+            "inputs": {
+                path: output_hash if path == output else file_hash(path)
+                for path in inputs
+            },
+            "output": output_hash,
+            "settings": settings_hash(settings),
+        }
+
+    def save(self):
+        """Write the manifest."""
+        manifest = {
+            "format_version": SETUP_MANIFEST_FORMAT_VERSION,
+            "entries": self.entries,
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, mode="w", encoding="utf-8") as fhandler:
+            json.dump(manifest, fhandler, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def file_hash(path):
+    """Return a hash of the contents of a file.
+
+    Args:
+        path (str): File.
+
+    Returns:
+        str: Hash. None if the file does not exist.
+
+    """
+    try:
+        with open(path, mode="rb") as fhandler:
+            return hashlib.sha256(fhandler.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def settings_hash(settings):
+    """Return a hash of settings.
+
+    Args:
+        settings (any): JSON serializable settings.
+
+    Returns:
+        str: Hash.
+
+    """
+    return hashlib.sha256(
+        json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
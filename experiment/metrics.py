@@ -0,0 +1,210 @@
+"""Metrics of the file transfers done by the tasks.
+
+Every transfer done by a provider is recorded as a JSON line in a file per
+task, "<joboutdir>/metrics/<YYYYMMDDHH>/<task>.jsonl". The files of a cycle or
+of a whole experiment are summarized with `aggregate_metrics`.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .logs import logger
+
+# Record fields to group the metrics by
+METRICS_GROUPS = ["provider", "method", "direction", "task", "basetime"]
+
+
+class TransferMetrics:
+    """Writer of the transfer metrics of a task."""
+
+    def __init__(self, path, task=None, basetime=None):
+        """Construct the object.
+
+        Args:
+            path (str): JSON lines file.
+            task (str, optional): Task name. Defaults to None.
+            basetime (datetime.datetime, optional): Base time of the cycle.
+                Defaults to None.
+
+        """
+        self.path = Path(path)
+        self.task = task
+        self.basetime = basetime
+        self.totals = _empty_summary()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        provider,
+        source,
+        destination,
+        nbytes,
+        seconds,
+        success=True,
+        direction="fetch",
+        method=None,
+        hit=None,
+        retries=0,
+    ):
+        """Record a transfer.
+
+        Args:
+            provider (str): Provider name.
+            source (str): Source.
+            destination (str): Destination.
+            nbytes (int): Size of the file. None if unknown.
+            seconds (float): Wall time.
+            success (bool, optional): Whether the transfer succeeded. Defaults to
+                True.
+            direction (str, optional): "fetch" or "store". Defaults to "fetch".
+            method (str, optional): Transfer method, e.g. "reflink". Defaults to
+                None.
+            hit (bool, optional): Whether the file was found in a cache. Defaults
+                to None, which means no cache.
+            retries (int, optional): Retries before the last attempt. Defaults to 0.
+
+        """
+        throughput = None
+        if nbytes is not None and seconds > 0:
+            throughput = nbytes / seconds
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(),
+            "task": self.task,
+            "basetime": None if self.basetime is None else self.basetime.isoformat(),
+            "pid": os.getpid(),
+            "provider": provider,
+            "method": method,
+            "direction": direction,
+            "source": source,
+            "destination": destination,
+            "bytes": nbytes,
+            "seconds": seconds,
+            "throughput": throughput,
+            "hit": hit,
+            "retries": retries,
+            "success": success,
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            _add_record(self.totals, record)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Lines are appended in one write, so tasks can share the file
+                with open(self.path, mode="a", encoding="utf-8") as fhandler:
+                    fhandler.write(line)
+            except OSError as error:
+                logger.warning("Could not write metrics to {}: {}", self.path, error)
+
+
+def read_metrics(paths):
+    """Read transfer metrics.
+
+    Args:
+        paths (list): Metrics files, or directories searched for "*.jsonl" files.
+
+    Yields:
+        dict: Records.
+
+    """
+    for path in paths:
+        path = Path(path)
+        files = sorted(path.rglob("*.jsonl")) if path.is_dir() else [path]
+        for metrics_file in files:
+            with open(metrics_file, mode="r", encoding="utf-8") as fhandler:
+                for line in fhandler:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Line cut by a task that was killed
+                        logger.warning("Skip invalid line in {}", metrics_file)
+
+
+def aggregate_metrics(records, by="provider"):
+    """Summarize transfer metrics.
+
+    Args:
+        records (Iterable): Records, see `read_metrics`.
+        by (str, optional): Record field to group by. Defaults to "provider".
+
+    Returns:
+        dict: Summaries by group, see `format_metrics`.
+
+    """
+    summaries = {}
+    for record in records:
+        group = str(record.get(by))
+        if group not in summaries:
+            summaries[group] = _empty_summary()
+        _add_record(summaries[group], record)
+    return dict(sorted(summaries.items(), key=lambda item: -item[1]["seconds"]))
+
+
+def format_metrics(summaries, by="provider"):
+    """Format summaries of transfer metrics as a table.
+
+    Args:
+        summaries (dict): Summaries by group. Each summary holds the number of
+            "transfers", "failed" transfers, "bytes", "seconds", cache "hits"
+            and "misses", and "retries".
+        by (str, optional): Name of the groups. Defaults to "provider".
+
+    Returns:
+        list: Lines.
+
+    """
+    header = (
+        f"{by:<24} {'files':>7} {'failed':>6} {'MB':>10} {'seconds':>9} "
+        f"{'MB/s':>8} {'hits':>6} {'misses':>6} {'retries':>7}"
+    )
+    lines = [header, "-" * len(header)]
+    for group, summary in summaries.items():
+        megabytes = summary["bytes"] / 1e6
+        throughput = ""
+        if summary["seconds"] > 0:
+            throughput = f"{megabytes / summary['seconds']:.1f}"
+        lines.append(
+            f"{group:<24} {summary['transfers']:>7} {summary['failed']:>6} "
+            f"{megabytes:>10.1f} {summary['seconds']:>9.2f} {throughput:>8} "
+            f"{summary['hits']:>6} {summary['misses']:>6} {summary['retries']:>7}"
+        )
+    return lines
+
+
+def _empty_summary():
+    """Return a summary without transfers.
+
+    Returns:
+        dict: Summary.
+
+    """
+    return {
+        "transfers": 0,
+        "failed": 0,
+        "bytes": 0,
+        "seconds": 0.0,
+        "hits": 0,
+        "misses": 0,
+        "retries": 0,
+    }
+
+
+def _add_record(summary, record):
+    """Add a transfer to a summary.
+
+    Args:
+        summary (dict): Summary.
+        record (dict): Transfer record.
+
+    """
+    summary["transfers"] += 1
+    if not record.get("success", True):
+        summary["failed"] += 1
+    summary["bytes"] += record.get("bytes") or 0
+    summary["seconds"] += record.get("seconds") or 0.0
+    if record.get("hit") is True:
+        summary["hits"] += 1
+    elif record.get("hit") is False:
+        summary["misses"] += 1
+    summary["retries"] += record.get("retries") or 0
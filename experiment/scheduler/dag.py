@@ -0,0 +1,399 @@
+"""Backend-neutral workflow graph of a suite.
+
+The suite is a tree of families and tasks, with triggers between the nodes. A
+trigger expression is a tuple (mode, terms), where mode is "AND" or "OR" and
+each term is either a (node_id, state) tuple or a nested expression.
+"""
+import collections
+
+SUITE = "suite"
+FAMILY = "family"
+TASK = "task"
+EXTERN = "extern"
+
+
+class DagNode:
+    """Node in a workflow graph."""
+
+    __slots__ = (
+        "node_id",
+        "name",
+        "kind",
+        "parent",
+        "variables",
+        "trigger",
+        "def_status",
+    )
+
+    def __init__(self, node_id, name, kind, parent=None, variables=None, def_status=None):
+        """Construct the node.
+
+        Args:
+            node_id (int): Index of the node in the graph.
+            name (str): Name of the node. The absolute path for external nodes.
+            kind (str): Node type.
+            parent (int, optional): Index of the parent node. Defaults to None.
+            variables (dict, optional): Variables of the node. Defaults to None.
+            def_status (str, optional): Default status. Defaults to None.
+
+        """
+        self.node_id = node_id
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.variables = variables
+        self.trigger = None
+        self.def_status = def_status
+
+
+class SuiteDag:
+    """Workflow graph of a suite.
+
+    The nodes are indexed by integers in the order they are added, so a parent
+    always comes before its children.
+    """
+
+    def __init__(self):
+        """Construct an empty graph."""
+        self.nodes = []
+        self.paths = []
+        self.children = []
+        self.upstream = []
+        self._externs = {}
+
+    def __len__(self):
+        """Return the number of nodes."""
+        return len(self.nodes)
+
+    def add_node(self, name, kind, parent=None, variables=None, def_status=None):
+        """Add a node.
+
+        Args:
+            name (str): Name of the node.
+            kind (str): Node type, suite, family or task.
+            parent (int, optional): Index of the parent node. Defaults to None.
+            variables (dict, optional): Variables of the node. Defaults to None.
+            def_status (str, optional): Default status. Defaults to None.
+
+        Raises:
+            NotImplementedError: Node type not implemented
+
+        Returns:
+            int: Index of the node.
+
+        """
+        if kind not in (SUITE, FAMILY, TASK):
+            raise NotImplementedError(f"Node type {kind} not implemented")
+        node_id = len(self.nodes)
+        if variables:
+            variables = dict(variables)
+        else:
+            variables = None
+        self.nodes.append(DagNode(node_id, name, kind, parent, variables, def_status))
+        if parent is None:
+            self.paths.append(f"/{name}")
+        else:
+            self.paths.append(f"{self.paths[parent]}/{name}")
+            self.children[parent].append(node_id)
+        self.children.append([])
+        self.upstream.append([])
+        return node_id
+
+    def add_extern(self, path):
+        """Add a node defined outside of the suite.
+
+        Args:
+            path (str): Absolute path of the node.
+
+        Returns:
+            int: Index of the node.
+
+        """
+        if path not in self._externs:
+            node_id = len(self.nodes)
+            self.nodes.append(DagNode(node_id, path, EXTERN))
+            self.paths.append(path)
+            self.children.append([])
+            self.upstream.append([])
+            self._externs[path] = node_id
+        return self._externs[path]
+
+    def add_variable(self, node_id, key, value):
+        """Add a variable to a node.
+
+        Args:
+            node_id (int): Index of the node.
+            key (str): Variable name.
+            value (any): Value.
+
+        """
+        node = self.nodes[node_id]
+        if node.variables is None:
+            node.variables = {}
+        node.variables[key] = value
+
+    def add_trigger(self, node_id, expression, mode="AND"):
+        """Add a trigger to a node.
+
+        Args:
+            node_id (int): Index of the node.
+            expression (tuple): Trigger expression.
+            mode (str, optional): How to combine it with an existing trigger.
+                Defaults to "AND".
+
+        """
+        node = self.nodes[node_id]
+        if node.trigger is None:
+            node.trigger = expression
+        else:
+            node.trigger = (mode, (node.trigger, expression))
+        self.upstream[node_id] += trigger_nodes(expression)
+
+    def path(self, node_id):
+        """Return the absolute path of a node.
+
+        Args:
+            node_id (int): Index of the node.
+
+        Returns:
+            str: Path.
+
+        """
+        return self.paths[node_id]
+
+    def externs(self):
+        """Return the nodes defined outside of the suite.
+
+        Returns:
+            list: Indices of the external nodes.
+
+        """
+        return list(self._externs.values())
+
+    def ancestors(self, node_id):
+        """Return the parents of a node, starting with the closest.
+
+        Args:
+            node_id (int): Index of the node.
+
+        Returns:
+            list: Indices of the parent nodes.
+
+        """
+        ancestors = []
+        parent = self.nodes[node_id].parent
+        while parent is not None:
+            ancestors.append(parent)
+            parent = self.nodes[parent].parent
+        return ancestors
+
+    def tasks(self, node_id=None):
+        """Return the tasks of the graph or below a node.
+
+        Args:
+            node_id (int, optional): Index of the node. Defaults to None for
+                all tasks.
+
+        Returns:
+            list: Indices of the tasks, in the order they were added.
+
+        """
+        if node_id is None:
+            return [node.node_id for node in self.nodes if node.kind == TASK]
+        tasks = []
+        stack = [node_id]
+        while stack:
+            current = stack.pop()
+            if self.nodes[current].kind == TASK:
+                tasks.append(current)
+            stack += reversed(self.children[current])
+        return tasks
+
+    def downstream(self):
+        """Return the nodes triggered by each node.
+
+        Returns:
+            list: Indices of the triggered nodes, by index of the node.
+
+        """
+        downstream = [[] for __ in self.nodes]
+        for node_id, upstream in enumerate(self.upstream):
+            for upstream_id in upstream:
+                downstream[upstream_id].append(node_id)
+        return downstream
+
+
+class PlannedTask:
+    """Task in the execution plan of a suite."""
+
+    __slots__ = ("node_id", "name", "path", "variables", "triggers", "dependencies")
+
+    def __init__(self, node_id, name, path, variables, triggers, dependencies):
+        """Construct the planned task.
+
+        Args:
+            node_id (int): Index of the task in the graph.
+            name (str): Task name.
+            path (str): Absolute path of the task.
+            variables (dict): Variables of the task, inherited from its parents.
+            triggers (list): Trigger expressions of the task and its parents.
+            dependencies (list): Indices of the tasks the triggers refer to.
+
+        """
+        self.node_id = node_id
+        self.name = name
+        self.path = path
+        self.variables = variables
+        self.triggers = triggers
+        self.dependencies = dependencies
+
+
+def trigger_nodes(expression):
+    """Return the nodes a trigger expression refers to.
+
+    Args:
+        expression (tuple): Trigger expression.
+
+    Returns:
+        list: Indices of the nodes.
+
+    """
+    nodes = []
+    __, terms = expression
+    for term in terms:
+        if isinstance(term[0], str):
+            nodes += trigger_nodes(term)
+        else:
+            nodes.append(term[0])
+    return nodes
+
+
+def trigger_string(dag, expression):
+    """Render a trigger expression in the ecflow syntax.
+
+    Args:
+        dag (SuiteDag): Graph of the nodes.
+        expression (tuple): Trigger expression.
+
+    Returns:
+        str: The trigger string.
+
+    """
+    mode, terms = expression
+    parts = []
+    for term in terms:
+        if isinstance(term[0], str):
+            parts.append(trigger_string(dag, term))
+        else:
+            parts.append(f"{dag.path(term[0])} == {term[1]}")
+    return "(" + f" {mode} ".join(parts) + ")"
+
+
+def evaluate_trigger(expression, states):
+    """Evaluate a trigger expression.
+
+    Args:
+        expression (tuple): Trigger expression.
+        states (callable): Returns the state of a node by index.
+
+    Returns:
+        bool: True if the trigger is fulfilled.
+
+    """
+    mode, terms = expression
+    values = (
+        evaluate_trigger(term, states)
+        if isinstance(term[0], str)
+        else states(term[0]) == term[1]
+        for term in terms
+    )
+    if mode == "OR":
+        return any(values)
+    return all(values)
+
+
+def local_plan(dag):
+    """Render the graph as a plan of tasks for a local executor.
+
+    A task can run when its own trigger and the triggers of its parents are
+    fulfilled. A trigger on a family depends on all the tasks in the family.
+
+    Args:
+        dag (SuiteDag): Graph of the suite.
+
+    Raises:
+        RuntimeError: If the triggers form a cycle.
+
+    Returns:
+        list: PlannedTask objects in an order where each task comes after the
+            tasks it depends on.
+
+    """
+    tasks_below = {}
+    planned = {}
+    for task_id in dag.tasks():
+        variables = {}
+        triggers = []
+        dependencies = set()
+        for node_id in reversed([task_id] + dag.ancestors(task_id)):
+            node = dag.nodes[node_id]
+            if node.variables is not None:
+                variables.update(node.variables)
+            if node.trigger is not None:
+                triggers.append(node.trigger)
+            for upstream_id in dag.upstream[node_id]:
+                if upstream_id not in tasks_below:
+                    tasks_below[upstream_id] = dag.tasks(upstream_id)
+                dependencies.update(tasks_below[upstream_id])
+        dependencies.discard(task_id)
+        planned[task_id] = PlannedTask(
+            task_id,
+            dag.nodes[task_id].name,
+            dag.path(task_id),
+            variables,
+            triggers,
+            sorted(dependencies),
+        )
+
+    waiting = {task_id: len(task.dependencies) for task_id, task in planned.items()}
+    triggered = collections.defaultdict(list)
+    for task in planned.values():
+        for dependency in task.dependencies:
+            triggered[dependency].append(task.node_id)
+    ready = collections.deque(task_id for task_id, count in waiting.items() if count == 0)
+    plan = []
+    while ready:
+        task_id = ready.popleft()
+        plan.append(planned[task_id])
+        for other in triggered[task_id]:
+            waiting[other] -= 1
+            if waiting[other] == 0:
+                ready.append(other)
+    if len(plan) < len(planned):
+        raise RuntimeError("The triggers of the suite form a cycle")
+    return plan
+
+
+def graph_dump(dag):
+    """Render the graph in the dot language of graphviz.
+
+    Args:
+        dag (SuiteDag): Graph of the suite.
+
+    Returns:
+        str: The graph, with the tree as solid and the triggers as dashed edges.
+
+    """
+    shapes = {SUITE: "folder", FAMILY: "box", TASK: "ellipse", EXTERN: "note"}
+    lines = ["digraph suite {"]
+    for node in dag.nodes:
+        lines.append(
+            f'  n{node.node_id} [label="{node.name}" shape={shapes[node.kind]}];'
+        )
+    for node in dag.nodes:
+        for child in dag.children[node.node_id]:
+            lines.append(f"  n{node.node_id} -> n{child};")
+        for upstream_id in dag.upstream[node.node_id]:
+            lines.append(f"  n{upstream_id} -> n{node.node_id} [style=dashed];")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,334 @@
+"""Run the tasks of a suite in local processes, without a scheduler."""
+import collections
+import heapq
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ..datetime_utils import ecflow2datetime_string
+from ..logs import logger
+from ..tasks.discover_tasks import get_task
+from ..toolbox import Platform
+from .dag import EXTERN, TASK, evaluate_trigger, local_plan
+
+QUEUED = "queued"
+ACTIVE = "active"
+COMPLETE = "complete"
+ABORTED = "aborted"
+
+# A new interpreter per task, as a forked copy of the executor would share its
+# threads and checkpoint connection
+_SPAWN = multiprocessing.get_context("spawn")
+
+
+class LocalCheckpoint:
+    """Task states of a local run, stored in a SQLite file."""
+
+    def __init__(self, path):
+        """Open or create the checkpoint.
+
+        Args:
+            path (str): SQLite file.
+        """
+        dirname = os.path.dirname(path)
+        if dirname != "":
+            os.makedirs(dirname, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS task_states "
+                "(path TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def states(self):
+        """Return the stored task states.
+
+        Returns:
+            dict: State by task path.
+
+        """
+        return dict(self.connection.execute("SELECT path, state FROM task_states"))
+
+    def set_state(self, path, state):
+        """Store the state of a task.
+
+        Args:
+            path (str): Task path.
+            state (str): Task state.
+        """
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO task_states VALUES (?, ?, ?)",
+                (path, state, time.time()),
+            )
+
+    def close(self):
+        """Close the checkpoint."""
+        self.connection.close()
+
+
+def run_task(config, name, variables):
+    """Run a task of a suite, as the ecflow container does.
+
+    Args:
+        config (ParsedConfig): Parsed configuration
+        name (str): Task name.
+        variables (dict): Variables of the task in the suite.
+
+    """
+    args_dict = {}
+    args = variables.get("ARGS", "")
+    if args != "":
+        for arg in args.split(";"):
+            parts = arg.split("=")
+            if len(parts) == 2:
+                args_dict.update({parts[0]: parts[1]})
+
+    update = {
+        "general": {
+            "stream": variables.get("STREAM", ""),
+            "realization": variables.get("ENSMBR", ""),
+            "times": {
+                "basetime": ecflow2datetime_string(variables["DTG"]),
+                "validtime": ecflow2datetime_string(variables["DTG"]),
+                "basetime_pp": ecflow2datetime_string(variables["DTGPP"]),
+            },
+        },
+        "task": {
+            "wrapper": variables.get("WRAPPER", ""),
+            "var_name": variables.get("VAR_NAME", ""),
+            "args": args_dict,
+        },
+    }
+    config = config.copy(update=update)
+    get_task(name, config).run()
+
+
+def run_process(runner, config, name, variables):
+    """Run a task in a new process.
+
+    The tasks expect a process of their own, as in a job of the scheduler: the
+    working directory is named after the process id, and a failed task renames
+    it when the process exits.
+
+    Args:
+        runner (callable): Function running the task, called with config, name
+            and variables.
+        config (ParsedConfig): Parsed configuration
+        name (str): Task name.
+        variables (dict): Variables of the task in the suite.
+
+    Raises:
+        RuntimeError: If the process fails, also by calling sys.exit.
+
+    """
+    process = _SPAWN.Process(target=runner, args=(config, name, variables), name=name)
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Task {name} exited with code {process.exitcode}")
+
+
+class LocalExecutor:
+    """Run the tasks of a suite graph in local processes.
+
+    Each task runs in a new process. A task is started when the triggers of the task and of its families are
+    fulfilled, so independent families run at the same time. The task states are
+    stored in a checkpoint, and a new run resumes from the completed tasks.
+    """
+
+    def __init__(
+        self, dag, config, checkpoint, max_workers=None, limits=None, runner=None
+    ):
+        """Construct the executor.
+
+        Args:
+            dag (SuiteDag): Graph of the suite.
+            config (ParsedConfig): Parsed configuration
+            checkpoint (LocalCheckpoint): Stored task states.
+            max_workers (int, optional): Tasks running at the same time. Defaults
+                to None, or 0, which use all CPUs.
+            limits (dict, optional): Maximum number of running tasks by task name.
+                Defaults to None.
+            runner (callable, optional): Function running a task in a new
+                process, called with config, name and variables. Defaults to
+                run_task.
+
+        Raises:
+            ValueError: If a limit is below 1.
+
+        """
+        self.dag = dag
+        self.config = config
+        self.checkpoint = checkpoint
+        if not max_workers:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self.limits = {} if limits is None else dict(limits)
+        for name, limit in self.limits.items():
+            if limit < 1:
+                raise ValueError(f"The limit of task {name} must be at least 1: {limit}")
+        self.runner = run_task if runner is None else runner
+        self.plan = local_plan(dag)
+        self.states = {}
+        self._ancestors = {}
+        self._totals = collections.Counter()
+        self._counts = collections.defaultdict(collections.Counter)
+        for task in self.plan:
+            self._ancestors[task.node_id] = dag.ancestors(task.node_id)
+            for node_id in self._ancestors[task.node_id]:
+                self._totals[node_id] += 1
+
+    @classmethod
+    def from_config(cls, dag, config):
+        """Construct the executor from the general.local settings.
+
+        Args:
+            dag (SuiteDag): Graph of the suite.
+            config (ParsedConfig): Parsed configuration
+
+        Returns:
+            LocalExecutor: The executor.
+
+        """
+        checkpoint = config.get_value(
+            "general.local.checkpoint", default="@sfx_exp_data@/local_run.sqlite"
+        )
+        checkpoint = LocalCheckpoint(Platform(config).substitute(checkpoint))
+        limits = config.get_value("general.local.limits", default={})
+        if hasattr(limits, "dict"):
+            limits = limits.dict()
+        return cls(
+            dag,
+            config,
+            checkpoint,
+            max_workers=config.get_value("general.local.max_workers", default=0),
+            limits=limits,
+        )
+
+    def node_state(self, node_id):
+        """Return the state of a node.
+
+        A family is aborted if a task in it is aborted, active if a task is
+        active and complete if all tasks are complete.
+
+        Args:
+            node_id (int): Index of the node in the graph.
+
+        Returns:
+            str: State.
+
+        """
+        kind = self.dag.nodes[node_id].kind
+        if kind == TASK:
+            return self.states[node_id]
+        if kind == EXTERN:
+            return "unknown"
+        counts = self._counts[node_id]
+        if counts[ABORTED] > 0:
+            return ABORTED
+        if counts[ACTIVE] > 0:
+            return ACTIVE
+        if counts[COMPLETE] == self._totals[node_id]:
+            return COMPLETE
+        return QUEUED
+
+    def _set_state(self, task, state, save=True):
+        """Set the state of a task."""
+        old_state = self.states.get(task.node_id)
+        self.states[task.node_id] = state
+        for node_id in self._ancestors[task.node_id]:
+            if old_state is not None:
+                self._counts[node_id][old_state] -= 1
+            self._counts[node_id][state] += 1
+        if save:
+            self.checkpoint.set_state(task.path, state)
+
+    def _can_run(self, task):
+        """Check if the triggers of a task are fulfilled."""
+        return self.states[task.node_id] == QUEUED and all(
+            evaluate_trigger(trigger, self.node_state) for trigger in task.triggers
+        )
+
+    def run(self):
+        """Run the tasks until all are complete or no more can run.
+
+        Active and aborted tasks of a previous run are run again.
+
+        Returns:
+            bool: True if all tasks are complete.
+
+        """
+        saved = self.checkpoint.states()
+        order = {}
+        triggered = collections.defaultdict(list)
+        for index, task in enumerate(self.plan):
+            order[task.node_id] = index
+            state = COMPLETE if saved.get(task.path) == COMPLETE else QUEUED
+            self._set_state(task, state, save=False)
+            for dependency in task.dependencies:
+                triggered[dependency].append(task)
+        logger.info(
+            "Run {} tasks in {} processes, {} already complete",
+            len(self.plan),
+            self.max_workers,
+            sum(state == COMPLETE for state in self.states.values()),
+        )
+
+        # Earlier tasks in the plan, i.e. earlier cycles, go first
+        ready = [order[task.node_id] for task in self.plan if self._can_run(task)]
+        heapq.heapify(ready)
+        in_ready = set(ready)
+        running = {}
+        running_names = collections.Counter()
+        # The threads only wait for the process of a task
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while ready or running:
+                limited = []
+                while ready and len(running) < self.max_workers:
+                    task = self.plan[heapq.heappop(ready)]
+                    limit = self.limits.get(task.name)
+                    if limit is not None and running_names[task.name] >= limit:
+                        limited.append(order[task.node_id])
+                        continue
+                    in_ready.discard(order[task.node_id])
+                    logger.info("Start task {}", task.path)
+                    future = executor.submit(
+                        run_process,
+                        self.runner,
+                        self.config,
+                        task.name,
+                        task.variables,
+                    )
+                    running[future] = task
+                    running_names[task.name] += 1
+                    self._set_state(task, ACTIVE)
+                for index in limited:
+                    heapq.heappush(ready, index)
+                if len(running) == 0:
+                    break
+
+                done, __ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    running_names[task.name] -= 1
+                    try:
+                        future.result()
+                    except Exception as exc:  # noqa BLE001
+                        logger.error("Task {} aborted: {}", task.path, repr(exc))
+                        self._set_state(task, ABORTED)
+                    else:
+                        logger.info("Task {} complete", task.path)
+                        self._set_state(task, COMPLETE)
+                    for other in triggered[task.node_id]:
+                        index = order[other.node_id]
+                        if index not in in_ready and self._can_run(other):
+                            heapq.heappush(ready, index)
+                            in_ready.add(index)
+
+        complete = sum(state == COMPLETE for state in self.states.values())
+        logger.info("{} of {} tasks complete", complete, len(self.plan))
+        return complete == len(self.plan)
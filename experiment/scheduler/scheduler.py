@@ -183,6 +183,47 @@ class EcflowServer(Server):
                     "Could not replace suite " + suite_name
                 ) from RuntimeError
 
+    def suite_families(self, suite_name):
+        """Return the families directly below a suite on the server.
+
+        Args:
+            suite_name (str): Suite name.
+
+        Returns:
+            dict: The state of each family, e.g. "complete", by family name.
+                Empty if the suite is not on the server.
+
+        """
+        self.ecf_client.sync_local()
+        defs = self.ecf_client.get_defs()
+        suite = None
+        if defs is not None:
+            suite = defs.find_suite(suite_name)
+        if suite is None:
+            return {}
+        return {node.name(): str(node.get_state()) for node in suite.nodes}
+
+    def add_nodes(self, paths, def_file):
+        """Add or replace nodes of a suite from a definition file.
+
+        Args:
+            paths (list): Absolute paths of the nodes in the definition file.
+            def_file (str): Definition file.
+        """
+        for path in paths:
+            logger.info("Add {} from {}", path, def_file)
+            self.ecf_client.replace(path, def_file, True, False)
+
+    def remove_nodes(self, paths):
+        """Remove nodes from the server.
+
+        Args:
+            paths (list): Absolute paths of the nodes.
+        """
+        for path in paths:
+            logger.info("Remove {}", path)
+            self.ecf_client.delete(path, True)
+
 
 class EcflowServerFromFile(EcflowServer):
     """Construct an ecflow server from a config file."""
@@ -1,9 +1,12 @@
 """Job submission setup."""
 import collections.abc
+import copy
+import hashlib
 import json
 import os
 import subprocess  # noqa S404
 import sys
+import tempfile
 
 from ..logs import GLOBAL_LOGLEVEL, logger
 from ..tasks.discover_tasks import get_task
@@ -21,6 +24,11 @@ class TaskSettings(object):
         """
         self.submission_defs = config.get_value("submission").dict()
         self.job_type = None
+        # Parsed submission definitions and settings by task
+        self._parsed_submission_defs = {}
+        self._settings = {}
+        # Directories of the shared task containers, by task and settings
+        self._shared_jobs = {}
 
     @staticmethod
     def _update_task_setting(dic, upd):
@@ -42,6 +50,12 @@ class TaskSettings(object):
             dict: Parsed settings
 
         """
+        if task in self._parsed_submission_defs:
+            task_settings = copy.deepcopy(self._parsed_submission_defs[task])
+            if "SCHOST" in task_settings:
+                self.job_type = task_settings["SCHOST"]
+            return task_settings
+
         task_settings = {"BATCH": {}, "ENV": {}}
         all_defs = self.submission_defs
         submit_types = all_defs["submit_types"]
@@ -73,6 +87,7 @@ class TaskSettings(object):
             self.job_type = task_settings["SCHOST"]
 
         logger.debug("Task settings for task {}: {}", task, task_settings)
+        self._parsed_submission_defs[task] = copy.deepcopy(task_settings)
         return task_settings
 
     def get_task_settings(self, task, key=None, variables=None, ecf_micro="%"):
@@ -139,6 +154,8 @@ class TaskSettings(object):
         Returns:
             _type_: _description_
         """
+        if task in self._settings:
+            return copy.deepcopy(self._settings[task])
         settings = {}
         task_settings = self.parse_submission_defs(task)
         keys = []
@@ -152,6 +169,7 @@ class TaskSettings(object):
             if key in keys:
                 logger.debug("update {} {}", key, value)
                 settings.update({key: value})
+        self._settings[task] = copy.deepcopy(settings)
         return settings
 
     def parse_job(
@@ -179,7 +197,11 @@ class TaskSettings(object):
         dir_name = os.path.dirname(os.path.realpath(task_job))
         if not os.path.exists(dir_name):
             os.makedirs(dir_name, exist_ok=True)
-        with open(task_job, mode="w", encoding="utf-8") as file_handler:
+        # Replace the container in one step, as jobs may be generated from it
+        fd, tmp_job = tempfile.mkstemp(
+            dir=dir_name, prefix=f".{os.path.basename(task_job)}.", text=True
+        )
+        with os.fdopen(fd, mode="w", encoding="utf-8") as file_handler:
             file_handler.write(f"{interpreter}\n")
             batch_settings = self.get_task_settings(
                 task, "BATCH", variables=variables, ecf_micro=ecf_micro
@@ -211,7 +233,77 @@ class TaskSettings(object):
             )
             file_handler.write(input_content)
         # Make file executable for user
-        os.chmod(task_job, 0o744)
+        os.chmod(tmp_job, 0o744)
+        os.replace(tmp_job, task_job)
+
+    def shared_job(
+        self, task, config, input_template_job, ecf_files, variables=None, ecf_micro="%"
+    ):
+        """Parse a task container once into a shared directory.
+
+        Task instances with the same settings, e.g. the same task in every cycle,
+        share one container ecf_files/containers/<hash>/<task>.py. The hash is
+        computed from the batch and environment settings of the task and from the
+        input template, so each combination is only parsed once. An existing
+        container is not written again, e.g. when a suite is built in parallel
+        chunks or extended by AdvanceWindow while ecflow generates jobs from it.
+
+        Args:
+            task (str): Task name
+            config (experiment.Configuration): The configuration
+            input_template_job (str): Input container template.
+            ecf_files (str): Location of ecf files
+            variables (dict, optional): Task variables. Defaults to None.
+            ecf_micro (str, optional): Ecflow micro. Defaults to "%".
+
+        Returns:
+            str: ECF_FILES directory of the task container.
+
+        """
+        try:
+            config_file = config.get_value("metadata.source_file_path")
+        except AttributeError:
+            config_file = None
+        key = json.dumps(
+            [task, input_template_job, ecf_files, config_file, variables, ecf_micro],
+            sort_keys=True,
+            default=str,
+        )
+        job_dir = self._shared_jobs.get(key)
+        if job_dir is None:
+            # A missing template is reported when the container is parsed
+            template_digest = None
+            if os.path.exists(input_template_job):
+                with open(input_template_job, mode="rb") as file_handler:
+                    template_digest = hashlib.sha256(file_handler.read()).hexdigest()
+            settings = [
+                self.get_task_settings(task, "INTERPRETER"),
+                self.get_task_settings(
+                    task, "BATCH", variables=variables, ecf_micro=ecf_micro
+                ),
+                self.get_task_settings(
+                    task, "ENV", variables=variables, ecf_micro=ecf_micro
+                ),
+                os.path.realpath(input_template_job),
+                template_digest,
+                config_file,
+                GLOBAL_LOGLEVEL,
+            ]
+            digest = hashlib.sha256(
+                json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+            job_dir = f"{ecf_files}/containers/{digest[:16]}"
+            if not os.path.exists(f"{job_dir}/{task}.py"):
+                self.parse_job(
+                    task,
+                    config,
+                    input_template_job,
+                    f"{job_dir}/{task}.py",
+                    variables=variables,
+                    ecf_micro=ecf_micro,
+                )
+            self._shared_jobs[key] = job_dir
+        return job_dir
 
 
 class TaskSettingsJson(TaskSettings):
@@ -10,6 +10,7 @@ except ImportError:
 
 
 from ..logs import logger
+from .dag import EXTERN, FAMILY, SUITE, SuiteDag, trigger_string
 
 
 class EcflowNode:
@@ -33,68 +34,51 @@ class EcflowNode:
         Args:
             name (str): Name of node
             node_type (str): Node type
-            parent (EcflowNode): Parent node
+            parent (EcflowNode): Parent node. The graph of the suite for a suite.
             ecf_files (str): Location of ecf files
             variables (dict, optional): Variables to map. Defaults to None
             triggers (EcflowSuiteTriggers): Triggers. Defaults to None
             def_status (str, optional): Default status. Defaults to False.
 
         Raises:
-            NotImplementedError: Node type not implemented
+            NotImplementedError: Node type or defstatus not implemented
             TypeError: If triggers is not EcflowSuiteTriggers
 
         """
         self.name = name
         self.node_type = node_type
 
-        has_node = True
-        if parent is None:
-            has_node = False
-        if has_node and node_type != "suite":
-            if hasattr(parent, "ecf_node"):
-                if parent.ecf_node is None:
-                    has_node = False
-        if not has_node:
-            self.ecf_node = None
-            path = ""
+        if node_type == "suite":
+            self.dag = parent
+            parent_id = None
         else:
-            if self.node_type == "family":
-                self.ecf_node = parent.ecf_node.add_family(self.name)
-            elif self.node_type == "task":
-                self.ecf_node = parent.ecf_node.add_task(self.name)
-            elif self.node_type == "suite":
-                self.ecf_node = parent.add_suite(self.name)
-            else:
-                raise NotImplementedError
+            self.dag = parent.dag
+            parent_id = parent.node_id
 
-            path = self.ecf_node.get_abs_node_path()
+        if def_status is not None and not isinstance(def_status, str):
+            if Defstatus is None or not isinstance(def_status, Defstatus):  # noqa E1101
+                raise NotImplementedError("Unknown defstatus")
 
-        self.path = path
+        self.node_id = self.dag.add_node(
+            name, node_type, parent=parent_id, def_status=def_status
+        )
+        self.path = self.dag.path(self.node_id)
         self.ecf_container_path = ecf_files + self.path
         if variables is not None:
             for key, value in variables.items():
                 logger.debug("key={} value={}", key, value)
-                if self.ecf_node is not None:
-                    self.ecf_node.add_variable(key, value)
+                self.dag.add_variable(self.node_id, key, value)
 
         if triggers is not None:
             if isinstance(triggers, EcflowSuiteTriggers):
-                if triggers.trigger_string is not None:
-                    self.ecf_node.add_trigger(triggers.trigger_string)
+                if triggers.expression is not None:
+                    self.dag.add_trigger(self.node_id, triggers.expression)
                 else:
                     logger.warning("WARNING: Empty trigger")
             else:
                 raise TypeError("Triggers must be a Triggers object")
         self.triggers = triggers
 
-        if def_status is not None:
-            if isinstance(def_status, str):
-                self.ecf_node.add_defstatus(Defstatus(def_status))  # noqa E1101
-            elif isinstance(def_status, Defstatus):  # noqa E1101
-                self.ecf_node.add_defstatus(def_status)
-            else:
-                raise NotImplementedError("Unknown defstatus")
-
     def add_part_trigger(self, triggers, mode=True):
         """Add a part trigger.
 
@@ -107,8 +91,10 @@ class EcflowNode:
 
         """
         if isinstance(triggers, EcflowSuiteTriggers):
-            if triggers.trigger_string is not None:
-                self.ecf_node.add_part_trigger(triggers.trigger_string, mode)
+            if triggers.expression is not None:
+                self.dag.add_trigger(
+                    self.node_id, triggers.expression, mode="AND" if mode else "OR"
+                )
             else:
                 logger.warning("WARNING: Empty trigger")
         else:
@@ -174,27 +160,110 @@ class EcflowSuite(EcflowNodeContainer):
             def_status (str, optional): Default status. Defaults to False.
 
         """
-        self.defs = Defs({})
+        self.dag = SuiteDag()
         EcflowNodeContainer.__init__(
             self,
             name,
             "suite",
-            self.defs,
+            self.dag,
             ecf_files,
             variables=variables,
             def_status=def_status,
         )
 
+    @property
+    def defs(self):
+        """Ecflow definition rendered from the graph of the suite."""
+        return ecflow_defs(self.dag)
+
     def save_as_defs(self, def_file):
         """Save defintion file.
 
         Args:
             def_file (str): Name of the definition file.
         """
-        if self.defs is not None:
-            self.defs.save_as_defs(def_file)
+        self.defs.save_as_defs(def_file)
         logger.info("def file saved to {}", def_file)
 
+    def defs_text(self):
+        """Return the definition as text.
+
+        Returns:
+            str: Definition in the format of the definition files.
+        """
+        return str(self.defs)
+
+    def add_extern(self, path):
+        """Declare a node defined outside of this definition.
+
+        Args:
+            path (str): Absolute path of the node.
+
+        Returns:
+            int: Index of the node in the graph of the suite.
+
+        """
+        return self.dag.add_extern(path)
+
+
+class EcflowExternalNode:
+    """A node already on the server, but not in the suite definition.
+
+    Can be used in triggers like the other nodes.
+    """
+
+    def __init__(self, suite, path):
+        """Construct the external node.
+
+        Args:
+            suite (EcflowSuite): Suite definition referring to the node.
+            path (str): Absolute path of the node.
+        """
+        self.name = path.split("/")[-1]
+        self.path = path
+        self.node_id = suite.add_extern(path)
+
+
+def ecflow_defs(dag):
+    """Render the graph of a suite as an ecflow definition.
+
+    Args:
+        dag (SuiteDag): Graph of the suite.
+
+    Raises:
+        ModuleNotFoundError: If not ecflow is found.
+
+    Returns:
+        ecflow.Defs: The definition.
+
+    """
+    if Defs is None:
+        raise ModuleNotFoundError("Ecflow was not found")
+    defs = Defs({})
+    ecf_nodes = [None] * len(dag)
+    for node in dag.nodes:
+        if node.kind == EXTERN:
+            defs.add_extern(node.name)
+            continue
+        if node.kind == SUITE:
+            ecf_node = defs.add_suite(node.name)
+        elif node.kind == FAMILY:
+            ecf_node = ecf_nodes[node.parent].add_family(node.name)
+        else:
+            ecf_node = ecf_nodes[node.parent].add_task(node.name)
+        if node.variables is not None:
+            for key, value in node.variables.items():
+                ecf_node.add_variable(key, value)
+        if node.trigger is not None:
+            ecf_node.add_trigger(trigger_string(dag, node.trigger))
+        if node.def_status is not None:
+            def_status = node.def_status
+            if isinstance(def_status, str):
+                def_status = Defstatus(def_status)  # noqa E1101
+            ecf_node.add_defstatus(def_status)
+        ecf_nodes[node.node_id] = ecf_node
+    return defs
+
 
 class EcflowSuiteTriggers:
     """Triggers to an ecflow suite."""
@@ -209,6 +278,7 @@ class EcflowSuiteTriggers:
         """
         trigger_string = self.create_string(triggers, mode)
         self.trigger_string = trigger_string
+        self.expression = self.create_expression(triggers, mode)
 
     @staticmethod
     def create_string(triggers, mode):
@@ -259,6 +329,31 @@ class EcflowSuiteTriggers:
             trigger_string = None
         return trigger_string
 
+    @staticmethod
+    def create_expression(triggers, mode):
+        """Create the trigger expression of the suite graph.
+
+        Args:
+            triggers (list): List of trigger objects
+            mode (str): Concatenation type.
+
+        Returns:
+            tuple: The trigger expression. None if no triggers were set.
+
+        """
+        if not isinstance(triggers, list):
+            triggers = [triggers]
+        terms = []
+        for trigger in triggers:
+            if isinstance(trigger, EcflowSuiteTriggers):
+                if trigger.expression is not None:
+                    terms.append(trigger.expression)
+            elif trigger is not None:
+                terms.append((trigger.node.node_id, trigger.mode))
+        if len(terms) == 0:
+            return None
+        return (mode, tuple(terms))
+
     def add_triggers(self, triggers, mode="AND"):
         """Add triggers.
 
@@ -271,6 +366,10 @@ class EcflowSuiteTriggers:
         trigger_string = self.create_string(triggers, mode)
         if trigger_string is not None:
             self.trigger_string = self.trigger_string + cat_string + trigger_string
+            self.expression = (
+                mode,
+                (self.expression, self.create_expression(triggers, mode)),
+            )
 
 
 class EcflowSuiteTrigger:
@@ -320,8 +419,7 @@ class EcflowSuiteFamily(EcflowNodeContainer):
             def_status=def_status,
         )
         logger.debug(self.ecf_container_path)
-        if self.ecf_node is not None:
-            self.ecf_node.add_variable("ECF_FILES", self.ecf_container_path)
+        self.dag.add_variable(self.node_id, "ECF_FILES", self.ecf_container_path)
 
 
 class EcflowSuiteTask(EcflowNode):
@@ -354,7 +452,8 @@ class EcflowSuiteTask(EcflowNode):
             ecf_files (str): Path to ecflow containers
             task_settings (TaskSettings): Task settings
             input_template(str, optional): Input template
-            parse (bool, optional): To parse template file or not
+            parse (bool, optional): To parse template file into a shared container
+                or not
             variables (dict, optional): Variables to map. Defaults to None
             ecf_micro (str, optional): ECF_MICRO. Defaults to %
             triggers (EcflowSuiteTriggers): Triggers. Defaults to None
@@ -393,16 +492,17 @@ class EcflowSuiteTask(EcflowNode):
                 value = value.replace("@INTERPRETER@", interpreter.replace("#!", ""))
                 value = value.replace("@NAME@", name)
                 logger.debug("var={} value={}", var, value)
-                if self.ecf_node is not None:
-                    self.ecf_node.add_variable(var, value)
-            task_settings.parse_job(
+                self.dag.add_variable(self.node_id, var, value)
+            # Task instances with the same container share one file
+            task_ecf_files = task_settings.shared_job(
                 name,
                 config,
                 input_template,
-                task_container,
+                ecf_files,
                 variables=variables,
                 ecf_micro=ecf_micro,
             )
+            self.dag.add_variable(self.node_id, "ECF_FILES", task_ecf_files)
         else:
             if not os.path.exists(task_container):
                 raise FileNotFoundError(f"Container {task_container} is missing!")
@@ -1,4 +1,12 @@
 """Setup of experiments."""
+from .batch import ExperimentBatch, surfex_batch_setup, surfex_exp_batch_setup
 from .setup import parse_surfex_script_setup, surfex_exp_setup, surfex_script_setup
 
-__all__ = ["surfex_exp_setup", "parse_surfex_script_setup", "surfex_script_setup"]
+__all__ = [
+    "surfex_exp_setup",
+    "parse_surfex_script_setup",
+    "surfex_script_setup",
+    "ExperimentBatch",
+    "surfex_batch_setup",
+    "surfex_exp_batch_setup",
+]
@@ -0,0 +1,470 @@
+"""Batch setup of experiments for parameter sweeps.
+
+All the experiments of a batch are set up from the same base experiment, with
+different overrides of the settings. The host files, config files, configuration
+and domain of the base experiment are parsed once and shared by the experiments,
+and the experiments are written in parallel.
+"""
+import copy
+import csv
+import json
+import os
+import shutil
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pysurfex
+except:  # noqa
+    pysurfex = None
+
+
+from experiment import __version__
+from experiment.config_parser import ParsedConfig, read_raw_config_file, read_toml
+from experiment.domains import DomainCatalogue
+from experiment.experiment import Exp, ExpFromFiles
+from experiment.system import System
+
+from ..logs import logger
+from .setup import install_troika_sites
+
+# Host files of the experiment dependencies
+HOST_FILES = ["env_system", "env", "env_submit", "env_server", "input_paths"]
+
+
+class ExperimentBatch:
+    """Experiments set up from a shared base experiment."""
+
+    def __init__(self, exp_dependencies, configuration=None):
+        """Construct the object.
+
+        Args:
+            exp_dependencies (dict): Experiment dependencies of the base experiment.
+            configuration (dict, optional): Configuration settings, see
+                `ExpFromFiles.load_configuration`. Defaults to None.
+
+        """
+        self.exp_dependencies = exp_dependencies
+        self.configuration = configuration
+        config = exp_dependencies["config"]
+        self.config_files = ExpFromFiles.get_config_files(
+            config["config_files"], config["blocks"], preserve=True
+        )
+        self.host_system = read_toml(exp_dependencies["env_system"])
+        self.system_file_paths = read_raw_config_file(exp_dependencies["input_paths"])
+        self.env_submit = read_raw_config_file(exp_dependencies["env_submit"])
+        self.env_server = read_raw_config_file(exp_dependencies["env_server"])
+        self.domains = DomainCatalogue(exp_dependencies["domain_file"])
+
+    @classmethod
+    def from_host(
+        cls,
+        host,
+        pysurfex_path,
+        pysurfex_experiment,
+        configuration=None,
+        configuration_file=None,
+        offline_source=None,
+        namelist_defs=None,
+        binary_input_files=None,
+    ):
+        """Construct a batch from the general files of a host.
+
+        Args:
+            host (str): Host label
+            pysurfex_path (str): Pysurfex path
+            pysurfex_experiment (str): Pysurfex experiment script system path
+            configuration (str, optional): Configuration name. Defaults to None.
+            configuration_file (str, optional): Configuration filename with settings.
+                                                Defaults to None.
+            offline_source (str, optional): Offline source code. Defaults to None.
+            namelist_defs (str, optional): Namelist directory. Defaults to None.
+            binary_input_files (str, optional): Binary input files. Defaults to None.
+
+        Returns:
+            ExperimentBatch: Batch
+
+        """
+        exp_dependencies = ExpFromFiles.setup_files(
+            None,
+            None,
+            host,
+            pysurfex_path,
+            pysurfex_experiment,
+            offline_source=offline_source,
+            namelist_defs=namelist_defs,
+            binary_input_files=binary_input_files,
+        )
+        configuration = ExpFromFiles.load_configuration(
+            pysurfex_experiment,
+            None,
+            configuration=configuration,
+            configuration_file=configuration_file,
+            preserve=True,
+        )
+        return cls(exp_dependencies, configuration=configuration)
+
+    @classmethod
+    def from_experiment(cls, exp_dir):
+        """Construct a batch from an experiment set up before.
+
+        Args:
+            exp_dir (str): Experiment directory of the base experiment.
+
+        Returns:
+            ExperimentBatch: Batch
+
+        """
+        exp_dependencies = read_raw_config_file(f"{exp_dir}/exp_dependencies.json")
+        # Local host files are relative to the experiment directory
+        for key in HOST_FILES:
+            fname = exp_dependencies.get(key)
+            if fname is not None and not os.path.isabs(fname):
+                exp_dependencies.update({key: os.path.join(exp_dir, fname)})
+        return cls(exp_dependencies)
+
+    def experiment_dependencies(self, exp_dir, exp_name):
+        """Return the experiment dependencies of an experiment of the batch.
+
+        Args:
+            exp_dir (str): Experiment directory
+            exp_name (str): Experiment name
+
+        Returns:
+            dict: Experiment dependencies
+
+        """
+        exp_dependencies = copy.deepcopy(self.exp_dependencies)
+        config = exp_dependencies["config"]
+        for files in [config["config_files"], config["other_files"]]:
+            for fname in files:
+                files.update({fname: f"{exp_dir}/config/{fname}"})
+        exp_dependencies.update({"exp_dir": exp_dir, "exp_name": exp_name})
+        return exp_dependencies
+
+    def write_experiment(self, exp_dir, exp_name, overrides=None):
+        """Write the files of an experiment.
+
+        The config files, exp_dependencies.json and exp_configuration.json are
+        written as by PySurfexExpSetup followed by PySurfexExpConfig.
+
+        Args:
+            exp_dir (str): Experiment directory
+            exp_name (str): Experiment name
+            overrides (dict, optional): Settings overriding the base experiment.
+                                        Defaults to None.
+
+        Returns:
+            str: Experiment configuration file.
+
+        """
+        logger.info("Set up experiment {} in {}", exp_name, exp_dir)
+        os.makedirs(f"{exp_dir}/config", exist_ok=True)
+        config_files = {
+            fname: {
+                "toml": copy.deepcopy(config_file["toml"]),
+                "blocks": config_file["blocks"],
+            }
+            for fname, config_file in self.config_files.items()
+        }
+        config_files = ExpFromFiles.merge_to_toml_config_files(
+            config_files,
+            exp_dir,
+            configuration=copy.deepcopy(self.configuration),
+            user_settings=copy.deepcopy(overrides),
+        )
+        for ename, extra_file in self.exp_dependencies["config"]["other_files"].items():
+            shutil.copy(extra_file, f"{exp_dir}/config/{ename}")
+
+        exp_dependencies = self.experiment_dependencies(exp_dir, exp_name)
+        ExpFromFiles.dump_exp_dependencies(
+            exp_dependencies, f"{exp_dir}/exp_dependencies.json"
+        )
+
+        merged_config = ExpFromFiles.merge_dict_from_config_dicts(config_files)
+        domain = merged_config["domain"]
+        domain = ExpFromFiles.update_domain(
+            domain, self.domains.get(domain["name"]), hm_mode=True
+        )
+        merged_config.update({"domain": domain})
+        sfx_exp = Exp(
+            exp_dependencies,
+            merged_config,
+            System(self.host_system, exp_name),
+            copy.deepcopy(self.system_file_paths),
+            copy.deepcopy(self.env_server),
+            copy.deepcopy(self.env_submit),
+            {},
+        )
+        config_file = f"{exp_dir}/exp_configuration.json"
+        sfx_exp.dump_json(config_file, indent=2)
+        ParsedConfig.from_file(config_file, use_snapshot=False).write_snapshot()
+        return config_file
+
+    def write(self, root, experiments, max_workers=None):
+        """Write the experiments of the batch in parallel.
+
+        Args:
+            root (str): Directory of the experiment directories.
+            experiments (dict): Overrides of the settings by experiment name, see
+                `read_overrides`.
+            max_workers (int, optional): Number of parallel writers. Defaults to
+                None, which lets the executor decide.
+
+        Returns:
+            dict: Experiment configuration files by experiment name.
+
+        """
+        blocks = set()
+        for config_file in self.config_files.values():
+            blocks.update(config_file["blocks"])
+        for exp_name, overrides in experiments.items():
+            unknown = set(overrides) - blocks
+            if unknown:
+                logger.warning(
+                    "Overrides of {} in unknown blocks are ignored: {}",
+                    exp_name,
+                    sorted(unknown),
+                )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                exp_name: executor.submit(
+                    self.write_experiment, f"{root}/{exp_name}", exp_name, overrides
+                )
+                for exp_name, overrides in experiments.items()
+            }
+            return {exp_name: future.result() for exp_name, future in futures.items()}
+
+
+def read_overrides(overrides_file):
+    """Read a table of overrides of the settings.
+
+    The table is either a csv file with a column "name" with the experiment names
+    and a column per setting, e.g. "SURFEX.ISBA.SCHEME", or a toml, yaml or json
+    file with the settings by experiment name. Empty csv cells are not used, and
+    other cells are parsed as json values if possible.
+
+    Args:
+        overrides_file (str): Overrides file.
+
+    Raises:
+        ValueError: If the csv file has no name column.
+
+    Returns:
+        dict: Nested overrides by experiment name.
+
+    """
+    if overrides_file.endswith(".csv"):
+        experiments = {}
+        with open(overrides_file, mode="r", encoding="utf-8", newline="") as fhandler:
+            reader = csv.DictReader(fhandler)
+            if "name" not in (reader.fieldnames or []):
+                raise ValueError(f"No name column in {overrides_file}")
+            for row in reader:
+                exp_name = row.pop("name")
+                experiments[exp_name] = {
+                    key: _parse_value(value) for key, value in row.items() if value
+                }
+    else:
+        experiments = read_raw_config_file(overrides_file)
+    return {
+        str(exp_name): nested_settings(settings)
+        for exp_name, settings in experiments.items()
+    }
+
+
+def nested_settings(settings):
+    """Expand dotted keys, e.g. "SURFEX.ISBA.SCHEME", into nested settings.
+
+    Args:
+        settings (dict): Settings
+
+    Returns:
+        dict: Nested settings
+
+    """
+    nested = {}
+    for key, value in settings.items():
+        if isinstance(value, dict):
+            value = nested_settings(value)
+        *parents, name = key.split(".")
+        section = nested
+        for parent in parents:
+            section = section.setdefault(parent, {})
+        if isinstance(value, dict) and isinstance(section.get(name), dict):
+            section[name] = ExpFromFiles.merge_dict(section[name], value)
+        else:
+            section[name] = value
+    return nested
+
+
+def _parse_value(text):
+    """Parse a csv cell.
+
+    Args:
+        text (str): Cell
+
+    Returns:
+        any: The json value of the cell, or the cell itself.
+
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def surfex_exp_batch_setup(argv=None):
+    """Set up a batch of PySurfex experiments.
+
+    Args:
+        argv (list, optional): Arguments. Defaults to None.
+
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    kwargs = parse_surfex_batch_setup(argv)
+    surfex_batch_setup(**kwargs)
+
+
+def parse_surfex_batch_setup(argv):
+    """Parse the command line input arguments.
+
+    Args:
+        argv (list): Arguments
+
+    Returns:
+        dict: kwargs
+    """
+    parser = ArgumentParser("Surfex offline batch setup script")
+    parser.add_argument(
+        "overrides", help="Table of overrides by experiment (csv/toml/yaml/json)"
+    )
+    parser.add_argument(
+        "-o",
+        dest="root",
+        help="Directory of the experiment directories",
+        type=str,
+        required=True,
+    )
+    parser.add_argument(
+        "--base",
+        help="Base experiment directory. Defaults to the general host files",
+        type=str,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "-host",
+        dest="host",
+        help="Host label for setup files",
+        type=str,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "-experiment",
+        dest="pysurfex_experiment",
+        help="Pysurfex-experiment library",
+        type=str,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "-offline",
+        dest="offline_source",
+        help="Offline source code",
+        type=str,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "-namelist",
+        dest="namelist_defs",
+        help="Namelist definitions",
+        type=str,
+        required=False,
+        default=None,
+    )
+    parser.add_argument(
+        "-i",
+        dest="binary_input_files",
+        help="Binary input files",
+        type=str,
+        required=False,
+        default=None,
+    )
+    parser.add_argument("--config", help="Config", type=str, required=False, default=None)
+    parser.add_argument(
+        "--config_file", help="Config file", type=str, required=False, default=None
+    )
+    parser.add_argument(
+        "--max_workers",
+        help="Number of experiments written in parallel",
+        type=int,
+        required=False,
+        default=None,
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+
+    if len(argv) == 0:
+        parser.print_help()
+        sys.exit(1)
+
+    args = parser.parse_args(argv)
+    kwargs = {}
+    for arg in vars(args):
+        kwargs.update({arg: getattr(args, arg)})
+    return kwargs
+
+
+def surfex_batch_setup(**kwargs):
+    """Do the setup of a batch of experiments.
+
+    Args:
+        kwargs (dict): Arguments
+
+    Raises:
+        RuntimeError: Setup failed
+
+    Returns:
+        dict: Experiment configuration files by experiment name.
+
+    """
+    logger.info("************ PySurfexExpBatchSetup ******************")
+    pysurfex_experiment = kwargs.get("pysurfex_experiment")
+    if pysurfex_experiment is None:
+        pysurfex_experiment = f"{os.path.abspath(os.path.dirname(__file__))}/../.."
+        logger.info("Using pysurfex_experiment from environment: {}", pysurfex_experiment)
+
+    base = kwargs.get("base")
+    if base is not None:
+        if kwargs.get("config") is not None or kwargs.get("config_file") is not None:
+            raise RuntimeError("A configuration can not be used with a base experiment")
+        batch = ExperimentBatch.from_experiment(base)
+    else:
+        host = kwargs.get("host")
+        if host is None:
+            raise RuntimeError("You must set a host or a base experiment")
+        batch = ExperimentBatch.from_host(
+            host,
+            f"{os.path.dirname(pysurfex.__file__)}/../",
+            pysurfex_experiment,
+            configuration=kwargs.get("config"),
+            configuration_file=kwargs.get("config_file"),
+            offline_source=kwargs.get("offline_source"),
+            namelist_defs=kwargs.get("namelist_defs"),
+            binary_input_files=kwargs.get("binary_input_files"),
+        )
+
+    experiments = read_overrides(kwargs["overrides"])
+    config_files = batch.write(
+        os.path.abspath(kwargs["root"]),
+        experiments,
+        max_workers=kwargs.get("max_workers"),
+    )
+    install_troika_sites(pysurfex_experiment)
+    logger.info("Set up {} experiments", len(config_files))
+    return config_files
@@ -126,6 +126,9 @@ def parse_surfex_script_setup(argv):
 def surfex_script_setup(**kwargs):
     """Do experiment setup.
 
+    Config files already written by a previous setup are only merged and
+    rewritten again if their input files or settings changed.
+
     Args:
         kwargs (dict): Arguments
 
@@ -188,6 +191,7 @@ def surfex_script_setup(**kwargs):
         configuration=config,
         configuration_file=config_file,
         write_config_files=write_config_files,
+        incremental=write_config_files,
     )
 
     if output_file is None:
@@ -213,6 +217,16 @@ def surfex_script_setup(**kwargs):
         sfx_exp = ExpFromFilesDep(exp_dependencies, config_settings=merged_config)
         sfx_exp.dump_json(output_file, indent=2)
 
+    install_troika_sites(pysurfex_experiment)
+
+
+def install_troika_sites(pysurfex_experiment):
+    """Copy the troika site files of the experiment to troika.
+
+    Args:
+        pysurfex_experiment (str): Pysurfex experiment script system path
+
+    """
     files = [
         f
         for f in (Path(pysurfex_experiment) / "experiment" / "troika" / "sites").iterdir()
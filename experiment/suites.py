@@ -1,11 +1,21 @@
 """Suite for experiment."""
+import bisect
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 from .configuration import Configuration
-from .datetime_utils import ProgressFromConfig, as_datetime, as_timedelta, datetime2ecflow
+from .cycles import CycleCalendar
+from .datetime_utils import (
+    ProgressFromConfig,
+    as_datetime,
+    as_timedelta,
+    datetime2ecflow,
+    ecflow2datetime_string,
+)
 from .logs import GLOBAL_LOGLEVEL, logger
 from .scheduler.submission import TaskSettings, TroikaSettings
 from .scheduler.suites import (
+    EcflowExternalNode,
     EcflowSuite,
     EcflowSuiteFamily,
     EcflowSuiteTask,
@@ -14,6 +24,96 @@ from .scheduler.suites import (
 )
 from .toolbox import Platform
 
+# Cycles do not start more than this ahead of the predictions
+HOURS_AHEAD = as_timedelta("PT24H")
+# Cycle input waits for the post processing of this long ago
+HOURS_BEHIND = as_timedelta("PT24H")
+
+
+class CycleNodes:
+    """Suite nodes of the cycles, sorted by cycle time."""
+
+    def __init__(self):
+        """Construct the object."""
+        self.dtgs = []
+        self.nodes = []
+        self._index = {}
+
+    def __contains__(self, dtg):
+        """Check if a cycle has a node.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+
+        Returns:
+            bool: True if the cycle has a node.
+
+        """
+        return dtg in self._index
+
+    def __getitem__(self, dtg):
+        """Return the node of a cycle.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+
+        Raises:
+            KeyError: If the cycle has no node.
+
+        Returns:
+            EcflowNode: Node.
+
+        """
+        return self._index[dtg]
+
+    def add(self, dtg, node):
+        """Add the node of a cycle.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+            node (EcflowNode): Node.
+
+        """
+        if dtg in self._index:
+            self.nodes[bisect.bisect_left(self.dtgs, dtg)] = node
+        elif len(self.dtgs) == 0 or self.dtgs[-1] < dtg:
+            self.dtgs.append(dtg)
+            self.nodes.append(node)
+        else:
+            position = bisect.bisect_right(self.dtgs, dtg)
+            self.dtgs.insert(position, dtg)
+            self.nodes.insert(position, node)
+        self._index[dtg] = node
+
+    def get(self, dtg, default=None):
+        """Return the node of a cycle.
+
+        Args:
+            dtg (datetime.datetime): Cycle.
+            default (any, optional): Returned if the cycle has no node.
+                Defaults to None.
+
+        Returns:
+            EcflowNode: Node.
+
+        """
+        return self._index.get(dtg, default)
+
+    def at_or_before(self, dtg):
+        """Return the node of the last cycle at or before a time.
+
+        Args:
+            dtg (datetime.datetime): Time.
+
+        Returns:
+            EcflowNode: Node. None if there is no such cycle.
+
+        """
+        position = bisect.bisect_right(self.dtgs, dtg) - 1
+        if position < 0:
+            return None
+        return self.nodes[position]
+
 
 class SurfexSuite:
     """Surfex suite."""
@@ -27,6 +127,8 @@ class SurfexSuite:
         dtgs,
         dtgbeg=None,
         ecf_micro="%",
+        context=None,
+        rolling=False,
     ):
         """Initialize a SurfexSuite object.
 
@@ -39,6 +141,11 @@ class SurfexSuite:
             dtgbeg (as_datetime, optional): First DTG the experiment run.
                                             Defaults to None.
             ecf_micro (str, optional): Ecflow micro. Defaults to "%"
+            context (list, optional): DTGs of the cycle families defined outside
+                of this definition, e.g. already on the server. The cycles of dtgs
+                can trigger on them. Defaults to None.
+            rolling (bool, optional): If this is a rolling suite, where the
+                AdvanceWindow tasks add the next cycles. Defaults to False.
 
         Raises:
             NotImplementedError: Not implmented
@@ -125,6 +232,8 @@ class SurfexSuite:
         self.suite_name = suite_name
         logger.debug("variables: {}", variables)
         self.suite = EcflowSuite(self.suite_name, ecf_files, variables=variables)
+        # Backend-neutral graph of the suite, rendered by the schedulers
+        self.dag = self.suite.dag
 
         if config.get_value("compile.build"):
             comp = EcflowSuiteFamily("Compilation", self.suite, ecf_files)
@@ -211,11 +320,33 @@ class SurfexSuite:
         static_complete = EcflowSuiteTrigger(static_data)
 
         prep_complete = None
-        hours_ahead = 24
-        cycle_input_dtg_node = {}
-        prediction_dtg_node = {}
-        post_processing_dtg_node = {}
+        cycle_input_nodes = CycleNodes()
+        prediction_nodes = CycleNodes()
+        post_processing_nodes = CycleNodes()
+        advance_window_nodes = CycleNodes()
         prev_dtg = None
+        if context is not None:
+            for context_dtg in sorted(context):
+                path = f"/{suite_name}/{datetime2ecflow(context_dtg)}"
+                cycle_input_nodes.add(
+                    context_dtg, EcflowExternalNode(self.suite, f"{path}/CycleInput")
+                )
+                prediction_nodes.add(
+                    context_dtg, EcflowExternalNode(self.suite, f"{path}/Prediction")
+                )
+                post_processing_nodes.add(
+                    context_dtg, EcflowExternalNode(self.suite, f"{path}/PostProcessing")
+                )
+                if rolling:
+                    advance_window_nodes.add(
+                        context_dtg,
+                        EcflowExternalNode(self.suite, f"{path}/AdvanceWindow"),
+                    )
+                if context_dtg < dtgs[0]:
+                    prev_dtg = context_dtg
+            if not rolling and dtgbeg in cycle_input_nodes:
+                path = f"/{suite_name}/{datetime2ecflow(dtgbeg)}/Initialization/Prep"
+                prep_complete = EcflowSuiteTrigger(EcflowExternalNode(self.suite, path))
         for __, dtg in enumerate(dtgs):
             dtg_str = datetime2ecflow(dtg)
             variables = {"DTG": dtg_str, "DTGBEG": dtgbeg_str}
@@ -225,17 +356,12 @@ class SurfexSuite:
                 dtg_str, self.suite, ecf_files, variables=variables, triggers=triggers
             )
 
-            ahead_trigger = None
-            for dtg_str2 in prediction_dtg_node:
-                tname = prediction_dtg_node[dtg_str2]["node"]
-                validtime = as_datetime(prediction_dtg_node[dtg_str2]["dtg"])
-                if validtime < dtg:
-                    if validtime + as_timedelta(f"PT{hours_ahead}H") <= dtg:
-                        ahead_trigger = EcflowSuiteTrigger(tname)
-
-            if ahead_trigger is None:
+            # Do not run more than HOURS_AHEAD ahead of the predictions
+            ahead_node = prediction_nodes.at_or_before(dtg - HOURS_AHEAD)
+            if ahead_node is None:
                 triggers = EcflowSuiteTriggers([static_complete])
             else:
+                ahead_trigger = EcflowSuiteTrigger(ahead_node)
                 triggers = EcflowSuiteTriggers([static_complete, ahead_trigger])
 
             prepare_cycle = EcflowSuiteTask(
@@ -254,7 +380,7 @@ class SurfexSuite:
             cycle_input = EcflowSuiteFamily(
                 "CycleInput", dtg_node, ecf_files, triggers=triggers
             )
-            cycle_input_dtg_node.update({dtg_str: cycle_input})
+            cycle_input_nodes.add(dtg, cycle_input)
 
             forcing = EcflowSuiteTask(
                 "Forcing",
@@ -264,6 +390,18 @@ class SurfexSuite:
                 ecf_files,
                 input_template=template,
             )
+            # Prefetching needs an input cache to fetch into
+            if config.get_value("general.prefetch.cycles", default=0) > 0 and (
+                config.get_value("general.input_cache.directory", default="")
+            ):
+                EcflowSuiteTask(
+                    "Prefetch",
+                    cycle_input,
+                    config,
+                    task_settings,
+                    ecf_files,
+                    input_template=template,
+                )
             triggers = EcflowSuiteTriggers([EcflowSuiteTrigger(forcing)])
             if config.get_value("forcing.modify_forcing"):
                 EcflowSuiteTask(
@@ -278,8 +416,7 @@ class SurfexSuite:
 
             triggers = EcflowSuiteTriggers([static_complete, prepare_cycle_complete])
             if prev_dtg is not None:
-                prev_dtg_str = datetime2ecflow(prev_dtg)
-                trigger = EcflowSuiteTrigger(prediction_dtg_node[prev_dtg_str]["node"])
+                trigger = EcflowSuiteTrigger(prediction_nodes[prev_dtg])
                 triggers.add_triggers([trigger])
 
             # Initialization
@@ -297,7 +434,10 @@ class SurfexSuite:
                     ecf_files,
                     input_template=template,
                 )
-                prep_complete = EcflowSuiteTrigger(prep)
+                # The family of Prep is removed from a rolling suite. The later
+                # cycles depend on it through the previous prediction.
+                if not rolling:
+                    prep_complete = EcflowSuiteTrigger(prep)
                 # Might need an extra trigger for input
 
             else:
@@ -354,9 +494,9 @@ class SurfexSuite:
                         triggers = None
                         fgint = settings.get_fgint(realization=realization)
                         fg_dtg = dtg - fgint
-                        if fg_dtg in cycle_input_dtg_node:
+                        if fg_dtg in cycle_input_nodes:
                             triggers = EcflowSuiteTriggers(
-                                EcflowSuiteTrigger(cycle_input_dtg_node[fg_dtg])
+                                EcflowSuiteTrigger(cycle_input_nodes[fg_dtg])
                             )
 
                         name = "REF"
@@ -624,7 +764,7 @@ class SurfexSuite:
             prediction = EcflowSuiteFamily(
                 "Prediction", dtg_node, ecf_files, triggers=triggers
             )
-            prediction_dtg_node.update({dtg_str: {"node": prediction, "dtg": dtg}})
+            prediction_nodes.add(dtg, prediction)
 
             forecast = EcflowSuiteTask(
                 "Forecast",
@@ -649,7 +789,7 @@ class SurfexSuite:
             pp_fam = EcflowSuiteFamily(
                 "PostProcessing", dtg_node, ecf_files, triggers=triggers
             )
-            post_processing_dtg_node.update({dtg_str: pp_fam})
+            post_processing_nodes.add(dtg, pp_fam)
 
             log_pp_trigger = None
             if analysis is not None:
@@ -674,17 +814,30 @@ class SurfexSuite:
                 input_template=template,
             )
 
+            if rolling:
+                # One AdvanceWindow at a time, they read and change the same suite
+                triggers = EcflowSuiteTriggers(EcflowSuiteTrigger(prediction))
+                if prev_dtg in advance_window_nodes:
+                    trigger = EcflowSuiteTrigger(advance_window_nodes[prev_dtg])
+                    triggers.add_triggers([trigger])
+                advance_window_task = EcflowSuiteTask(
+                    "AdvanceWindow",
+                    dtg_node,
+                    config,
+                    task_settings,
+                    ecf_files,
+                    triggers=triggers,
+                    input_template=template,
+                )
+                advance_window_nodes.add(dtg, advance_window_task)
+
             prev_dtg = dtg
 
-        hours_behind = 24
         for dtg in dtgs:
-            dtg_str = datetime2ecflow(dtg)
-            pp_dtg_str = datetime2ecflow(dtg - as_timedelta(f"PT{hours_behind}H"))
-            if pp_dtg_str in post_processing_dtg_node:
-                triggers = EcflowSuiteTriggers(
-                    EcflowSuiteTrigger(post_processing_dtg_node[pp_dtg_str])
-                )
-                cycle_input_dtg_node[dtg_str].add_part_trigger(triggers)
+            pp_node = post_processing_nodes.get(dtg - HOURS_BEHIND)
+            if pp_node is not None:
+                triggers = EcflowSuiteTriggers(EcflowSuiteTrigger(pp_node))
+                cycle_input_nodes[dtg].add_part_trigger(triggers)
 
     def save_as_defs(self, def_file):
         """Save definition file.
@@ -696,6 +849,316 @@ class SurfexSuite:
         self.suite.save_as_defs(def_file)
 
 
+class ParallelSurfexSuite:
+    """Surfex suite with the cycles built in parallel processes."""
+
+    def __init__(
+        self, suite_name, config, dtgs, dtgbeg=None, max_workers=None, chunk_cycles=1000
+    ):
+        """Build the suite definition.
+
+        The DTGs are split in chunks, and each process builds a SurfexSuite of a
+        chunk. The cycles of a chunk trigger on the cycles of the previous chunk
+        as external nodes. The definitions of the chunks are then merged into one
+        suite.
+
+        Args:
+            suite_name (str): Name of the suite
+            config (ParsedConfig): Parsed configuration
+            dtgs (list): The DTGs you want to run
+            dtgbeg (as_datetime, optional): First DTG the experiment run.
+                Defaults to None.
+            max_workers (int, optional): Processes. Defaults to None, or 0, which
+                use all CPUs.
+            chunk_cycles (int, optional): Cycles in a chunk. Defaults to 1000.
+
+        """
+        self.suite_name = suite_name
+        if dtgbeg is None:
+            dtgbeg = dtgs[0]
+        if max_workers == 0:
+            max_workers = None
+        chunks = chunk_dtgs(dtgs, chunk_cycles, dtgbeg=dtgbeg)
+        logger.info("Build {} cycles in {} chunks", len(dtgs), len(chunks))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    _chunk_defs_text, suite_name, config, chunk, dtgbeg, context
+                )
+                for chunk, context in chunks
+            ]
+            self.def_text = stitch_defs([future.result() for future in futures])
+
+    def save_as_defs(self, def_file):
+        """Save definition file.
+
+        Args:
+            def_file (str): Name of the definition file.
+        """
+        with open(def_file, mode="w", encoding="utf-8") as fhandler:
+            fhandler.write(self.def_text)
+        logger.info("def file saved to {}", def_file)
+
+
+def _chunk_defs_text(suite_name, config, dtgs, dtgbeg, context):
+    """Build the definition of a chunk of cycles.
+
+    Args:
+        suite_name (str): Name of the suite
+        config (ParsedConfig): Parsed configuration
+        dtgs (list): DTGs of the chunk.
+        dtgbeg (datetime.datetime): First DTG the experiment run.
+        context (list): DTGs of the previous cycles the chunk can trigger on.
+
+    Returns:
+        str: Definition of the suite with the cycles of the chunk.
+
+    """
+    joboutdir = Platform(config).get_system_value("joboutdir")
+    suite = SurfexSuite(
+        suite_name,
+        config,
+        joboutdir,
+        TaskSettings(config),
+        dtgs,
+        dtgbeg=dtgbeg,
+        context=context,
+    )
+    return suite.suite.defs_text()
+
+
+def chunk_dtgs(dtgs, chunk_cycles, dtgbeg=None):
+    """Split the cycles of a suite in chunks.
+
+    Args:
+        dtgs (list): Sorted DTGs of the suite.
+        chunk_cycles (int): Cycles in a chunk.
+        dtgbeg (datetime.datetime, optional): First DTG the experiment run.
+            Defaults to None.
+
+    Returns:
+        list: The DTGs of each chunk, and the DTGs of the previous cycles the
+            chunk can trigger on.
+
+    """
+    chunks = []
+    for first in range(0, len(dtgs), chunk_cycles):
+        chunk = dtgs[first : first + chunk_cycles]
+        context = []
+        if first > 0:
+            # The triggers reach back at most a day, to a cycle within two days
+            oldest = chunk[0] - max(HOURS_AHEAD, HOURS_BEHIND) * 2
+            context = dtgs[bisect.bisect_left(dtgs, oldest, hi=first) : first]
+            if dtgbeg is not None and dtgbeg < oldest and dtgbeg in dtgs[:first]:
+                context.insert(0, dtgbeg)
+        chunks.append((chunk, context))
+    return chunks
+
+
+def stitch_defs(def_texts):
+    """Merge the definitions of the chunks of a suite.
+
+    The first definition is used for the suite, and the cycle families of the
+    others are appended to it. The externs to the other chunks are removed.
+
+    Args:
+        def_texts (list): Definitions of the suite with the cycles of each chunk.
+
+    Returns:
+        str: Definition of the suite with all cycles.
+
+    """
+    lines = [line for line in def_texts[0].splitlines() if not _is_extern(line)]
+    end = max(index for index, line in enumerate(lines) if line.split() == ["endsuite"])
+    families = []
+    for def_text in def_texts[1:]:
+        families += _cycle_family_lines(def_text)
+    return "\n".join(lines[:end] + families + lines[end:]) + "\n"
+
+
+def _is_extern(line):
+    """Check if a definition line is an extern."""
+    return line.split()[:1] == ["extern"]
+
+
+def _cycle_family_lines(def_text):
+    """Return the lines of the cycle families in a suite definition.
+
+    Args:
+        def_text (str): Suite definition.
+
+    Returns:
+        list: Lines of the cycle families.
+
+    """
+    lines = []
+    depth = 0
+    for line in def_text.splitlines():
+        tokens = line.split()
+        if len(tokens) == 0:
+            continue
+        if depth == 0:
+            if tokens[0] == "family" and len(family_dtgs(tokens[1:2])) == 1:
+                lines.append(line)
+                depth = 1
+        else:
+            lines.append(line)
+            if tokens[0] == "family":
+                depth += 1
+            elif tokens[0] == "endfamily":
+                depth -= 1
+    return lines
+
+
+def get_suite_name(config):
+    """Return the ecflow suite name of an experiment.
+
+    Args:
+        config (ParsedConfig): Parsed configuration
+
+    Returns:
+        str: Suite name.
+
+    """
+    name = config.get_value("general.case")
+    suite_name = name.replace("-", "_")
+    return suite_name.replace(".", "_")
+
+
+def window_settings(config):
+    """Return the settings of a rolling suite.
+
+    Args:
+        config (ParsedConfig): Parsed configuration
+
+    Returns:
+        tuple: The number of cycle families in the suite, 0 for all cycles, and
+            the number of completed cycle families kept in the suite.
+
+    """
+    cycles = int(config.get_value("general.window.cycles", default=0))
+    keep = int(config.get_value("general.window.keep", default=8))
+    return cycles, keep
+
+
+def family_dtgs(families):
+    """Return the DTGs of the cycle families of a suite.
+
+    Args:
+        families (list): Family names on the server.
+
+    Returns:
+        dict: DTG by family name of the cycle families.
+
+    """
+    dtgs = {}
+    for name in families:
+        if len(name) == 12 and name.isdigit():
+            dtgs[name] = as_datetime(ecflow2datetime_string(name))
+    return dtgs
+
+
+def advance_window(calendar, dtg, families, cycles, keep):
+    """Find the cycle families to add to and remove from a rolling suite.
+
+    The suite holds the cycles up to the given number of cycles after dtg. The
+    completed families older than keep cycles are removed, except those the
+    later cycles can trigger on.
+
+    Args:
+        calendar (CycleCalendar): Cycles of the experiment.
+        dtg (datetime.datetime): Completed cycle.
+        families (dict): The state of the families on the server, by name.
+        cycles (int): Cycle families in the suite.
+        keep (int): Completed cycle families kept in the suite.
+
+    Returns:
+        tuple: DTGs of the cycles to add, and names of the families to remove.
+
+    """
+    existing = family_dtgs(families)
+    existing_dtgs = set(existing.values())
+    add_dtgs = []
+    for cycle in range(1, cycles + 1):
+        next_dtg = calendar.shift(dtg, cycle)
+        if next_dtg > calendar.end:
+            break
+        if next_dtg not in existing_dtgs:
+            add_dtgs.append(next_dtg)
+
+    # Oldest prediction a later cycle can trigger on
+    ahead = calendar.previous(dtg - HOURS_AHEAD + as_timedelta("PT1S"))
+    oldest = min(calendar.shift(dtg, -keep), ahead)
+    retire = [
+        name
+        for name, family_dtg in existing.items()
+        if family_dtg < oldest and families[name] == "complete"
+    ]
+    return add_dtgs, sorted(retire)
+
+
+def get_window_defs(config, suite_type, dtgs, context):
+    """Get the definitions of new cycles of a rolling suite.
+
+    Args:
+        config (ParsedConfig): Parsed configuration
+        suite_type (str): What kind of suite
+        dtgs (list): DTGs of the new cycles.
+        context (list): DTGs of the cycle families already on the server.
+
+    Raises:
+        NotImplementedError: Suite type not implemented
+
+    Returns:
+        SurfexSuite: Suite definition with the new cycle families.
+
+    """
+    suite_name = get_suite_name(config)
+    joboutdir = Platform(config).get_system_value("joboutdir")
+    task_settings = TaskSettings(config)
+    starttime = ProgressFromConfig(config).starttime
+    if suite_type == "surfex":
+        return SurfexSuite(
+            suite_name,
+            config,
+            joboutdir,
+            task_settings,
+            dtgs,
+            dtgbeg=starttime,
+            context=context,
+            rolling=True,
+        )
+    raise NotImplementedError(f"Suite definition for {suite_type} is not implemented!")
+
+
+def get_calendar(config):
+    """Get the cycles of the experiment.
+
+    The cycles are every general.times.cycle_length from general.times.basetime,
+    the interval the tasks use as fcint and fgint.
+
+    Args:
+        config (ParsedConfig): Parsed configuration
+
+    Raises:
+        ValueError: If the basetime is not a cycle of the experiment.
+
+    Returns:
+        CycleCalendar: Cycles from the basetime to the end.
+
+    """
+    progress = ProgressFromConfig(config)
+    calendar = CycleCalendar.from_config(
+        config, start=progress.basetime, end=progress.endtime
+    )
+    if progress.basetime not in calendar:
+        raise ValueError(
+            f"Basetime {progress.basetime} is not a cycle of the experiment ending "
+            f"{progress.endtime}"
+        )
+    return calendar
+
+
 def get_defs(config, suite_type):
     """Get the definitions.
 
@@ -710,9 +1173,7 @@ def get_defs(config, suite_type):
         SuiteDefinition: A suite definitition
     """
     name = config.get_value("general.case")
-    settings = Configuration(config)
-    suite_name = name.replace("-", "_")
-    suite_name = suite_name.replace(".", "_")
+    suite_name = get_suite_name(config)
     logger.debug("Config name {}", name)
     logger.debug("Get defs for {}", suite_name)
 
@@ -720,28 +1181,72 @@ def get_defs(config, suite_type):
     platform = Platform(config)
     joboutdir = platform.get_system_value("joboutdir")
     task_settings = TaskSettings(config)
-    unique_cycles = settings.get_total_unique_cycle_list()
     progress = ProgressFromConfig(config)
     basetime = progress.basetime
     starttime = progress.starttime
     endtime = progress.endtime
     logger.debug("DTGSTART: {} DTGBEG: {} DTGEND: {}", basetime, starttime, endtime)
-    basetime_list = []
-    dtg = basetime
     logger.debug("Building list of DTGs")
-    cont = True
-    while cont:
-        for cycle in unique_cycles:
-            while dtg <= endtime:
-                basetime_list.append(dtg)
-                logger.debug("DTG: {}, fcint: {}", dtg, cycle)
-                dtg = dtg + cycle
-            if dtg >= endtime:
-                cont = False
-
+    basetime_list = get_calendar(config).basetimes()
+    rolling = False
+    cycles, __ = window_settings(config)
+    if cycles > 0:
+        # Rolling suite, the AdvanceWindow tasks add the next cycles
+        logger.info("Rolling suite with {} cycles", cycles)
+        basetime_list = basetime_list[:cycles]
+        rolling = True
     logger.debug("Built DTGS: {}", basetime_list)
     if suite_type == "surfex":
+        max_workers = config.get_value("general.suite.max_workers", default=1)
+        chunk_cycles = config.get_value("general.suite.chunk_cycles", default=1000)
+        if not rolling and max_workers != 1 and len(basetime_list) > chunk_cycles:
+            return ParallelSurfexSuite(
+                suite_name,
+                config,
+                basetime_list,
+                dtgbeg=starttime,
+                max_workers=max_workers,
+                chunk_cycles=chunk_cycles,
+            )
         return SurfexSuite(
-            suite_name, config, joboutdir, task_settings, basetime_list, dtgbeg=starttime
+            suite_name,
+            config,
+            joboutdir,
+            task_settings,
+            basetime_list,
+            dtgbeg=starttime,
+            rolling=rolling,
         )
     raise NotImplementedError(f"Suite definition for {suite_type} is not implemented!")
+
+
+def get_dag(config, suite_type):
+    """Get the workflow graph of all cycles of the experiment.
+
+    Used to run the suite without a scheduler, so the suite is neither rolling
+    nor built in parallel.
+
+    Args:
+        config (ParsedConfig): Parsed configuration
+        suite_type (str): What kind of suite
+
+    Raises:
+        NotImplementedError: Suite type not implemented
+
+    Returns:
+        SuiteDag: Graph of the suite.
+
+    """
+    if suite_type != "surfex":
+        raise NotImplementedError(
+            f"Suite definition for {suite_type} is not implemented!"
+        )
+    suite = SurfexSuite(
+        get_suite_name(config),
+        config,
+        Platform(config).get_system_value("joboutdir"),
+        TaskSettings(config),
+        get_calendar(config).basetimes(),
+        dtgbeg=ProgressFromConfig(config).starttime,
+    )
+    return suite.dag
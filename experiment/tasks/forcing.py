@@ -5,8 +5,10 @@ import os
 import yaml
 from pysurfex.forcing import modify_forcing, run_time_loop, set_forcing_config
 
+from ..field_cache import forcing_field_cache
 from ..logs import logger
 from ..tasks.tasks import AbstractTask
+from .inputs import localized_forcing_pattern
 
 
 class Forcing(AbstractTask):
@@ -66,7 +68,9 @@ class Forcing(AbstractTask):
         kwargs.update({"of": output})
         kwargs.update({"output_format": output_format})
 
-        pattern = self.config.get_value("forcing.pattern")
+        pattern = localized_forcing_pattern(
+            self.fmanager, self.dtg, self.fcint, self.wdir + "/prefetched"
+        )
         input_format = self.config.get_value("forcing.input_format")
         kwargs.update({"geo_input_file": self.config.get_value("forcing.input_geo_file")})
         zref = self.config.get_value("forcing.zref")
@@ -115,7 +119,8 @@ class Forcing(AbstractTask):
             logger.info("Output already exists: {}", output)
         else:
             options, var_objs, att_objs = set_forcing_config(**kwargs)
-            run_time_loop(options, var_objs, att_objs)
+            with forcing_field_cache(self.config, geo=self.geo):
+                run_time_loop(options, var_objs, att_objs)
 
 
 class ModifyForcing(AbstractTask):
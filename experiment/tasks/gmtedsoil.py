@@ -3,8 +3,7 @@ import os
 import sys
 import time
 
-import numpy as np
-
+from ..domains import bbox_from_ranges, catalogue_domain_properties
 from ..logs import logger
 from ..tasks.tasks import AbstractTask
 
@@ -118,33 +117,27 @@ class Search:
         return files
 
 
-def get_domain_properties(geo):
+def get_domain_properties(geo, config=None):
     """Get domain properties.
 
+    The properties of a domain from the domain catalogue are looked up without
+    building the geometry.
+
     Args:
-        geo (_type_): _description_
+        geo (pysurfex.geo.Geo or callable): Geometry, or a function returning it,
+            used if the domain is not in the catalogue.
+        config (ParsedConfig, optional): Configuration. Defaults to None.
 
     Returns:
-        dict: _description_
+        dict: Bounding box with a margin, "minlat", "minlon", "maxlat" and "maxlon".
     """
-    minlat = geo.latrange[0] - 1
-    minlon = geo.lonrange[0] - 1
-    maxlat = geo.latrange[1] + 1
-    maxlon = geo.lonrange[1] + 1
-
-    minlat = np.max([minlat, -90])
-    minlon = np.max([minlon, -180])
-    maxlat = np.min([maxlat, 90])
-    maxlon = np.min([maxlon, 180])
-
-    domain_properties = {
-        "minlat": minlat,
-        "minlon": minlon,
-        "maxlat": maxlat,
-        "maxlon": maxlon,
-    }
-
-    return domain_properties
+    if config is not None:
+        properties = catalogue_domain_properties(config)
+        if properties is not None:
+            return properties["bbox"]
+    if callable(geo):
+        geo = geo()
+    return bbox_from_ranges(geo.lonrange, geo.latrange)
 
 
 class Gmted(AbstractTask):
@@ -310,7 +303,7 @@ class Gmted(AbstractTask):
         climdir = self.platform.get_system_value("climdir")
         os.makedirs(climdir, exist_ok=True)
 
-        domain_properties = get_domain_properties(self.geo)
+        domain_properties = get_domain_properties(lambda: self.geo, self.config)
 
         tif_files, hdr_east, hdr_west, hdr_south, hdr_north = self.define_gmted_input(
             domain_properties
@@ -494,16 +487,17 @@ class Soil(AbstractTask):
             raise FileNotFoundError(f"No soilgrid tifs found under {soilgrid_path}")
 
         # symlink with filemanager from toolbox
-        for soilgrid_tif in soilgrid_tifs:
-            soilgrid_tif_basename = os.path.basename(soilgrid_tif)
-            self.fmanager.input(
-                soilgrid_tif,
-                soilgrid_tif_basename,
-                check_archive=False,
-                provider_id="symlink",
-            )
-
-        domain_properties = get_domain_properties(self.geo)
+        transfers = [
+            (soilgrid_tif, os.path.basename(soilgrid_tif))
+            for soilgrid_tif in soilgrid_tifs
+        ]
+        for status in self.fmanager.input_many(
+            transfers, check_archive=False, provider_id="symlink"
+        ):
+            if not status.success:
+                raise status.error
+
+        domain_properties = get_domain_properties(lambda: self.geo, self.config)
         self.check_domain_validity(domain_properties)
 
         # Get coordinates for cutting dataset
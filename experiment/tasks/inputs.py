@@ -0,0 +1,146 @@
+"""Input files of the cycle tasks.
+
+The paths are expanded here for the tasks reading the inputs and for the
+Prefetch task fetching them into the input cache ahead of the cycle.
+"""
+from ..datetime_utils import as_timedelta
+
+# Variables read by FirstGuess4OI
+FG4OI_VARIABLES = [
+    "air_temperature_2m",
+    "relative_humidity_2m",
+    "surface_snow_thickness",
+    "altitude",
+    "land_area_fraction",
+]
+
+
+def fg4oi_setting(config, var, setting):
+    """Return a first guess setting for a variable.
+
+    Settings in initial_conditions.fg4oi.<var> override the ones in
+    initial_conditions.fg4oi.
+
+    Args:
+        config (ParsedConfig): Configuration
+        var (str): Variable name.
+        setting (str): Setting.
+
+    Returns:
+        any: The setting.
+
+    """
+    try:
+        return config.get_value(f"initial_conditions.fg4oi.{var.lower()}.{setting}")
+    except AttributeError:
+        return config.get_value(f"initial_conditions.fg4oi.{setting}")
+
+
+def fg4oi_inputfile(config, platform, var, basetime, validtime):
+    """Return the first guess input file of a variable.
+
+    Args:
+        config (ParsedConfig): Configuration
+        platform (Platform): Platform
+        var (str): Variable name.
+        basetime (datetime.datetime): Base time of the first guess.
+        validtime (datetime.datetime): Valid time.
+
+    Returns:
+        str: Input file.
+
+    """
+    inputfile = fg4oi_setting(config, var, "inputfile")
+    return platform.substitute(inputfile, basetime=basetime, validtime=validtime)
+
+
+def forcing_inputs(config, platform, basetime, fcint):
+    """Return the forcing source files of a cycle.
+
+    The pattern is expanded for every forcing time step of the cycle, like
+    pysurfex does for analyses.
+
+    Args:
+        config (ParsedConfig): Configuration
+        platform (Platform): Platform
+        basetime (datetime.datetime): Base time of the cycle.
+        fcint (datetime.timedelta): Cycle length.
+
+    Returns:
+        list: Source files.
+
+    """
+    pattern = config.get_value("forcing.pattern")
+    timestep = as_timedelta(f"PT{int(config.get_value('forcing.timestep'))}S")
+    validtimes = []
+    validtime = basetime
+    while validtime <= basetime + fcint:
+        validtimes.append(validtime)
+        validtime += timestep
+    return platform.substitute_many(pattern, validtimes, validtimes)
+
+
+def localized_forcing_pattern(fmanager, basetime, fcint, directory):
+    """Return the forcing pattern, pointed to the input cache if possible.
+
+    The pattern is only pointed to local copies if all the source files of the
+    cycle are in the input cache. URLs and patterns with lead times are left
+    unchanged, as pysurfex may read other files than the analyses of the cycle.
+
+    Args:
+        fmanager (FileManager): File manager
+        basetime (datetime.datetime): Base time of the cycle.
+        fcint (datetime.timedelta): Cycle length.
+        directory (str): Directory for the local copies.
+
+    Returns:
+        str: Forcing pattern.
+
+    """
+    pattern = fmanager.config.get_value("forcing.pattern")
+    if not pattern.startswith("/") or "@L" in pattern.upper():
+        return pattern
+    sources = forcing_inputs(fmanager.config, fmanager.platform, basetime, fcint)
+    localized = fmanager.localize(sources, directory)
+    if len(localized) < len(set(sources)):
+        return pattern
+    return directory.rstrip("/") + pattern
+
+
+def cryo_inputs(config, platform, basetime):
+    """Return the cryoclim observation files of a cycle.
+
+    Args:
+        config (ParsedConfig): Configuration
+        platform (Platform): Platform
+        basetime (datetime.datetime): Base time of the cycle.
+
+    Returns:
+        list: Observation files.
+
+    """
+    obs_file = config.get_value("observations.cryo_filepattern")
+    return [platform.substitute(obs_file, basetime=basetime, validtime=basetime)]
+
+
+def cycle_inputs(config, platform, basetime, fcint, fgint):
+    """Return the input files of a cycle that can be prefetched.
+
+    Args:
+        config (ParsedConfig): Configuration
+        platform (Platform): Platform
+        basetime (datetime.datetime): Base time of the cycle.
+        fcint (datetime.timedelta): Cycle length.
+        fgint (datetime.timedelta): First guess interval.
+
+    Returns:
+        list: Input files.
+
+    """
+    inputs = forcing_inputs(config, platform, basetime, fcint)
+    inputs += [
+        fg4oi_inputfile(config, platform, var, basetime - fgint, basetime)
+        for var in FG4OI_VARIABLES
+    ]
+    inputs += cryo_inputs(config, platform, basetime)
+    return list(dict.fromkeys(inputs))
@@ -303,7 +303,7 @@ class Pgd(SurfexBinaryTask):
         output = f"{self.platform.get_system_value('climdir')}/{pgdfile}"
         binary = self.bindir + "/PGD" + self.xyz
 
-        if not os.path.exists(output) or self.force:
+        if not self.fmanager.exists(output) or self.force:
             SurfexBinaryTask.execute_binary(self, binary=binary, output=output)
         else:
             print("Output already exists: ", output)
@@ -351,7 +351,7 @@ class Prep(SurfexBinaryTask):
         output = f"{self.platform.substitute(archive, basetime=self.dtg)}/{prepfile}"
         binary = self.bindir + "/PREP" + self.xyz
 
-        if not os.path.exists(output) or self.force:
+        if not self.fmanager.exists(output) or self.force:
             SurfexBinaryTask.execute_binary(
                 self,
                 binary,
@@ -421,7 +421,7 @@ class Forecast(SurfexBinaryTask):
         forcing_dir = self.platform.substitute(forcing_dir, basetime=self.basetime)
         self.exp_file_paths.add_system_file_path("forcing_dir", forcing_dir)
 
-        if not os.path.exists(output) or self.force:
+        if not self.fmanager.exists(output) or self.force:
             SurfexBinaryTask.execute_binary(
                 self,
                 binary,
@@ -476,7 +476,7 @@ class PerturbedRun(SurfexBinaryTask):
         forcing_dir = self.platform.substitute(forcing_dir, basetime=self.fg_dtg)
         self.exp_file_paths.add_system_file_path("forcing_dir", forcing_dir)
 
-        if not os.path.exists(output) or self.force:
+        if not self.fmanager.exists(output) or self.force:
             SurfexBinaryTask.execute_binary(
                 self,
                 binary,
@@ -522,7 +522,7 @@ class Soda(SurfexBinaryTask):
             first_guess_dir = self.platform.substitute(archive_dir, basetime=self.fg_dtg)
             self.exp_file_paths.add_system_file_path("first_guess_dir", first_guess_dir)
 
-        if not os.path.exists(output) or self.force:
+        if not self.fmanager.exists(output) or self.force:
             SurfexBinaryTask.execute_binary(
                 self,
                 binary,
@@ -5,10 +5,10 @@ import json
 import os
 import shutil
 import socket
+from functools import cached_property
 
 import numpy as np
 import yaml
-from pysurfex.cache import Cache
 from pysurfex.file import SurfFileTypeExtension
 from pysurfex.geo import ConfProj, get_geo_object
 from pysurfex.input_methods import get_datasources
@@ -27,10 +27,18 @@ from pysurfex.titan import TitanDataSet, dataset_from_file, define_quality_contr
 
 from ..config_parser import ParsedConfig
 from ..configuration import Configuration
-from ..datetime_utils import as_datetime, as_timedelta, datetime_as_string
+from ..datetime_utils import (
+    as_datetime,
+    as_timedelta,
+    datetime2ecflow,
+    datetime_as_string,
+)
 from ..experiment import ExpFromConfig
+from ..field_cache import get_field_cache
 from ..logs import logger
-from ..toolbox import FileManager
+from ..scheduler.scheduler import EcflowServerFromConfig
+from ..toolbox import ArchiveError, FileManager
+from .inputs import cryo_inputs, cycle_inputs, fg4oi_inputfile
 
 
 class AbstractTask(object):
@@ -50,7 +58,7 @@ class AbstractTask(object):
         self.config = config
         self.name = name
         logger.debug("Create task")
-        self.fmanager = FileManager(self.config)
+        self.fmanager = FileManager(self.config, task=self.name)
         self.platform = self.fmanager.platform
         self.settings = Configuration(self.config)
         self.dtg = as_datetime(config.get_value("general.times.basetime"))
@@ -78,8 +86,8 @@ class AbstractTask(object):
         self.mbr = mbr
         self.members = self.config.get_value("general.realizations")
 
-        # Domain/geo
-        conf_proj = {
+        # Domain/geo. The geometry is built on first use, see geo
+        self.conf_proj = {
             "nam_conf_proj_grid": {
                 "nimax": self.config.get_value("domain.nimax"),
                 "njmax": self.config.get_value("domain.njmax"),
@@ -96,8 +104,7 @@ class AbstractTask(object):
             },
         }
 
-        self.geo = ConfProj(conf_proj)
-        self.fmanager = FileManager(config)
+        self.fmanager = FileManager(config, task=self.name)
         self.platform = self.fmanager.platform
         wrapper = self.config.get_value("task.wrapper")
         if wrapper is None:
@@ -164,6 +171,15 @@ class AbstractTask(object):
         self.config = self.config.copy(update=update)
         logger.debug("NNCO: {}", self.nnco)
 
+    @cached_property
+    def geo(self):
+        """pysurfex.geo.ConfProj: Geometry of the domain.
+
+        Built on first use, as tasks only needing the domain bounding box get it
+        from the domain catalogue.
+        """
+        return ConfProj(self.conf_proj)
+
     def create_wdir(self):
         """Create task working directory."""
         os.makedirs(self.wdir, exist_ok=True)
@@ -211,6 +227,22 @@ class AbstractTask(object):
 
         """
         logger.debug("Base class post")
+        stat_cache = self.fmanager.stat_cache
+        if stat_cache is not None:
+            logger.info(
+                "Stat cache: {} checks, {} stat calls avoided",
+                stat_cache.counts["checks"],
+                stat_cache.stat_calls_avoided,
+            )
+        metrics = self.fmanager.metrics
+        if metrics is not None and metrics.totals["transfers"] > 0:
+            logger.info(
+                "Transfers: {} files, {:.1f} MB in {:.2f} s. Metrics in {}",
+                metrics.totals["transfers"],
+                metrics.totals["bytes"] / 1e6,
+                metrics.totals["seconds"],
+                metrics.path,
+            )
         # Clean workdir
         if self.config.get_value("general.keep_workdirs"):
             self.rename_wdir(prefix=f"Finished_task_{self.pid}_")
@@ -631,8 +663,9 @@ class CryoClim2json(AbstractTask):
             input_file, var
         )
 
-        obs_file = self.config.get_value("observations.cryo_filepattern")
-        obs_file = [self.platform.substitute(obs_file)]
+        obs_file = cryo_inputs(self.config, self.platform, self.dtg)
+        localized = self.fmanager.localize(obs_file, self.wdir + "/prefetched")
+        obs_file = [localized.get(filename, filename) for filename in obs_file]
         try:
             laf_threshold = self.config.get_value("observations.cryo_laf_threshold")
         except AttributeError:
@@ -881,7 +914,7 @@ class FirstGuess4OI(AbstractTask):
 
         output = self.archive + "/raw" + extra + ".nc"
         cache_time = 3600
-        cache = Cache(cache_time)
+        cache = get_field_cache(self.config, cache_time, geo=self.geo)
         if os.path.exists(output):
             logger.info("Output already exists {}", output)
         else:
@@ -911,16 +944,11 @@ class FirstGuess4OI(AbstractTask):
         f_g = None
         for var in variables:
             lvar = var.lower()
-            try:
-                identifier = "initial_conditions.fg4oi." + lvar + "."
-                inputfile = self.config.get_value(identifier + "inputfile")
-            except AttributeError:
-                identifier = "initial_conditions.fg4oi."
-                inputfile = self.config.get_value(identifier + "inputfile")
-
-            inputfile = self.platform.substitute(
-                inputfile, basetime=self.fg_dtg, validtime=self.dtg
+            inputfile = fg4oi_inputfile(
+                self.config, self.platform, var, self.fg_dtg, self.dtg
             )
+            localized = self.fmanager.localize([inputfile], self.wdir + "/prefetched")
+            inputfile = localized.get(inputfile, inputfile)
 
             try:
                 identifier = "initial_conditions.fg4oi." + lvar + "."
@@ -1041,6 +1069,60 @@ class LogProgress(AbstractTask):
         sfx_exp.dump_json(config_file, indent=2)
 
 
+class AdvanceWindow(AbstractTask):
+    """Advance the cycles of a rolling suite.
+
+    Adds the cycle families up to general.window.cycles cycles ahead and removes
+    the old completed ones.
+
+    Args:
+        AbstractTask (_type_): _description_
+    """
+
+    def __init__(self, config):
+        """Construct the AdvanceWindow task.
+
+        Args:
+            config (ParsedObject): Parsed configuration
+
+        """
+        AbstractTask.__init__(self, config, "AdvanceWindow")
+
+    def execute(self):
+        """Execute."""
+        # The suites import the task discovery
+        from ..suites import (
+            advance_window,
+            family_dtgs,
+            get_calendar,
+            get_suite_name,
+            get_window_defs,
+            window_settings,
+        )
+
+        cycles, keep = window_settings(self.config)
+        if cycles <= 0:
+            logger.info("Not a rolling suite")
+            return
+
+        calendar = get_calendar(self.config)
+        suite_name = get_suite_name(self.config)
+        server = EcflowServerFromConfig(self.config)
+        families = server.suite_families(suite_name)
+        add_dtgs, retire = advance_window(calendar, self.dtg, families, cycles, keep)
+        if len(add_dtgs) > 0:
+            context = [
+                dtg for name, dtg in family_dtgs(families).items() if name not in retire
+            ]
+            defs = get_window_defs(self.config, "surfex", add_dtgs, context)
+            def_file = f"{self.wdir}/{suite_name}_window.def"
+            defs.save_as_defs(def_file)
+            paths = [f"/{suite_name}/{datetime2ecflow(dtg)}" for dtg in add_dtgs]
+            server.add_nodes(paths, def_file)
+        if len(retire) > 0:
+            server.remove_nodes([f"/{suite_name}/{name}" for name in retire])
+
+
 class LogProgressPP(AbstractTask):
     """Log progress for PP restart.
 
@@ -1067,6 +1149,71 @@ class LogProgressPP(AbstractTask):
         sfx_exp.dump_json(config_file, indent=2)
 
 
+class Archive(AbstractTask):
+    """Archive the data in the archive queue.
+
+    Args:
+        AbstractTask (_type_): _description_
+    """
+
+    def __init__(self, config):
+        """Construct the Archive task.
+
+        Args:
+            config (ParsedObject): Parsed configuration
+
+        """
+        AbstractTask.__init__(self, config, "Archive")
+
+    def execute(self):
+        """Execute."""
+        summary = self.fmanager.drain_archive()
+        if summary is not None and summary["failed"] > 0:
+            raise ArchiveError(f"Could not archive {summary['failed']} files")
+
+
+class Prefetch(AbstractTask):
+    """Prefetch the inputs of the next cycles into the input cache.
+
+    Runs alongside the current cycle, so that the forcing, first guess and
+    cryoclim inputs of the next general.prefetch.cycles cycles are local when
+    the tasks reading them run.
+
+    Args:
+        AbstractTask (_type_): _description_
+    """
+
+    def __init__(self, config):
+        """Construct the Prefetch task.
+
+        Args:
+            config (ParsedObject): Parsed configuration
+
+        """
+        AbstractTask.__init__(self, config, "Prefetch")
+
+    def execute(self):
+        """Execute."""
+        cycles = self.config.get_value("general.prefetch.cycles", default=0)
+        endtime = as_datetime(self.config.get_value("general.times.end"))
+        sources = []
+        for cycle in range(1, cycles + 1):
+            basetime = self.dtg + cycle * self.fcint
+            if basetime > endtime:
+                break
+            sources += cycle_inputs(
+                self.config, self.platform, basetime, self.fcint, self.fgint
+            )
+        summary = self.fmanager.prefetch(
+            sources,
+            max_workers=self.config.get_value("general.prefetch.max_workers", default=4),
+        )
+        logger.info(
+            "Prefetched {fetched} files, {cached} already cached, {skipped} skipped",
+            **summary,
+        )
+
+
 class FetchMarsObs(AbstractTask):
     """Fetch observations from Mars.
 
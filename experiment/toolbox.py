@@ -1,9 +1,87 @@
 """Toolbox handling e.g. input/output."""
+import contextlib
+import errno
+import functools
+import hashlib
+import itertools
+import json
 import os
 import re
-
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .archive import ArchiveBackendError, ArchiveQueue, get_archive_backend
 from .datetime_utils import as_datetime
 from .logs import logger
+from .metrics import TransferMetrics
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Time macros in the order they are substituted: name, time, format and whether the
+# macro is case-insensitive. Lead times are given in hours or in time steps.
+TIME_MACROS = (
+    ("YYYY", "basetime", "%Y", True),
+    ("MM", "basetime", "%m", False),
+    ("DD", "basetime", "%d", True),
+    ("HH", "basetime", "%H", True),
+    ("mm", "basetime", "%M", False),
+    ("YYYY_LL", "validtime", "%Y", True),
+    ("MM_LL", "validtime", "%m", False),
+    ("DD_LL", "validtime", "%d", True),
+    ("HH_LL", "validtime", "%H", True),
+    ("mm_LL", "validtime", "%M", False),
+    ("LL", "lead_hours", "02d", True),
+    ("LLL", "lead_hours", "03d", True),
+    ("LLLL", "lead_hours", "04d", True),
+    ("TTT", "lead_steps", "03d", True),
+    ("TTTT", "lead_steps", "04d", True),
+    ("YMD", "basetime", "%Y%m%d", True),
+    ("YYYY", "basetime", "%Y", True),
+    ("YY", "basetime", "%y", True),
+    ("MM", "basetime", "%m", False),
+    ("DD", "basetime", "%d", True),
+    ("HH", "basetime", "%H", True),
+    ("mm", "basetime", "%M", False),
+)
+
+# Default number of concurrent transfers in FileManager.input_many/output_many
+MAX_TRANSFER_WORKERS = 8
+
+# ioctl request to clone a file on Linux (reflink on e.g. XFS and btrfs)
+FICLONE = 0x40049409
+# Errors meaning a copy method is not supported for the files at hand
+_UNSUPPORTED_COPY_ERRNOS = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTSUP,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EPERM,
+    errno.EXDEV,
+}
+# Block size for streamed copies
+COPY_BUFSIZE = 1024 * 1024
+# Devices where reflinks failed
+_NO_REFLINK_DEVICES = set()
+# Default size of the local input cache in bytes
+DEFAULT_INPUT_CACHE_SIZE = 10 * 1024**3
+# Seconds after its last use a file in the input cache may be evicted
+DEFAULT_INPUT_CACHE_LEASE = 24 * 3600
 
 
 class ArchiveError(Exception):
@@ -29,6 +107,8 @@ class Provider:
         self.config = config
         self.identifier = identifier
         self.fetch = fetch
+        self.stat_cache = None
+        self.metrics = None
         logger.debug(
             "Constructed Base Provider object. {} {} ", self.identifier, self.fetch
         )
@@ -44,6 +124,76 @@ class Provider:
         """
         raise NotImplementedError
 
+    def _source_exists(self, path):
+        """Check if a source file exists.
+
+        Sources to fetch are looked up in the stat cache. Files to store are
+        products of the task and are always checked on disk.
+
+        Args:
+            path (str): Path.
+
+        Returns:
+            bool: True if the file exists.
+
+        """
+        if self.fetch and self.stat_cache is not None:
+            return self.stat_cache.exists(path)
+        return os.path.exists(path)
+
+    def _transfer(self, function, source, destination):
+        """Transfer a file and invalidate the cached listings.
+
+        Args:
+            function (callable): Transfer function.
+            source (str): Source path.
+            destination (str): Destination path.
+
+        Returns:
+            bool: True if success
+
+        """
+        start = time.perf_counter()
+        success = False
+        try:
+            success = _transfer(function, source, destination)
+            return success
+        finally:
+            if self.stat_cache is not None:
+                self.stat_cache.invalidate(source)
+                self.stat_cache.invalidate(destination)
+            self._record(source, destination, time.perf_counter() - start, success)
+
+    def _record(self, source, destination, seconds, success, retries=0):
+        """Record the metrics of a transfer.
+
+        Args:
+            source (str): Source.
+            destination (str): Destination.
+            seconds (float): Wall time.
+            success (bool): Whether the transfer succeeded.
+            retries (int, optional): Retries before the last attempt. Defaults to 0.
+
+        """
+        if self.metrics is None:
+            return
+        nbytes = None
+        if success:
+            with contextlib.suppress(OSError):
+                nbytes = os.path.getsize(_destination_path(source, destination))
+        self.metrics.record(
+            type(self).__name__,
+            source,
+            destination,
+            nbytes,
+            seconds,
+            success=success,
+            direction="fetch" if self.fetch else "store",
+            method=getattr(self, "method", None),
+            hit=getattr(self, "hit", None) if success else None,
+            retries=retries,
+        )
+
 
 class Platform:
     """Platform."""
@@ -56,6 +206,8 @@ class Platform:
 
         """
         self.config = config
+        self.stat_cache = None
+        self.metrics = None
 
     def get_system_value(self, role):
         """Get the system value.
@@ -170,15 +322,66 @@ class Platform:
         """
         # TODO handle platform differently archive etc  # noqa W0511
         if provider_id == "symlink":
-            return LocalFileSystemSymlink(self.config, target, fetch=fetch)
+            provider = LocalFileSystemSymlink(self.config, target, fetch=fetch)
         elif provider_id == "copy":
-            return LocalFileSystemCopy(self.config, target, fetch=fetch)
+            provider = LocalFileSystemCopy(self.config, target, fetch=fetch)
+        elif provider_id == "readonly_copy":
+            provider = LocalFileSystemCopy(
+                self.config, target, fetch=fetch, readonly=True
+            )
         elif provider_id == "move":
-            return LocalFileSystemMove(self.config, target, fetch=fetch)
+            provider = LocalFileSystemMove(self.config, target, fetch=fetch)
+        elif provider_id == "cache":
+            provider = LocalFileCache(self.config, target, fetch=fetch)
         elif provider_id == "ecfs":
-            return ECFS(self.config, target, fetch=fetch)
+            provider = ECFS(self.config, target, fetch=fetch)
         else:
             raise NotImplementedError(f"Provider for {provider_id} not implemented")
+        provider.stat_cache = self.stat_cache
+        provider.metrics = self.metrics
+        return provider
+
+    def get_transfer_metrics(self, task):
+        """Get the writer of the transfer metrics of a task.
+
+        Metrics are written to "<joboutdir>/metrics/<YYYYMMDDHH>/<task>.jsonl"
+        if general.transfer_metrics is set.
+
+        Args:
+            task (str): Task name.
+
+        Returns:
+            TransferMetrics: The writer, or None if metrics are disabled.
+
+        """
+        if not self.config.get_value("general.transfer_metrics", default=True):
+            return None
+        joboutdir = self.get_system_value("joboutdir")
+        if not joboutdir:
+            return None
+        basetime = as_datetime(self.config.get_value("general.times.basetime"))
+        path = f"{joboutdir}/metrics/{basetime.strftime('%Y%m%d%H')}/{task}.jsonl"
+        return TransferMetrics(path, task=task, basetime=basetime)
+
+    def get_archive(self):
+        """Get the archive backend and queue.
+
+        They are set in general.archive.
+
+        Returns:
+            tuple: ArchiveBackend and ArchiveQueue, or None and None if there is
+                no archive backend.
+
+        """
+        backend = self.config.get_value("general.archive.backend", default="none")
+        directory = self.config.get_value("general.archive.directory", default=None)
+        if directory is not None:
+            directory = self.substitute(directory)
+        backend = get_archive_backend(backend, directory=directory)
+        if backend is None:
+            return None, None
+        queue = self.substitute(self.config.get_value("general.archive.queue"))
+        return backend, ArchiveQueue(queue)
 
     def sub_value(self, pattern, key, value, micro="@", ci=True):
         """Substitute the value case-insensitively.
@@ -209,6 +412,11 @@ class Platform:
     def substitute(self, pattern, basetime=None, validtime=None):
         """Substitute pattern.
 
+        Macros are substituted in the order platform macros, system macros, os
+        macros, domain, case, realization, time information and CNMEXP. This is
+        done by a compiled engine that is shared by all platforms using the same
+        config, see `MacroSubstitution`.
+
         Args:
             pattern (str): _description_
             basetime (datetime.datetime, optional): Base time. Defaults to None.
@@ -219,131 +427,735 @@ class Platform:
 
         """
         if isinstance(pattern, str):
-            macros = self.get_macros()
-            os_macros = self.get_os_macros()
-            system_macros = self.get_system_macros()
+            pattern = MacroSubstitution.from_config(self.config).substitute(
+                pattern, basetime=basetime, validtime=validtime
+            )
+        logger.debug("Return pattern={}", pattern)
+        return pattern
 
-            logger.debug("pattern before: {}", pattern)
-            for macro in macros:
-                logger.debug("Checking platform macro: {}", macro)
-                try:
-                    val = self.config.get_value(f"platform.{macro}")
-                    logger.debug("macro={} pattern={} val={}", macro, pattern, val)
-                except KeyError:
-                    val = None
-                if val is not None:
-                    logger.debug("before replace macro={} pattern={}", macro, pattern)
-                    pattern = self.sub_value(pattern, macro, val)
-                    logger.debug("after replace macro={} pattern={}", macro, pattern)
-
-            logger.debug("pattern before: {}", pattern)
-            for macro in system_macros:
-                logger.debug("Checking system macro: {}", macro)
-                try:
-                    val = self.config.get_value(f"system.{macro}")
-                    logger.debug("macro={} pattern={} val={}", macro, pattern, val)
-                except KeyError:
-                    val = None
-                if val is not None:
-                    logger.debug("before replace macro={} pattern={}", macro, pattern)
-                    pattern = self.sub_value(pattern, macro, val)
-                    logger.debug("after replace macro={} pattern={}", macro, pattern)
-
-            for macro in os_macros:
-                logger.debug("Checking macro: {}", macro)
-                try:
-                    val = os.environ[macro]
-                    logger.debug("macro={}, value={} pattern={}", macro, val, pattern)
-                except KeyError:
-                    val = None
-                if val is not None:
-                    pattern = self.sub_value(pattern, macro, val)
-                    logger.debug("macro={} pattern={}", macro, pattern)
-
-            domain = self.config.get_value("domain.name")
-            pattern = self.sub_value(pattern, "domain", domain)
-            exp_case = self.config.get_value("general.case")
-            pattern = self.sub_value(pattern, "case", exp_case)
-            logger.debug("Substituted domain: {} pattern={}", domain, pattern)
-            realization = self.config.get_value("general.realization")
-            if isinstance(realization, str):
-                if realization == "":
-                    realization = None
-            if realization is not None:
-                if int(realization) >= 0:
-                    pattern = self.sub_value(pattern, "RRR", f"{realization:03d}")
-                    pattern = self.sub_value(pattern, "MRRR", f"mbr{realization:03d}")
-                else:
-                    pattern = self.sub_value(pattern, "RRR", "")
-                    pattern = self.sub_value(pattern, "MRRR", "")
-            else:
-                pattern = self.sub_value(pattern, "RRR", "")
-                pattern = self.sub_value(pattern, "MRRR", "")
-
-            logger.debug("Substituted realization: {} pattern={}", realization, pattern)
-
-            # Time handling
-            if basetime is None:
-                basetime = str(self.config.get_value("general.times.basetime"))
-            if validtime is None:
-                validtime = str(self.config.get_value("general.times.validtime"))
-            if isinstance(basetime, str):
-                basetime = as_datetime(basetime)
-            if isinstance(validtime, str):
-                validtime = as_datetime(validtime)
-
-            pattern = self.sub_value(pattern, "YYYY", basetime.strftime("%Y"))
-            pattern = self.sub_value(pattern, "MM", basetime.strftime("%m"), ci=False)
-            pattern = self.sub_value(pattern, "DD", basetime.strftime("%d"))
-            pattern = self.sub_value(pattern, "HH", basetime.strftime("%H"))
-            pattern = self.sub_value(pattern, "mm", basetime.strftime("%M"), ci=False)
-            if basetime is not None and validtime is not None:
-                logger.debug(
-                    "Substituted date/time info: basetime={} validtime={}",
-                    basetime.strftime("%Y%m%d%H%M"),
-                    validtime.strftime("%Y%m%d%H%M"),
-                )
-                lead_time = validtime - basetime
-                pattern = self.sub_value(pattern, "YYYY_LL", validtime.strftime("%Y"))
-                pattern = self.sub_value(
-                    pattern, "MM_LL", validtime.strftime("%m"), ci=False
+    def substitute_many(self, pattern, basetimes, validtimes=None):
+        """Substitute pattern for many times.
+
+        Same as calling `substitute` for each pair of times, but faster.
+
+        Args:
+            pattern (str): Pattern.
+            basetimes (Iterable): Base times, as datetime objects, ISO 8601 strings,
+                numpy.datetime64 or a pandas.DatetimeIndex.
+            validtimes (Iterable, optional): Valid times, one per base time.
+                Defaults to None, meaning the same as the base times.
+
+        Returns:
+            list: Substituted strings, one per base time.
+
+        """
+        return MacroSubstitution.from_config(self.config).substitute_many(
+            pattern, basetimes, validtimes=validtimes
+        )
+
+
+class MacroSubstitution:
+    """Compiled substitution of @MACRO@ tokens for a config.
+
+    The result is the same as applying `Platform.sub_value` for every macro in turn,
+    where values substituted for one macro may contain macros substituted later on.
+    Instead, the tokens in a pattern are found in a single scan with one regex and
+    looked up in a table of values. The values depending on the environment and on
+    the times are tabulated per (basetime, validtime), and results are memoized.
+    If a single scan could give a different result than substituting in turn
+    (e.g. when values contain macros themselves) the macros are substituted in turn.
+    """
+
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, config, maxsize=4096):
+        """Construct the object.
+
+        The config is not referenced after construction.
+
+        Args:
+            config (deode.ParsedConfig): Config.
+            maxsize (int, optional): Size of the memoized results. Defaults to 4096.
+
+        """
+        self.config_steps = []
+        for section in ["platform", "system"]:
+            for macro in config.get_value(section).dict():
+                self.config_steps.append(
+                    (macro, config.get_value(f"{section}.{macro}"), True)
                 )
-                pattern = self.sub_value(pattern, "DD_LL", validtime.strftime("%d"))
-                pattern = self.sub_value(pattern, "HH_LL", validtime.strftime("%H"))
-                pattern = self.sub_value(
-                    pattern, "mm_LL", validtime.strftime("%M"), ci=False
+        self.os_macros = tuple(config.get_value("general.os_macros"))
+
+        self.static_steps = [
+            ("domain", config.get_value("domain.name"), True),
+            ("case", config.get_value("general.case"), True),
+        ]
+        realization = config.get_value("general.realization")
+        if isinstance(realization, str):
+            if realization == "":
+                realization = None
+        if realization is not None and int(realization) >= 0:
+            self.static_steps.append(("RRR", f"{realization:03d}", True))
+            self.static_steps.append(("MRRR", f"mbr{realization:03d}", True))
+        else:
+            self.static_steps.append(("RRR", "", True))
+            self.static_steps.append(("MRRR", "", True))
+
+        self.default_basetime = str(config.get_value("general.times.basetime"))
+        self.default_validtime = str(config.get_value("general.times.validtime"))
+        self.tstep = config.get_value("general.tstep")
+        self.time_macros = [
+            macro
+            for macro in TIME_MACROS
+            if macro[1] != "lead_steps" or self.tstep is not None
+        ]
+        cnmexp = config.get_value("general.cnmexp")
+        self.final_steps = [("CNMEXP", cnmexp, True)]
+
+        # Validate and expand the values from the config once
+        for step in self.config_steps + self.static_steps + self.final_steps:
+            self._expand(*step)
+
+        os_steps = [(macro, None, True) for macro in self.os_macros]
+        all_steps = self._all_steps(None, None, os_steps)
+        names = {name for name, __, __ in all_steps}
+        ci_names = {name for name, __, ci in all_steps if ci}
+        alternatives = [
+            "(?i:"
+            + "|".join(map(re.escape, sorted(ci_names, key=len, reverse=True)))
+            + ")"
+        ]
+        alternatives.extend(
+            map(re.escape, sorted(names - ci_names, key=len, reverse=True))
+        )
+        self.regex = re.compile("@(" + "|".join(alternatives) + ")@")
+        self.lower_names = {name.lower() for name in names}
+        self.name_chars = set("".join(names).lower() + "".join(names).upper())
+
+        self._table = functools.lru_cache(maxsize=256)(self._table)
+        self._substitute = functools.lru_cache(maxsize=maxsize)(self._substitute)
+
+    @classmethod
+    def from_config(cls, config):
+        """Return the (shared) instance for `config`.
+
+        Args:
+            config (deode.ParsedConfig): Config.
+
+        Returns:
+            MacroSubstitution: Substitution engine for the config.
+
+        """
+        try:
+            return cls._instances[config]
+        except KeyError:
+            instance = cls._instances[config] = cls(config)
+        except TypeError:
+            # Not weak-referencable
+            instance = cls(config)
+        return instance
+
+    def substitute(self, pattern, basetime=None, validtime=None):
+        """Substitute macros in pattern.
+
+        Args:
+            pattern (str): Pattern
+            basetime (datetime.datetime, optional): Base time. Defaults to None.
+            validtime (datetime.datetime, optional): Valid time. Defaults to None.
+
+        Returns:
+            str: Substituted string.
+
+        """
+        environment = tuple(os.environ.get(macro) for macro in self.os_macros)
+        return self._substitute(
+            pattern, _time_key(basetime), _time_key(validtime), environment
+        )
+
+    def substitute_many(self, pattern, basetimes, validtimes=None):
+        """Substitute macros in pattern for many times.
+
+        The result is the same as calling `substitute` for each pair of times, but
+        the pattern is tokenized once and the time macros are formatted for all times
+        in bulk.
+
+        Args:
+            pattern (str): Pattern
+            basetimes (Iterable): Base times, as datetime objects, ISO 8601 strings,
+                numpy.datetime64 or a pandas.DatetimeIndex.
+            validtimes (Iterable, optional): Valid times, one per base time.
+                Defaults to None, meaning the same as the base times.
+
+        Returns:
+            list: Substituted strings, one per base time.
+
+        Raises:
+            ValueError: If basetimes and validtimes are of different lengths.
+
+        """
+        basetimes = _as_sequence(basetimes)
+        validtimes = basetimes if validtimes is None else _as_sequence(validtimes)
+        if len(basetimes) != len(validtimes):
+            raise ValueError(
+                f"Got {len(basetimes)} basetimes and {len(validtimes)} validtimes"
+            )
+        if len(basetimes) == 0 or not isinstance(pattern, str) or "@" not in pattern:
+            return [pattern] * len(basetimes)
+
+        basetime_index = _fixed_offset_datetime_index(basetimes)
+        validtime_index = _fixed_offset_datetime_index(validtimes)
+        if basetime_index is None or validtime_index is None:
+            return [
+                self.substitute(pattern, basetime=basetime, validtime=validtime)
+                for basetime, validtime in zip(basetimes, validtimes)
+            ]
+
+        def substitute(index):
+            return self.substitute(
+                pattern,
+                basetime=basetime_index[index].to_pydatetime(),
+                validtime=validtime_index[index].to_pydatetime(),
+            )
+
+        environment = tuple(os.environ.get(macro) for macro in self.os_macros)
+        steps, lookup = self._table(
+            _time_key(basetime_index[0].to_pydatetime()),
+            _time_key(validtime_index[0].to_pydatetime()),
+            environment,
+        )
+        first_time_step = (
+            len(self.config_steps) + len(self.os_macros) + len(self.static_steps)
+        )
+        time_columns = {}
+
+        # Tokenize the pattern. Values are either strings or arrays (one per time).
+        gaps = []
+        values = []
+        position = 0
+        for match in self.regex.finditer(pattern):
+            step = _first_step(lookup, match.group(1))
+            if step is None:
+                values = None
+                break
+            index, value = step
+            if 0 <= index - first_time_step < len(self.time_macros):
+                if index not in time_columns:
+                    time_columns[index] = _format_time_macro(
+                        self.time_macros[index - first_time_step],
+                        basetime_index,
+                        validtime_index,
+                        self.tstep,
+                    )
+                value = time_columns[index]
+            elif "@" in value:
+                values = None
+                break
+            gaps.append(pattern[position : match.start()])
+            values.append(value)
+            position = match.end()
+        gaps.append(pattern[position:])
+        if values is None or any("@" in gap or not gap.isascii() for gap in gaps):
+            return [substitute(index) for index in range(len(basetimes))]
+
+        columns = [gaps[0]]
+        for value, gap in zip(values, gaps[1:]):
+            if isinstance(value, str):
+                columns[-1] += value + gap
+            else:
+                columns += [value, gap]
+        if len(columns) == 1:
+            result = columns * len(basetimes)
+        else:
+            result = [
+                "".join(pieces)
+                for pieces in zip(
+                    *[
+                        itertools.repeat(column) if isinstance(column, str) else column
+                        for column in columns
+                    ]
                 )
+            ]
+
+        # Rule out new tokens joined from the text around substituted values, as in
+        # `_substitute`, for every time
+        unsafe = np.zeros(len(basetimes), dtype=bool)
+        inner_gaps = gaps[1:-1]
+        for first in range(len(inner_gaps)):
+            name = np.full(len(basetimes), inner_gaps[first], dtype=object)
+            for last in range(first, len(inner_gaps)):
+                if last > first:
+                    name = name + values[last] + inner_gaps[last]
+                if not self.name_chars.issuperset(inner_gaps[last]):
+                    break
+                tokens = {
+                    item
+                    for item in set(name)
+                    if not item.isascii() or item.lower() in self.lower_names
+                }
+                if tokens:
+                    unsafe |= [item in tokens for item in name]
+        for index in np.flatnonzero(unsafe):
+            result[index] = substitute(index)
+        return result
+
+    def _substitute(self, pattern, basetime_key, validtime_key, environment):
+        """Substitute macros in pattern. Memoized."""
+        if "@" not in pattern:
+            return pattern
+        steps, lookup = self._table(basetime_key, validtime_key, environment)
+
+        pieces = []
+        position = 0
+        values = []
+        for match in self.regex.finditer(pattern):
+            value = _first_value(lookup, match.group(1))
+            if value is None or "@" in value:
+                return self._substitute_in_turn(pattern, steps)
+            pieces.append(pattern[position : match.start()])
+            pieces.append(value)
+            values.append(value)
+            position = match.end()
+        pieces.append(pattern[position:])
+        if "@" in pieces[-1] or any("@" in piece for piece in pieces[:-1:2]):
+            return self._substitute_in_turn(pattern, steps)
+
+        # Substituting in turn may join the text around substituted values into new
+        # tokens, e.g. "@X@" + "@Y@" + "@Z@" if Y is substituted first. Rule it out.
+        gaps = pieces[2:-1:2]
+        for first in range(len(gaps)):
+            name = gaps[first]
+            for last in range(first, len(gaps)):
+                if last > first:
+                    name += values[last] + gaps[last]
+                if not name.isascii():
+                    return self._substitute_in_turn(pattern, steps)
+                if not self.name_chars.issuperset(name):
+                    break
+                if name.lower() in self.lower_names:
+                    return self._substitute_in_turn(pattern, steps)
+        return "".join(pieces)
+
+    def _table(self, basetime_key, validtime_key, environment):
+        """Return the substitution steps and a lookup table for the given times."""
+        env_steps = [
+            (macro, value, True) for macro, value in zip(self.os_macros, environment)
+        ]
+        all_steps = self._all_steps(basetime_key[0], validtime_key[0], env_steps)
+        steps = []
+        lookup = ({}, {})
+        for index, (name, value, ci) in enumerate(all_steps):
+            if value is None:
+                continue
+            value = self._expand(name, value, ci)
+            steps.append((name, value, ci))
+            if ci:
+                lookup[1].setdefault(name.lower(), (index, value))
+            else:
+                lookup[0].setdefault(name, (index, value))
+        return steps, lookup
+
+    def _all_steps(self, basetime, validtime, env_steps=None):
+        """Return all substitution steps in order."""
+        if env_steps is None:
+            env_steps = []
+        return (
+            self.config_steps
+            + env_steps
+            + self.static_steps
+            + self._time_steps(basetime, validtime)
+            + self.final_steps
+        )
 
-                lead_seconds = int(lead_time.total_seconds())
-                lead_minutes = int(lead_seconds / 3600)  # noqa W0612
-                lead_hours = int(lead_seconds / 3600)
-                pattern = self.sub_value(pattern, "LL", f"{lead_hours:02d}")
-                pattern = self.sub_value(pattern, "LLL", f"{lead_hours:03d}")
-                pattern = self.sub_value(pattern, "LLLL", f"{lead_hours:04d}")
-                tstep = self.config.get_value("general.tstep")
-                if tstep is not None:
-                    lead_step = int(lead_seconds / tstep)
-                    pattern = self.sub_value(pattern, "TTT", f"{lead_step:03d}")
-                    pattern = self.sub_value(pattern, "TTTT", f"{lead_step:04d}")
-
-            if basetime is not None:
-                pattern = self.sub_value(pattern, "YMD", basetime.strftime("%Y%m%d"))
-                pattern = self.sub_value(pattern, "YYYY", basetime.strftime("%Y"))
-                pattern = self.sub_value(pattern, "YY", basetime.strftime("%y"))
-                pattern = self.sub_value(pattern, "MM", basetime.strftime("%m"), ci=False)
-                pattern = self.sub_value(pattern, "DD", basetime.strftime("%d"))
-                pattern = self.sub_value(pattern, "HH", basetime.strftime("%H"))
-                pattern = self.sub_value(pattern, "mm", basetime.strftime("%M"), ci=False)
-
-            cnmexp = self.config.get_value("general.cnmexp")
-            if cnmexp is not None:
-                pattern = self.sub_value(pattern, "CNMEXP", cnmexp)
-                logger.debug("Substituted CNMEXP: {} pattern={}", cnmexp, pattern)
+    def _time_steps(self, basetime, validtime):
+        """Return the substitution steps for the time information."""
+        if basetime is None:
+            basetime = self.default_basetime
+        if validtime is None:
+            validtime = self.default_validtime
+        if isinstance(basetime, str):
+            basetime = as_datetime(basetime)
+        if isinstance(validtime, str):
+            validtime = as_datetime(validtime)
+
+        lead_seconds = int((validtime - basetime).total_seconds())
+        values = {
+            "basetime": basetime.strftime,
+            "validtime": validtime.strftime,
+            "lead_hours": functools.partial(format, int(lead_seconds / 3600)),
+        }
+        if self.tstep is not None:
+            values["lead_steps"] = functools.partial(
+                format, int(lead_seconds / self.tstep)
+            )
+        return [(name, values[time](fmt), ci) for name, time, fmt, ci in self.time_macros]
 
-        logger.debug("Return pattern={}", pattern)
+    @staticmethod
+    def _expand(name, value, ci):
+        """Return value as inserted by `Platform.sub_value`, i.e. as a template."""
+        if value is None:
+            return None
+        if isinstance(value, str) and "\\" not in value:
+            # Only backslashes are special in templates
+            return value
+        token = f"@{name}@"
+        return _token_regex(token, ci).sub(value, token)
+
+    @staticmethod
+    def _substitute_in_turn(pattern, steps):
+        """Substitute the macros one by one, like `Platform.sub_value`."""
+        for name, value, ci in steps:
+            if "@" not in pattern:
+                break
+            pattern = _token_regex(f"@{name}@", ci).sub(lambda __, v=value: v, pattern)
         return pattern
 
 
+@functools.lru_cache(maxsize=1024)
+def _token_regex(token, ci):
+    """Return a compiled regex matching token, optionally case-insensitively."""
+    if ci:
+        return re.compile(re.escape(token), re.IGNORECASE)
+    return re.compile(re.escape(token))
+
+
+def _first_step(lookup, name):
+    """Return (index, value) of the first substitution step matching name, if any."""
+    case_sensitive = lookup[0].get(name)
+    case_insensitive = lookup[1].get(name.lower())
+    if case_sensitive is None:
+        return case_insensitive
+    if case_insensitive is None or case_sensitive[0] < case_insensitive[0]:
+        return case_sensitive
+    return case_insensitive
+
+
+def _first_value(lookup, name):
+    """Return the value of the first substitution step matching name, if any."""
+    step = _first_step(lookup, name)
+    if step is None:
+        return None
+    return step[1]
+
+
+def _fixed_offset_datetime_index(times):
+    """Return times as a timezone-aware pandas.DatetimeIndex, if possible.
+
+    Naive times are taken as UTC, as in `as_datetime`. None is returned if the times
+    can not be converted, or if they are in a time zone without a fixed UTC offset or
+    outside the years 1000-9999, where formatting in bulk could differ from strftime.
+    """
+    try:
+        index = pd.DatetimeIndex(pd.to_datetime(times))
+    except (TypeError, ValueError):
+        return None
+    if index.hasnans:
+        return None
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    elif index.tz.utcoffset(None) is None:
+        return None
+    if index.year.min() < 1000 or index.year.max() > 9999:
+        return None
+    return index
+
+
+# strftime directives used in TIME_MACROS: attribute, modulo and integer format
+_STRFTIME_FIELDS = {
+    "%Y": ("year", None, "04d"),
+    "%y": ("year", 100, "02d"),
+    "%m": ("month", None, "02d"),
+    "%d": ("day", None, "02d"),
+    "%H": ("hour", None, "02d"),
+    "%M": ("minute", None, "02d"),
+}
+
+
+def _format_time_macro(time_macro, basetimes, validtimes, tstep):
+    """Format a time macro (see TIME_MACROS) for all times."""
+    __, time, fmt, __ = time_macro
+    if time in ("basetime", "validtime"):
+        times = basetimes if time == "basetime" else validtimes
+        column = None
+        for directive in re.findall("%.", fmt):
+            attribute, modulo, int_fmt = _STRFTIME_FIELDS[directive]
+            values = getattr(times, attribute)
+            if modulo is not None:
+                values = values % modulo
+            field = _format_integers(values, int_fmt)
+            column = field if column is None else column + field
+        return column
+
+    lead_times = validtimes.tz_convert("UTC") - basetimes.tz_convert("UTC")
+    lead_seconds = np.trunc(np.asarray(lead_times.total_seconds()))
+    if time == "lead_hours":
+        lead = np.trunc(lead_seconds / 3600)
+    else:
+        lead = np.trunc(lead_seconds / tstep)
+    return _format_integers(lead.astype(np.int64), fmt)
+
+
+def _format_integers(values, fmt):
+    """Format integers, returning an object array of strings."""
+    unique_values, inverse = np.unique(np.asarray(values), return_inverse=True)
+    formatted = np.array([format(int(value), fmt) for value in unique_values])
+    return formatted.astype(object)[inverse]
+
+
+def _as_sequence(values):
+    """Return values as a sequence, keeping arrays and pandas indexes as they are."""
+    if isinstance(values, (list, tuple, np.ndarray, pd.Index)):
+        return values
+    return list(values)
+
+
+def _time_key(value):
+    """Return a hashable key for a time, distinguishing equal times in other zones."""
+    if isinstance(value, datetime):
+        return value, value.utcoffset()
+    return value, None
+
+
+# Entry of a path in a directory that can not be listed
+_UNLISTED = object()
+
+
+class StatCache:
+    """Cache of directory listings for file existence and size checks.
+
+    A directory is listed once with os.scandir, and later checks for files in it
+    are answered from memory instead of with a stat call each. On parallel file
+    systems every stat is a round trip to a metadata server. The listings are
+    invalidated by the transfers of the file manager and by `refresh`, but not by
+    changes made by others, e.g. binaries run by the task. Paths in directories
+    that can not be listed, e.g. without read permission, are checked with a
+    stat call each.
+
+    The number of checks, directory listings and stat calls made are counted in
+    `counts`.
+    """
+
+    _shared = None
+
+    def __init__(self):
+        """Construct the object."""
+        self._listings = {}
+        self._lock = threading.Lock()
+        self.counts = {"checks": 0, "scandir": 0, "stat": 0}
+
+    @classmethod
+    def from_config(cls, config):
+        """Return the stat cache for the scope set in general.stat_cache.
+
+        The scope is "task" for a cache per file manager, "process" for a cache
+        shared by all file managers in the process or "none". A process cache is
+        not refreshed between tasks, so it can go stale when a process runs
+        several tasks.
+
+        Args:
+            config (deode.ParsedConfig): Configuration
+
+        Returns:
+            StatCache: The stat cache, or None if disabled.
+
+        Raises:
+            ValueError: If the scope is unknown.
+
+        """
+        scope = config.get_value("general.stat_cache", default="task")
+        if scope == "task":
+            return cls()
+        if scope == "process":
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+        if scope == "none":
+            return None
+        raise ValueError(f"Unknown stat cache scope '{scope}'")
+
+    @property
+    def stat_calls_avoided(self):
+        """Return the number of checks answered without a system call."""
+        return self.counts["checks"] - self.counts["scandir"] - self.counts["stat"]
+
+    def exists(self, path):
+        """Check if a path exists, like os.path.exists.
+
+        Args:
+            path (str): Path.
+
+        Returns:
+            bool: True if the path exists.
+
+        """
+        path = os.path.abspath(path)
+        if os.path.dirname(path) == path:
+            return os.path.exists(path)
+        entry, stats = self._entry(path)
+        if entry is _UNLISTED:
+            return self._stat_path(path) is not None
+        if entry is None:
+            return False
+        if not entry.is_symlink():
+            return True
+        return self._stat(entry, stats) is not None
+
+    def getsize(self, path):
+        """Return the size of a file, like os.path.getsize.
+
+        Args:
+            path (str): Path.
+
+        Returns:
+            int: Size in bytes.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+
+        """
+        path = os.path.abspath(path)
+        if os.path.dirname(path) == path:
+            return os.path.getsize(path)
+        entry, stats = self._entry(path)
+        if entry is _UNLISTED:
+            stat = self._stat_path(path)
+        else:
+            stat = None if entry is None else self._stat(entry, stats)
+        if stat is None:
+            raise FileNotFoundError(f"No such file: '{path}'")
+        return stat.st_size
+
+    def invalidate(self, path):
+        """Forget the listings of a path and of its directory.
+
+        Args:
+            path (str): Path.
+
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            self._listings.pop(path, None)
+            self._listings.pop(os.path.dirname(path), None)
+
+    def refresh(self, path=None):
+        """Forget cached listings.
+
+        Args:
+            path (str, optional): Path to refresh. Defaults to None, which means
+                all listings.
+
+        """
+        if path is None:
+            with self._lock:
+                self._listings.clear()
+        else:
+            self.invalidate(path)
+
+    def _entry(self, path):
+        """Return the directory entry of a path.
+
+        Args:
+            path (str): Absolute path.
+
+        Returns:
+            tuple: os.DirEntry (None if missing, _UNLISTED if the directory can
+                not be listed) and the cached stats of the directory.
+
+        """
+        directory, name = os.path.split(path)
+        with self._lock:
+            self.counts["checks"] += 1
+            listing = self._listings.get(directory)
+        if listing is None:
+            listing = self._scan(directory)
+        entries, stats = listing
+        if entries is None:
+            return _UNLISTED, stats
+        return entries.get(name), stats
+
+    def _scan(self, directory):
+        """List a directory.
+
+        Args:
+            directory (str): Directory.
+
+        Returns:
+            tuple: Entries and cached stats by name. The entries are None if the
+                directory exists but can not be listed.
+
+        """
+        try:
+            with os.scandir(directory) as iterator:
+                entries = {entry.name: entry for entry in iterator}
+        except (FileNotFoundError, NotADirectoryError):
+            entries = {}
+        except OSError as error:
+            logger.debug("Could not list {}: {}", directory, error)
+            entries = None
+        listing = (entries, {})
+        with self._lock:
+            self.counts["scandir"] += 1
+            self._listings[directory] = listing
+        return listing
+
+    def _stat(self, entry, stats):
+        """Return the stat of an entry, following symlinks.
+
+        Args:
+            entry (os.DirEntry): Entry.
+            stats (dict): Cached stats of the directory.
+
+        Returns:
+            os.stat_result: Stat, or None if a symlink is broken.
+
+        """
+        try:
+            return stats[entry.name]
+        except KeyError:
+            pass
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            stat = None
+        with self._lock:
+            self.counts["stat"] += 1
+            stats[entry.name] = stat
+        return stat
+
+    def _stat_path(self, path):
+        """Return the stat of a path in a directory that can not be listed.
+
+        Args:
+            path (str): Absolute path.
+
+        Returns:
+            os.stat_result: Stat, or None if the path does not exist.
+
+        """
+        with self._lock:
+            self.counts["stat"] += 1
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+
+@dataclass
+class TransferStatus:
+    """Status of a single transfer in FileManager.input_many/output_many."""
+
+    target: str
+    destination: str
+    provider: object = None
+    resource: object = None
+    aprovider: object = None
+    error: Exception = None
+
+    @property
+    def success(self):
+        """Return True if the transfer succeeded."""
+        return self.error is None
+
+
 class FileManager:
     """FileManager class.
 
@@ -353,17 +1165,64 @@ class FileManager:
 
     """
 
-    def __init__(self, config):
+    def __init__(self, config, task=None):
         """Construct the object.
 
         Args:
             config (deode.ParsedConfig): Configuration
+            task (str, optional): Name of the task using the file manager. The
+                transfer metrics are only recorded for tasks. Defaults to None.
 
         """
         self.config = config
         self.platform = Platform(config)
+        self.stat_cache = StatCache.from_config(config)
+        self.platform.stat_cache = self.stat_cache
+        self.metrics = None
+        if task is not None:
+            self.metrics = self.platform.get_transfer_metrics(task)
+        self.platform.metrics = self.metrics
         logger.debug("Constructed FileManager object.")
 
+    def exists(self, path):
+        """Check if a file exists, using the stat cache if enabled.
+
+        Args:
+            path (str): Path.
+
+        Returns:
+            bool: True if the file exists.
+
+        """
+        if self.stat_cache is None:
+            return os.path.exists(path)
+        return self.stat_cache.exists(path)
+
+    def getsize(self, path):
+        """Return the size of a file, using the stat cache if enabled.
+
+        Args:
+            path (str): Path.
+
+        Returns:
+            int: Size in bytes.
+
+        """
+        if self.stat_cache is None:
+            return os.path.getsize(path)
+        return self.stat_cache.getsize(path)
+
+    def refresh(self, path=None):
+        """Forget cached directory listings.
+
+        Args:
+            path (str, optional): File or directory to refresh. Defaults to None,
+                which means all.
+
+        """
+        if self.stat_cache is not None:
+            self.stat_cache.refresh(path)
+
     def get_input(
         self,
         target,
@@ -397,7 +1256,7 @@ class FileManager:
         dest_file = destination.identifier
         logger.debug("Set input for target={} to destination={}", target, dest_file)
 
-        if os.path.exists(dest_file):
+        if self.exists(dest_file):
             logger.debug("Destination file already exists.")
             return None, destination
         else:
@@ -535,7 +1394,8 @@ class FileManager:
                 provider_id, sub_destination, fetch=False
             )
 
-            if aprovider.create_resource(target_resource):
+            # Archive the file where it is after the transfer above
+            if aprovider.create_resource(LocalFileOnDisk(self.config, sub_target)):
                 logger.debug("Using provider_id {}", provider_id)
             else:
                 raise ArchiveError("Could not archive data")
@@ -571,6 +1431,186 @@ class FileManager:
             provider_id=provider_id,
         )
 
+    def input_many(self, transfers, max_workers=None, **kwargs):
+        """Set many input data to deode concurrently.
+
+        Args:
+            transfers (list): Transfers as (target, destination) tuples or as dicts
+                with the arguments to `get_input`.
+            max_workers (int, optional): Maximum number of concurrent transfers.
+                Defaults to MAX_TRANSFER_WORKERS.
+            kwargs: Default arguments to `get_input` for all transfers.
+
+        Returns:
+            list: TransferStatus for each transfer, in the order given.
+
+        """
+        return self._transfer_many(self.get_input, transfers, max_workers, kwargs)
+
+    def output_many(self, transfers, max_workers=None, **kwargs):
+        """Set many output data from deode concurrently.
+
+        Args:
+            transfers (list): Transfers as (target, destination) tuples or as dicts
+                with the arguments to `get_output`.
+            max_workers (int, optional): Maximum number of concurrent transfers.
+                Defaults to MAX_TRANSFER_WORKERS.
+            kwargs: Default arguments to `get_output` for all transfers.
+
+        Returns:
+            list: TransferStatus for each transfer, in the order given.
+
+        """
+        return self._transfer_many(self.get_output, transfers, max_workers, kwargs)
+
+    @staticmethod
+    def _transfer_many(method, transfers, max_workers, defaults):
+        """Run transfers on a bounded thread pool.
+
+        Args:
+            method (callable): get_input or get_output.
+            transfers (list): (target, destination) tuples or dicts with arguments.
+            max_workers (int): Maximum number of concurrent transfers.
+            defaults (dict): Default arguments for all transfers.
+
+        Returns:
+            list: TransferStatus for each transfer.
+
+        """
+        arguments = []
+        for transfer in transfers:
+            if isinstance(transfer, dict):
+                transfer_kwargs = dict(defaults, **transfer)
+            else:
+                target, destination = transfer
+                transfer_kwargs = dict(defaults, target=target, destination=destination)
+            arguments.append(transfer_kwargs)
+
+        def transfer(transfer_kwargs):
+            status = TransferStatus(
+                transfer_kwargs["target"], transfer_kwargs["destination"]
+            )
+            try:
+                result = method(**transfer_kwargs)
+            except (ArchiveError, ProviderError, OSError) as error:
+                logger.error(
+                    "Transfer of {} to {} failed: {}",
+                    status.target,
+                    status.destination,
+                    error,
+                )
+                status.error = error
+            else:
+                if len(result) == 2:
+                    status.provider, status.resource = result
+                else:
+                    status.provider, status.aprovider, status.resource = result
+            return status
+
+        if max_workers is None:
+            max_workers = MAX_TRANSFER_WORKERS
+        max_workers = min(max_workers, len(arguments))
+        if max_workers <= 1:
+            return [transfer(transfer_kwargs) for transfer_kwargs in arguments]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(transfer, arguments))
+
+    def drain_archive(self):
+        """Archive the data in the archive queue.
+
+        Returns:
+            dict: Number of "archived" and "failed" files. None if there is no
+                archive backend or the queue is drained by another process.
+
+        """
+        backend, queue = self.platform.get_archive()
+        if backend is None:
+            logger.info("No archive backend set")
+            return None
+        return queue.drain(
+            backend,
+            max_workers=self.config.get_value("general.archive.max_workers", default=4),
+            max_attempts=self.config.get_value("general.archive.max_attempts", default=3),
+            metrics=self.metrics,
+        )
+
+    def prefetch(self, sources, max_workers=None):
+        """Fetch input files into the input cache ahead of the tasks reading them.
+
+        Missing files and remote URLs are skipped.
+
+        Args:
+            sources (list): Source files.
+            max_workers (int, optional): Concurrent transfers. Defaults to None,
+                which means MAX_TRANSFER_WORKERS.
+
+        Returns:
+            dict: Number of files "fetched", already "cached" and "skipped".
+
+        """
+        summary = {"fetched": 0, "cached": 0, "skipped": 0}
+        sources = list(dict.fromkeys(sources))
+        cache = InputCache.from_config(self.config)
+        if cache is None:
+            logger.info("No input cache to prefetch {} files to", len(sources))
+            summary["skipped"] = len(sources)
+            return summary
+
+        def fetch(source):
+            if _is_remote(source) or not self.exists(source):
+                logger.debug("Skip prefetching {}", source)
+                return "skipped"
+            try:
+                cached, hit = cache.get(source)
+            except OSError as error:
+                logger.warning("Could not prefetch {}: {}", source, error)
+                return "skipped"
+            if cached is None:
+                logger.debug("{} is larger than the input cache", source)
+                return "skipped"
+            return "cached" if hit else "fetched"
+
+        if max_workers is None:
+            max_workers = MAX_TRANSFER_WORKERS
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for status in executor.map(fetch, sources):
+                summary[status] += 1
+        return summary
+
+    def localize(self, sources, directory):
+        """Link the cached copies of prefetched input files into a directory.
+
+        A source is linked as its absolute path below the directory, so a
+        pattern of source files can be pointed to the local copies by prefixing
+        it with the directory. Sources not in the input cache are left out.
+
+        Args:
+            sources (list): Source files.
+            directory (str): Directory for the local copies.
+
+        Returns:
+            dict: Local copies by source.
+
+        """
+        localized = {}
+        cache = InputCache.from_config(self.config)
+        if cache is None:
+            return localized
+        for source in sources:
+            if _is_remote(source) or source in localized:
+                continue
+            cached = cache.lookup(source)
+            if cached is None:
+                continue
+            local = directory.rstrip("/") + os.path.abspath(source)
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            _clone_or_link(cached, local)
+            localized[source] = local
+        logger.info(
+            "Using {} of {} inputs from the input cache", len(localized), len(sources)
+        )
+        return localized
+
     def set_resources_from_dict(self, res_dict):
         """Set resources from dict.
 
@@ -607,6 +1647,511 @@ class FileManager:
                     )
 
 
+def _transfer(function, source, destination):
+    """Transfer a file and log failures.
+
+    Args:
+        function (callable): _symlink, _copy or _move.
+        source (str): Source path.
+        destination (str): Destination path.
+
+    Returns:
+        bool: True if success
+
+    """
+    try:
+        function(source, destination)
+    except OSError as error:
+        logger.error("Could not transfer {} to {}: {}", source, destination, error)
+        return False
+    return True
+
+
+def _is_remote(path):
+    """Return whether a path is a URL.
+
+    Args:
+        path (str): Path or URL.
+
+    Returns:
+        bool: True for URLs like "https://host/path".
+
+    """
+    return "://" in path
+
+
+def _destination_path(source, destination):
+    """Return the destination path as for ln/cp/mv.
+
+    Args:
+        source (str): Source path.
+        destination (str): Destination file or directory.
+
+    Returns:
+        str: Destination path. Inside destination if it is a directory.
+
+    """
+    if os.path.isdir(destination):
+        return os.path.join(destination, os.path.basename(source))
+    return destination
+
+
+def _symlink(source, destination):
+    """Symlink source to destination in place, like `ln -sf`.
+
+    Args:
+        source (str): Source path.
+        destination (str): Destination path.
+
+    """
+    destination = _destination_path(source, destination)
+    try:
+        os.symlink(source, destination)
+    except FileExistsError:
+        # Replace the existing destination atomically
+        tmp_destination = f"{destination}.{uuid.uuid4().hex}.tmp"
+        os.symlink(source, tmp_destination)
+        try:
+            os.replace(tmp_destination, destination)
+        except OSError:
+            os.unlink(tmp_destination)
+            raise
+
+
+def _copy(source, destination, hardlink=False):
+    """Copy source to destination, like `cp`.
+
+    Tries in order a reflink clone, a hardlink (if allowed), a kernel
+    copy_file_range and a streamed copy. The copy is written to a temporary file
+    and moved in place, so an existing destination linked to other files is
+    never written to.
+
+    Args:
+        source (str): Source path.
+        destination (str): Destination path.
+        hardlink (bool, optional): Allow hardlinks, i.e. the destination is
+            treated read-only. Defaults to False.
+
+    Returns:
+        str: Method used: "reflink", "hardlink", "copy_file_range" or "stream".
+
+    Raises:
+        SameFileError: If source and destination are the same file.
+
+    """
+    destination = _destination_path(source, destination)
+    if os.path.exists(destination) and os.path.samefile(source, destination):
+        raise shutil.SameFileError(f"{source} and {destination} are the same file")
+
+    tmp_destination = f"{destination}.{uuid.uuid4().hex}.tmp"
+    method = None
+    try:
+        device = os.stat(source).st_dev
+        same_device = (
+            device == os.stat(os.path.dirname(os.path.abspath(destination))).st_dev
+        )
+        if same_device and fcntl is not None and device not in _NO_REFLINK_DEVICES:
+            with open(source, "rb") as fsrc, open(tmp_destination, "wb") as fdst:
+                if _reflink(fsrc, fdst):
+                    method = "reflink"
+            if method is None:
+                _NO_REFLINK_DEVICES.add(device)
+                os.unlink(tmp_destination)
+        if method is None and hardlink and same_device:
+            try:
+                os.link(source, tmp_destination)
+            except OSError as error:
+                if error.errno not in _UNSUPPORTED_COPY_ERRNOS | {errno.EMLINK}:
+                    raise
+            else:
+                method = "hardlink"
+        if method is None:
+            with open(source, "rb") as fsrc, open(tmp_destination, "wb") as fdst:
+                method = _copy_fileobj(fsrc, fdst)
+        if method != "hardlink":
+            shutil.copymode(source, tmp_destination)
+        os.replace(tmp_destination, destination)
+    except BaseException:
+        if os.path.lexists(tmp_destination):
+            os.unlink(tmp_destination)
+        raise
+    return method
+
+
+def _reflink(fsrc, fdst):
+    """Clone an open file to another with the FICLONE ioctl.
+
+    Args:
+        fsrc (io.BufferedReader): Source.
+        fdst (io.BufferedWriter): Empty destination.
+
+    Returns:
+        bool: False if the file system does not support it.
+
+    """
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError as error:
+        if error.errno not in _UNSUPPORTED_COPY_ERRNOS:
+            raise
+        return False
+    return True
+
+
+def _copy_fileobj(fsrc, fdst):
+    """Copy an open file to another with copy_file_range, else by streaming.
+
+    Args:
+        fsrc (io.BufferedReader): Source.
+        fdst (io.BufferedWriter): Empty destination.
+
+    Returns:
+        str: Method used: "copy_file_range" or "stream".
+
+    """
+    if hasattr(os, "copy_file_range"):
+        offset = 0
+        try:
+            while True:
+                copied = os.copy_file_range(
+                    fsrc.fileno(), fdst.fileno(), 64 * COPY_BUFSIZE, offset, offset
+                )
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError as error:
+            if offset > 0 or error.errno not in _UNSUPPORTED_COPY_ERRNOS:
+                raise
+        else:
+            # Nothing copied for e.g. files in /proc, which are then streamed
+            if offset > 0:
+                return "copy_file_range"
+
+    shutil.copyfileobj(fsrc, fdst, COPY_BUFSIZE)
+    return "stream"
+
+
+def _move(source, destination):
+    """Move source to destination, like `mv`.
+
+    Args:
+        source (str): Source path.
+        destination (str): Destination path.
+
+    """
+    destination = _destination_path(source, destination)
+    try:
+        os.replace(source, destination)
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+        # Across file systems
+        shutil.move(source, destination)
+
+
+def _clone_or_link(source, destination):
+    """Clone source to destination if supported, else link it.
+
+    On the same file system the destination is a hardlink if the file can not be
+    cloned, so it survives the removal of the source. Otherwise it is a symlink.
+
+    Args:
+        source (str): Source path.
+        destination (str): Destination path.
+
+    Returns:
+        str: Method used: "reflink", "hardlink" or "symlink".
+
+    """
+    destination = _destination_path(source, destination)
+    source_stat = os.stat(source)
+    device = source_stat.st_dev
+    if device == os.stat(os.path.dirname(os.path.abspath(destination))).st_dev:
+        tmp_destination = f"{destination}.{uuid.uuid4().hex}.tmp"
+        try:
+            if fcntl is not None and device not in _NO_REFLINK_DEVICES:
+                with open(source, "rb") as fsrc, open(tmp_destination, "wb") as fdst:
+                    cloned = _reflink(fsrc, fdst)
+                if cloned:
+                    os.chmod(tmp_destination, source_stat.st_mode | 0o200)
+                    os.replace(tmp_destination, destination)
+                    return "reflink"
+                _NO_REFLINK_DEVICES.add(device)
+                os.unlink(tmp_destination)
+            try:
+                os.link(source, tmp_destination)
+            except OSError as error:
+                if error.errno not in _UNSUPPORTED_COPY_ERRNOS | {errno.EMLINK}:
+                    raise
+            else:
+                os.replace(tmp_destination, destination)
+                return "hardlink"
+        finally:
+            if os.path.lexists(tmp_destination):
+                os.unlink(tmp_destination)
+    _symlink(source, destination)
+    return "symlink"
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on a lock file.
+
+    Locks are shared between processes, and between threads opening the lock
+    file separately.
+
+    Args:
+        path (pathlib.Path): Lock file.
+
+    Yields:
+        None
+
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, mode="a", encoding="utf-8") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+class InputCache:
+    """Content-addressed cache of input files on the local node.
+
+    Files are stored under their sha256 digest in `objects`, and the digest of a
+    source file is recorded together with its size and modification time in
+    `sources`. A source is only fetched again if it has changed, and identical
+    files are stored once. The least recently used files are evicted when the
+    cache grows beyond its size. Lock files make sure that concurrent processes
+    do not fetch the same file at the same time.
+
+    Tasks get a hardlink to a cached file when it can not be cloned, but a
+    symlink across file systems. A cached file is therefore not evicted within a
+    lease after its last use, so that the symlinks of running tasks and of
+    prefetched cycles stay valid. The cache may grow beyond its size meanwhile.
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_size=DEFAULT_INPUT_CACHE_SIZE,
+        lease=DEFAULT_INPUT_CACHE_LEASE,
+    ):
+        """Construct the object.
+
+        Args:
+            directory (str): Cache directory.
+            max_size (int, optional): Maximum size in bytes. Defaults to
+                DEFAULT_INPUT_CACHE_SIZE.
+            lease (float, optional): Seconds after its last use a file may be
+                evicted. Defaults to DEFAULT_INPUT_CACHE_LEASE.
+
+        """
+        self.directory = Path(directory)
+        self.max_size = int(max_size)
+        self.lease = lease
+
+    @classmethod
+    def from_config(cls, config):
+        """Return the input cache set in the config.
+
+        The cache is set in general.input_cache. It should be on a node-local
+        file system, and an empty directory disables the cache.
+
+        Args:
+            config (deode.ParsedConfig): Configuration
+
+        Returns:
+            InputCache: The input cache, or None if caching is disabled.
+
+        """
+        directory = config.get_value("general.input_cache.directory", default="")
+        max_size = config.get_value(
+            "general.input_cache.max_size", default=DEFAULT_INPUT_CACHE_SIZE
+        )
+        lease = config.get_value(
+            "general.input_cache.lease", default=DEFAULT_INPUT_CACHE_LEASE
+        )
+        if not directory:
+            return None
+        directory = Platform(config).substitute(directory)
+        return cls(directory, max_size=max_size, lease=lease)
+
+    def get(self, source):
+        """Return the cached copy of a file, fetching it if needed.
+
+        Args:
+            source (str): Source file.
+
+        Returns:
+            tuple: Path of the cached file (None if the file is larger than the
+                cache) and whether the file was already cached.
+
+        """
+        source = os.path.abspath(source)
+        if os.stat(source).st_size > self.max_size:
+            return None, False
+        record_path = self._record_path(source)
+        with _file_lock(self.directory / "locks" / f"{record_path.stem}.lock"):
+            cached = self._lookup(source, record_path)
+            if cached is not None:
+                logger.debug("Found {} in cache {}", source, cached)
+                return cached, True
+            cached = self._fetch(source, record_path)
+        logger.debug("Cached {} in {}", source, cached)
+        self.evict(keep=cached)
+        return cached, False
+
+    def lookup(self, source):
+        """Return the cached copy of a file without fetching it.
+
+        Args:
+            source (str): Source file.
+
+        Returns:
+            str: Path of the cached file, or None if the file is not cached, has
+                changed since it was cached or does not exist.
+
+        """
+        source = os.path.abspath(source)
+        try:
+            return self._lookup(source, self._record_path(source))
+        except FileNotFoundError:
+            return None
+
+    def _record_path(self, source):
+        """Return the path of the record of a cached source.
+
+        Args:
+            source (str): Absolute path of the source file.
+
+        Returns:
+            pathlib.Path: Path.
+
+        """
+        key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        return self.directory / "sources" / f"{key}.json"
+
+    def _object_path(self, digest):
+        """Return the path of a cached file.
+
+        Args:
+            digest (str): Content digest.
+
+        Returns:
+            str: Path.
+
+        """
+        return os.fspath(self.directory / "objects" / digest[:2] / digest[2:])
+
+    def _lookup(self, source, record_path):
+        """Return the cached file if it is up to date with the source.
+
+        Args:
+            source (str): Source file.
+            record_path (pathlib.Path): Record of the cached source.
+
+        Returns:
+            str: Path of the cached file, or None.
+
+        """
+        try:
+            with open(record_path, mode="r", encoding="utf-8") as record_file:
+                record = json.load(record_file)
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(source)
+        if record["size"] != stat.st_size or record["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        cached = self._object_path(record["digest"])
+        try:
+            # The modification time of cached files is their last use
+            os.utime(cached)
+        except FileNotFoundError:
+            return None
+        return cached
+
+    def _fetch(self, source, record_path):
+        """Copy a file into the cache.
+
+        Args:
+            source (str): Source file.
+            record_path (pathlib.Path): Record of the cached source.
+
+        Returns:
+            str: Path of the cached file.
+
+        """
+        tmp_dir = self.directory / "objects"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / f"{uuid.uuid4().hex}.tmp"
+        digest = hashlib.sha256()
+        try:
+            with open(source, "rb") as fsrc, open(tmp_path, "wb") as fdst:
+                stat = os.fstat(fsrc.fileno())
+                for block in iter(functools.partial(fsrc.read, COPY_BUFSIZE), b""):
+                    digest.update(block)
+                    fdst.write(block)
+            # Cached files are shared and must not be modified
+            os.chmod(tmp_path, stat.st_mode & 0o555)
+            cached = self._object_path(digest.hexdigest())
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            os.replace(tmp_path, cached)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+        record = {
+            "source": source,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": digest.hexdigest(),
+        }
+        record_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_record_path = record_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp_record_path, mode="w", encoding="utf-8") as record_file:
+            json.dump(record, record_file)
+        os.replace(tmp_record_path, record_path)
+        return cached
+
+    def evict(self, keep=None):
+        """Remove the least recently used files until the cache fits its size.
+
+        Files used within the lease are kept.
+
+        Args:
+            keep (str, optional): Cached file never to remove. Defaults to None.
+
+        """
+        with _file_lock(self.directory / "evict.lock"):
+            cached_files = []
+            total_size = 0
+            leased_since = time.time_ns() - int(self.lease * 1e9)
+            for dirpath, __, filenames in os.walk(self.directory / "objects"):
+                for filename in filenames:
+                    if filename.endswith(".tmp"):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    total_size += stat.st_size
+                    cached_files.append((stat.st_mtime_ns, stat.st_size, path))
+
+            for mtime_ns, size, path in sorted(cached_files):
+                if total_size <= self.max_size:
+                    break
+                if mtime_ns >= leased_since:
+                    logger.debug("Input cache exceeds its size with files in use")
+                    break
+                if path == keep:
+                    continue
+                logger.debug("Evict {} from the input cache", path)
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+                total_size -= size
+
+
 class LocalFileSystemSymlink(Provider):
     """Local file system."""
 
@@ -632,36 +2177,54 @@ class LocalFileSystemSymlink(Provider):
 
         """
         if self.fetch:
-            if os.path.exists(self.identifier):
+            if self._source_exists(self.identifier):
                 logger.info("ln -sf {} {} ", self.identifier, resource.identifier)
-                os.system(f"ln -sf {self.identifier} {resource.identifier}")  # noqa S605
-                return True
+                return self._transfer(_symlink, self.identifier, resource.identifier)
             else:
                 logger.warning("File is missing {} ", self.identifier)
                 return False
         else:
-            if os.path.exists(resource.identifier):
+            if self._source_exists(resource.identifier):
                 logger.info("ln -sf {} {} ", resource.identifier, self.identifier)
-                os.system(f"ln -sf {resource.identifier} {self.identifier}")  # noqa S605
-                return True
+                return self._transfer(_symlink, resource.identifier, self.identifier)
             else:
                 logger.warning("File is missing {} ", resource.identifier)
                 return False
 
 
 class LocalFileSystemCopy(Provider):
-    """Local file system copy."""
+    """Local file system copy.
 
-    def __init__(self, config, pattern, fetch=True):
+    Files are cloned if the file system supports it (reflink), else copied in the
+    kernel. Read-only copies may be hardlinks. The method used is recorded in the
+    `method` attribute.
+    """
+
+    def __init__(self, config, pattern, fetch=True, readonly=False):
         """Construct the object.
 
         Args:
             config (deode.ParsedConfig): Configuration
             pattern (str): Identifier string
             fetch (bool, optional): Fetch data. Defaults to False.
+            readonly (bool, optional): The copy is only read, so it may be a
+                hardlink. Defaults to False.
 
         """
         Provider.__init__(self, config, pattern, fetch=fetch)
+        self.readonly = readonly
+        self.method = None
+
+    def _copy(self, source, destination):
+        """Copy the file and record the method used.
+
+        Args:
+            source (str): Source path.
+            destination (str): Destination path.
+
+        """
+        self.method = _copy(source, destination, hardlink=self.readonly)
+        logger.debug("Copied {} to {} with {}", source, destination, self.method)
 
     def create_resource(self, resource):
         """Create the resource.
@@ -674,18 +2237,16 @@ class LocalFileSystemCopy(Provider):
 
         """
         if self.fetch:
-            if os.path.exists(self.identifier):
+            if self._source_exists(self.identifier):
                 logger.info("cp {} {} ", self.identifier, resource.identifier)
-                os.system(f"cp {self.identifier} {resource.identifier}")  # noqa S605
-                return True
+                return self._transfer(self._copy, self.identifier, resource.identifier)
             else:
                 logger.warning("File is missing {} ", self.identifier)
                 return False
         else:
-            if os.path.exists(resource.identifier):
+            if self._source_exists(resource.identifier):
                 logger.info("cp {} {} ", resource.identifier, self.identifier)
-                os.system(f"cp {resource.identifier} {self.identifier}")  # noqa S605
-                return True
+                return self._transfer(self._copy, resource.identifier, self.identifier)
             else:
                 logger.warning("File is missing {} ", resource.identifier)
                 return False
@@ -716,23 +2277,89 @@ class LocalFileSystemMove(Provider):
 
         """
         if self.fetch:
-            if os.path.exists(self.identifier):
+            if self._source_exists(self.identifier):
                 logger.info("mv {} {} ", self.identifier, resource.identifier)
-                os.system(f"mv {self.identifier} {resource.identifier}")  # noqa S605
-                return True
+                return self._transfer(_move, self.identifier, resource.identifier)
             else:
                 logger.warning("File is missing {} ", self.identifier)
                 return False
         else:
-            if os.path.exists(resource.identifier):
+            if self._source_exists(resource.identifier):
                 logger.info("mv {} {} ", resource.identifier, self.identifier)
-                os.system(f"mv {resource.identifier} {self.identifier}")  # noqa S605
-                return True
+                return self._transfer(_move, resource.identifier, self.identifier)
             else:
                 logger.warning("File is missing {} ", resource.identifier)
                 return False
 
 
+class LocalFileCache(Provider):
+    """Local input cache.
+
+    Fetched files are kept in the InputCache on the node. The resource is a
+    reflink clone of the cached file where supported, else a symlink to it. The
+    method used is recorded in the `method` attribute and whether the file was
+    already cached in `hit`. Symlinks to evicted files dangle, so the cache should
+    hold the inputs of the tasks running on the node.
+    """
+
+    def __init__(self, config, pattern, fetch=True):
+        """Construct the object.
+
+        Args:
+            config (deode.ParsedConfig): Configuration
+            pattern (str): Identifier string
+            fetch (bool, optional): Fetch data. Defaults to True.
+
+        """
+        Provider.__init__(self, config, pattern, fetch=fetch)
+        self.cache = InputCache.from_config(config)
+        self.method = None
+        self.hit = False
+
+    def create_resource(self, resource):
+        """Create the resource.
+
+        Args:
+            resource (Resource): Resource.
+
+        Returns:
+            bool: True if success
+
+        """
+        if not self.fetch:
+            logger.warning("The cache provider can not store {}", resource.identifier)
+            return False
+        if not self._source_exists(self.identifier):
+            logger.warning("File is missing {} ", self.identifier)
+            return False
+        logger.info("cache {} {} ", self.identifier, resource.identifier)
+        return self._transfer(self._fetch, self.identifier, resource.identifier)
+
+    def _fetch(self, source, destination):
+        """Fetch the file through the cache and record the method used.
+
+        Args:
+            source (str): Source path.
+            destination (str): Destination path.
+
+        """
+        destination = _destination_path(source, destination)
+        cached = None
+        if self.cache is not None:
+            cached, self.hit = self.cache.get(source)
+        if cached is None:
+            # Caching disabled or file too large
+            cached = source
+        self.method = _clone_or_link(cached, destination)
+        logger.debug(
+            "Fetched {} to {} with {} (hit={})",
+            source,
+            destination,
+            self.method,
+            self.hit,
+        )
+
+
 class ArchiveProvider(Provider):
     """Data from ECFS."""
 
@@ -745,8 +2372,7 @@ class ArchiveProvider(Provider):
             fetch (bool, optional): Fetch the data. Defaults to True.
 
         """
-        self.fetch = fetch
-        Provider.__init__(self, config, pattern)
+        Provider.__init__(self, config, pattern, fetch=fetch)
 
     def create_resource(self, resource):
         """Create the resource.
@@ -773,10 +2399,14 @@ class ECFS(ArchiveProvider):
             fetch (bool, optional): Fetch the data. Defaults to True.
         """
         ArchiveProvider.__init__(self, config, pattern, fetch=fetch)
+        self.backend, self.queue = Platform(config).get_archive()
 
     def create_resource(self, resource):
         """Create the resource.
 
+        Data to store are added to the archive queue, so the task does not wait
+        for the archiving. Without an archive backend the transfer is only logged.
+
         Args:
             resource (Resource): Resource.
 
@@ -786,10 +2416,29 @@ class ECFS(ArchiveProvider):
         """
         if self.fetch:
             logger.info("ecp ecfs:{} {}", self.identifier, resource.identifier)
-            # os.system(f"ecp ecfs:{self.identifier} {resource.identifier}")  # noqa S605, E800
+            if self.backend is not None:
+                start = time.perf_counter()
+                try:
+                    self.backend.get(self.identifier, resource.identifier)
+                except (ArchiveBackendError, OSError) as error:
+                    logger.warning("Could not fetch {}: {}", self.identifier, error)
+                    self._record(
+                        self.identifier,
+                        resource.identifier,
+                        time.perf_counter() - start,
+                        False,
+                    )
+                    return False
+                self._record(
+                    self.identifier,
+                    resource.identifier,
+                    time.perf_counter() - start,
+                    True,
+                )
         else:
             logger.info("ecp {} ecfs:{}", resource.identifier, self.identifier)
-            # os.system(f"ecp {resource.identifier} ecfs:{self.identifier}")  # noqa S605, E800
+            if self.queue is not None:
+                self.queue.put(resource.identifier, self.identifier)
         return True
 
 
@@ -0,0 +1,44 @@
+"""Shared fixtures for the benchmarks.
+
+The benchmarks are not part of the default test paths. Run them explicitly with e.g.
+``pytest -s tests/benchmarks``.
+"""
+from pathlib import Path
+
+import pysurfex
+import pytest
+
+from experiment import PACKAGE_NAME
+from experiment.experiment import ExpFromFiles
+from experiment.logs import logger
+
+logger.enable(PACKAGE_NAME)
+
+
+@pytest.fixture(scope="session")
+def pysurfex_experiment():
+    return f"{str(((Path(__file__).parent).parent).parent)}"
+
+
+@pytest.fixture(scope="session")
+def exp_dependencies(pysurfex_experiment, tmp_path_factory):
+    tmpdir = f"{tmp_path_factory.getbasetemp().as_posix()}"
+    wdir = f"{tmpdir}/benchmark"
+    pysurfex_path = f"{str((Path(pysurfex.__file__).parent).parent)}"
+    return ExpFromFiles.setup_files(
+        wdir,
+        "benchmark",
+        "ECMWF-atos",
+        pysurfex_path,
+        pysurfex_experiment,
+        offline_source=f"{tmpdir}/source",
+    )
+
+
+@pytest.fixture(scope="session")
+def exp_configuration_file(exp_dependencies, tmp_path_factory):
+    """Write a full exp_configuration.json as done by PySurfexExpConfig."""
+    tmpdir = f"{tmp_path_factory.getbasetemp().as_posix()}"
+    exp_configuration_file = f"{tmpdir}/exp_configuration.json"
+    ExpFromFiles(exp_dependencies).dump_json(exp_configuration_file, indent=2)
+    return exp_configuration_file
@@ -0,0 +1,71 @@
+"""Benchmark the time tasks spend on archiving output."""
+import json
+import os
+import time
+
+from experiment.archive import ArchiveQueue, DirectoryArchive, file_checksum
+from experiment.config_parser import ParsedConfig
+from experiment.logs import logger
+from experiment.toolbox import FileManager
+
+
+def test_archive_output(exp_configuration_file, tmp_path):
+    nfiles = 10
+    size = 32 * 1024 * 1024
+    config = ParsedConfig.from_file(exp_configuration_file).copy(
+        update={
+            "general": {
+                "archive": {
+                    "backend": "directory",
+                    "directory": f"{tmp_path}/ecfs",
+                    "queue": f"{tmp_path}/queue",
+                }
+            }
+        }
+    )
+    fmanager = FileManager(config)
+    outputs = []
+    for index in range(nfiles):
+        output = tmp_path / f"SURFOUT_{index}.nc"
+        output.write_bytes(os.urandom(size))
+        outputs.append(output.as_posix())
+
+    # Archiving in the task: copy and verify
+    backend = DirectoryArchive(f"{tmp_path}/sync")
+    start = time.perf_counter()
+    for output in outputs:
+        remote = f"ectmp:/{os.path.basename(output)}"
+        backend.put(output, remote)
+        assert backend.checksum(remote) == file_checksum(output)
+    before = time.perf_counter() - start
+
+    os.makedirs(f"{tmp_path}/out")
+    start = time.perf_counter()
+    for output in outputs:
+        destination = f"{tmp_path}/out/{os.path.basename(output)}"
+        fmanager.get_output(output, destination, archive=True)
+    after = time.perf_counter() - start
+    # The task only queued the files
+    archive = DirectoryArchive(f"{tmp_path}/ecfs")
+    entries = [
+        json.loads(entry.read_text())
+        for entry in ArchiveQueue(f"{tmp_path}/queue").pending()
+    ]
+    remotes = [entry["remote"] for entry in entries]
+    assert len(remotes) == nfiles
+    assert not any(archive.path(remote).exists() for remote in remotes)
+
+    start = time.perf_counter()
+    assert fmanager.drain_archive() == {"archived": nfiles, "failed": 0}
+    drain = time.perf_counter() - start
+    logger.info(
+        "Archive {} x {} MB: in task {:.0f} ms, queued {:.1f} ms (drained in {:.0f} ms)",
+        nfiles,
+        size // (1024 * 1024),
+        1e3 * before,
+        1e3 * after,
+        1e3 * drain,
+    )
+    assert [archive.checksum(remote) for remote in remotes] == [
+        file_checksum(entry["local_path"]) for entry in entries
+    ]
@@ -0,0 +1,48 @@
+"""Benchmark copying the parsed configuration with updates."""
+import timeit
+
+import pytest
+
+from experiment.config_parser import ParsedConfig, _update_nested_dict
+from experiment.logs import logger
+
+UPDATES = {
+    "tasks": {"SURFEX": {"ASSIM": {"OBS": {"NNCO": [1, 1, 0, 0, 1]}}}},
+    "ecflow": {
+        "general": {
+            "stream": "1",
+            "realization": "0",
+            "times": {
+                "basetime": "2023-01-01T03:00:00Z",
+                "validtime": "2023-01-01T03:00:00Z",
+                "basetime_pp": "2023-01-01T03:00:00Z",
+            },
+        },
+        "task": {"wrapper": "", "var_name": "", "args": {}},
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def config(exp_configuration_file):
+    return ParsedConfig.from_file(exp_configuration_file)
+
+
+@pytest.mark.parametrize("update", UPDATES.values(), ids=UPDATES.keys())
+def test_copy_with_update_cost(config, update):
+    number = 20
+
+    def full_rebuild():
+        return ParsedConfig.parse_obj(
+            _update_nested_dict(config.dict(), update), json_schema=config.json_schema
+        )
+
+    assert config.copy(update=update).dict() == full_rebuild().dict()
+    before = timeit.timeit(full_rebuild, number=number) / number
+    after = timeit.timeit(lambda: config.copy(update=update), number=number) / number
+    logger.info(
+        "copy(update=...): full rebuild {:.2f} ms, copy-on-write {:.2f} ms ({:.1f}x)",
+        1e3 * before,
+        1e3 * after,
+        before / after,
+    )
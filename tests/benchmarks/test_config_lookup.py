@@ -0,0 +1,65 @@
+"""Benchmark dotted-path lookups in the parsed configuration."""
+import timeit
+from functools import reduce
+
+import pytest
+
+from experiment.config_parser import ParsedConfig, _get_attr_or_item
+from experiment.logs import logger
+
+LOOKUPS = [
+    "general.case",
+    "general.times.basetime",
+    "general.realization",
+    "general.cnmexp",
+    "domain.name",
+    "system.archive_dir",
+    "system.wrk",
+    "SURFEX.IO.CSURFFILE",
+    "SURFEX.IO.CSURF_FILETYPE",
+    "SURFEX.ASSIM.OBS.COBS_M",
+    "SURFEX.ASSIM.OBS.NNCO",
+    "initial_conditions.fg4oi.inputfile",
+]
+MISSING_LOOKUPS = [
+    "initial_conditions.fg4oi.air_temperature_2m.inputfile",
+    "observations.oi.t2m.hlength",
+]
+
+
+@pytest.fixture(scope="module")
+def config(exp_configuration_file):
+    return ParsedConfig.from_file(exp_configuration_file)
+
+
+def test_get_value_lookup_cost(config):
+    number = 2000
+
+    def walk():
+        values = [
+            reduce(_get_attr_or_item, items.split("."), config) for items in LOOKUPS
+        ]
+        for items in MISSING_LOOKUPS:
+            try:
+                values.append(reduce(_get_attr_or_item, items.split("."), config))
+            except AttributeError:
+                values.append(None)
+        return values
+
+    def indexed():
+        values = [config.get_value(items) for items in LOOKUPS]
+        for items in MISSING_LOOKUPS:
+            values.append(config.get_value(items, default=None))
+        return values
+
+    assert indexed() == walk()
+
+    before = timeit.timeit(walk, number=number) / number
+    after = timeit.timeit(indexed, number=number) / number
+    nlookups = len(LOOKUPS) + len(MISSING_LOOKUPS)
+    logger.info(
+        "get_value: tree walk {:.2f} us/lookup, indexed {:.2f} us/lookup ({:.1f}x)",
+        1e6 * before / nlookups,
+        1e6 * after / nlookups,
+        before / after,
+    )
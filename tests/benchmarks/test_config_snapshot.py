@@ -0,0 +1,35 @@
+"""Benchmark reading the configuration from its snapshot."""
+import timeit
+
+from experiment.config_parser import ParsedConfig
+from experiment.logs import logger
+
+
+def test_from_file_with_snapshot(exp_configuration_file, mocker):
+    number = 50
+    config = ParsedConfig.from_file(exp_configuration_file, use_snapshot=False)
+    config.write_snapshot()
+    parse_obj = mocker.spy(ParsedConfig, "parse_obj")
+    assert ParsedConfig.from_file(exp_configuration_file).dict() == config.dict()
+    # Neither parsed nor validated again
+    assert parse_obj.call_count == 0
+
+    before = (
+        timeit.timeit(
+            lambda: ParsedConfig.from_file(exp_configuration_file, use_snapshot=False),
+            number=number,
+        )
+        / number
+    )
+    after = (
+        timeit.timeit(
+            lambda: ParsedConfig.from_file(exp_configuration_file), number=number
+        )
+        / number
+    )
+    logger.info(
+        "from_file: parse and validate {:.2f} ms, snapshot {:.2f} ms ({:.1f}x)",
+        1e3 * before,
+        1e3 * after,
+        before / after,
+    )
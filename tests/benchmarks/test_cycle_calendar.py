@@ -0,0 +1,42 @@
+"""Benchmark building the cycles of a long reanalysis."""
+import timeit
+
+import numpy as np
+
+from experiment.cycles import CycleCalendar, cycle_hours_from_length
+from experiment.datetime_utils import as_datetime, as_timedelta
+from experiment.logs import logger
+
+
+def test_reanalysis_basetimes():
+    number = 5
+    basetime = as_datetime("2000-01-01T00:00:00Z")
+    endtime = as_datetime("2019-12-31T21:00:00Z")
+    cycle_length = as_timedelta("PT3H")
+    calendar = CycleCalendar(basetime, endtime, cycle_hours_from_length(cycle_length))
+
+    def loop():
+        basetime_list = []
+        dtg = basetime
+        while dtg <= endtime:
+            basetime_list.append(dtg)
+            dtg = dtg + cycle_length
+        return basetime_list
+
+    basetime_list = loop()
+    assert calendar.basetimes() == basetime_list
+    seconds = [int(dtg.timestamp()) for dtg in basetime_list]
+    assert np.array_equal(calendar.as_datetime64().astype(np.int64), seconds)
+
+    timings = {
+        "loop": timeit.timeit(loop, number=number) / number,
+        "basetimes": timeit.timeit(calendar.basetimes, number=number) / number,
+        "datetime64": timeit.timeit(calendar.as_datetime64, number=number) / number,
+    }
+    # Only as_datetime64 is vectorized, basetimes() still creates one datetime
+    # object per cycle, so it is reported but not compared
+    logger.info(
+        "Build {} cycles: {}",
+        len(calendar),
+        ", ".join(f"{name} {1e3 * timing:.1f} ms" for name, timing in timings.items()),
+    )
@@ -0,0 +1,145 @@
+"""Benchmark staging of many small files with the file manager."""
+import os
+import time
+
+import pytest
+
+from experiment.config_parser import ParsedConfig
+from experiment.logs import logger
+from experiment.toolbox import FileManager, InputCache, LocalFileOnDisk
+
+NFILES = 200
+
+
+@pytest.fixture(scope="module")
+def fmanager(exp_configuration_file):
+    return FileManager(ParsedConfig.from_file(exp_configuration_file))
+
+
+@pytest.fixture()
+def sources(tmp_path):
+    source_dir = tmp_path / "sources"
+    source_dir.mkdir()
+    sources = []
+    for index in range(NFILES):
+        source = source_dir / f"soilgrid_{index:04d}.tif"
+        source.write_bytes(os.urandom(4096))
+        sources.append(source.as_posix())
+    return sources
+
+
+def stage_with_shell(command, sources, destination_dir):
+    # What the providers did before
+    for source in sources:
+        destination = f"{destination_dir}/{os.path.basename(source)}"
+        os.system(f"{command} {source} {destination}")  # noqa S605
+
+
+@pytest.mark.parametrize("provider_id,command", [("symlink", "ln -sf"), ("copy", "cp")])
+def test_stage_many_files(fmanager, sources, tmp_path, provider_id, command):
+    def destination_dir(name):
+        path = tmp_path / name
+        path.mkdir()
+        return path.as_posix()
+
+    shell_dir = destination_dir("shell")
+    start = time.perf_counter()
+    stage_with_shell(command, sources, shell_dir)
+    before = time.perf_counter() - start
+
+    serial_dir = destination_dir("serial")
+    start = time.perf_counter()
+    for source in sources:
+        fmanager.input(
+            source, f"{serial_dir}/{os.path.basename(source)}", provider_id=provider_id
+        )
+    serial = time.perf_counter() - start
+
+    batch_dir = destination_dir("batch")
+    start = time.perf_counter()
+    statuses = fmanager.input_many(
+        [(source, f"{batch_dir}/{os.path.basename(source)}") for source in sources],
+        provider_id=provider_id,
+    )
+    batch = time.perf_counter() - start
+
+    assert all(status.success for status in statuses)
+    assert sorted(os.listdir(batch_dir)) == sorted(os.listdir(shell_dir))
+    logger.info(
+        "{} {} files: shell {:.0f} ms, input {:.0f} ms, input_many {:.0f} ms",
+        provider_id,
+        NFILES,
+        1e3 * before,
+        1e3 * serial,
+        1e3 * batch,
+    )
+
+
+@pytest.mark.parametrize("provider_id", ["copy", "readonly_copy"])
+def test_copy_large_file(fmanager, tmp_path, provider_id):
+    size = 256 * 1024 * 1024
+    source = tmp_path / "PGD.fa"
+    with open(source, mode="wb") as fhandler:
+        for __ in range(size // (1024 * 1024)):
+            fhandler.write(os.urandom(1024 * 1024))
+
+    start = time.perf_counter()
+    os.system(f"cp {source} {tmp_path}/shell_copy")  # noqa S605
+    before = time.perf_counter() - start
+
+    provider = fmanager.platform.get_provider(provider_id, source.as_posix())
+    destination = LocalFileOnDisk(fmanager.config, f"{tmp_path}/copy")
+    start = time.perf_counter()
+    assert provider.create_resource(destination)
+    after = time.perf_counter() - start
+
+    assert (tmp_path / "copy").stat().st_size == size
+    logger.info(
+        "{} {} MB: cp {:.0f} ms, {} {:.1f} ms",
+        provider_id,
+        size // (1024 * 1024),
+        1e3 * before,
+        provider.method,
+        1e3 * after,
+    )
+
+
+def test_restage_static_inputs(fmanager, tmp_path, mocker):
+    nfiles = 20
+    sources = []
+    for index in range(nfiles):
+        source = tmp_path / f"gmted_{index:02d}.tif"
+        source.write_bytes(os.urandom(8 * 1024 * 1024))
+        sources.append(source.as_posix())
+    config = fmanager.config.copy(
+        update={"general": {"input_cache": {"directory": f"{tmp_path}/cache"}}}
+    )
+    cached_fmanager = FileManager(config)
+
+    def stage(fmanager, provider_id, cycle):
+        os.makedirs(f"{tmp_path}/{provider_id}/{cycle}")
+        start = time.perf_counter()
+        statuses = fmanager.input_many(
+            [
+                (source, f"{tmp_path}/{provider_id}/{cycle}/{os.path.basename(source)}")
+                for source in sources
+            ],
+            provider_id=provider_id,
+        )
+        assert all(status.success for status in statuses)
+        return time.perf_counter() - start
+
+    before = stage(fmanager, "copy", "cycle1")
+    fetch = mocker.spy(InputCache, "_fetch")
+    first = stage(cached_fmanager, "cache", "cycle1")
+    after = stage(cached_fmanager, "cache", "cycle2")
+    # Only the first cycle fetched the inputs
+    assert fetch.call_count == nfiles
+    logger.info(
+        "Stage {} x 8 MB static inputs: copy {:.1f} ms, cache {:.1f} ms (first) "
+        "{:.1f} ms (cached)",
+        nfiles,
+        1e3 * before,
+        1e3 * first,
+        1e3 * after,
+    )
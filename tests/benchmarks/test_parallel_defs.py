@@ -0,0 +1,50 @@
+"""Benchmark building the suite definition of a long experiment in parallel."""
+import os
+import time
+
+import pytest
+
+from experiment.config_parser import ParsedConfig
+from experiment.logs import logger
+from experiment.suites import get_defs
+
+pytest.importorskip("ecflow")
+
+
+@pytest.fixture(scope="module")
+def config(exp_configuration_file, tmp_path_factory):
+    joboutdir = tmp_path_factory.mktemp("joboutdir").as_posix()
+    times = {
+        "start": "2010-01-01T00:00:00Z",
+        "basetime": "2010-01-01T00:00:00Z",
+        "end": "2019-12-31T21:00:00Z",
+    }
+    return ParsedConfig.from_file(exp_configuration_file).copy(
+        update={
+            "general": {"times": times, "window": {"cycles": 0}},
+            "system": {"joboutdir": joboutdir},
+        }
+    )
+
+
+def test_parallel_defs(config, tmp_path):
+    timings = {}
+    for max_workers in [1, 0]:
+        update = {"general": {"suite": {"max_workers": max_workers}}}
+        tic = time.perf_counter()
+        defs = get_defs(config.copy(update=update), "surfex")
+        defs.save_as_defs(f"{tmp_path}/suite_{max_workers}.def")
+        timings[max_workers] = time.perf_counter() - tic
+
+    with open(f"{tmp_path}/suite_1.def", mode="r", encoding="utf-8") as fhandler:
+        serial = fhandler.read()
+    with open(f"{tmp_path}/suite_0.def", mode="r", encoding="utf-8") as fhandler:
+        parallel = fhandler.read()
+    logger.info(
+        "Build a 10-year suite: serial {:.1f} s, {} processes {:.1f} s ({:.1f}x)",
+        timings[1],
+        os.cpu_count(),
+        timings[0],
+        timings[1] / timings[0],
+    )
+    assert parallel.count("family 20") == serial.count("family 20")
@@ -0,0 +1,63 @@
+"""Benchmark the time the forcing task spends on its inputs."""
+import os
+import time
+
+from experiment.config_parser import ParsedConfig
+from experiment.datetime_utils import as_datetime, as_timedelta
+from experiment.logs import logger
+from experiment.tasks.inputs import forcing_inputs, localized_forcing_pattern
+from experiment.toolbox import FileManager, InputCache
+
+
+def test_prefetched_forcing(exp_configuration_file, tmp_path, mocker):
+    size = 64 * 1024 * 1024
+    forcing_dir = tmp_path / "archive"
+    forcing_dir.mkdir()
+    basetime = as_datetime("2023-01-01T03:00:00Z")
+    fcint = as_timedelta("PT3H")
+    config = ParsedConfig.from_file(exp_configuration_file).copy(
+        update={
+            "general": {"input_cache": {"directory": f"{tmp_path}/cache"}},
+            "forcing": {
+                "pattern": f"{forcing_dir}/met_analysis_@YYYY@@MM@@DD@T@HH@Z.nc",
+                "timestep": 3600,
+            },
+        }
+    )
+    fmanager = FileManager(config)
+    sources = forcing_inputs(config, fmanager.platform, basetime, fcint)
+    for source in sources:
+        with open(source, mode="wb") as fhandler:
+            fhandler.write(os.urandom(size))
+
+    # Reading the inputs in the task
+    start = time.perf_counter()
+    for source in sources:
+        with open(source, mode="rb") as fhandler:
+            while fhandler.read(1024 * 1024):
+                pass
+    before = time.perf_counter() - start
+
+    # Prefetched while the previous cycle ran
+    start = time.perf_counter()
+    summary = fmanager.prefetch(sources)
+    prefetch = time.perf_counter() - start
+    assert summary["fetched"] == len(sources)
+
+    fetch = mocker.spy(InputCache, "_fetch")
+    start = time.perf_counter()
+    pattern = localized_forcing_pattern(fmanager, basetime, fcint, f"{tmp_path}/wdir")
+    after = time.perf_counter() - start
+    # The task found all inputs in the cache
+    assert fetch.call_count == 0
+
+    assert pattern.startswith(f"{tmp_path}/wdir")
+    logger.info(
+        "Forcing {} x {} MB: read in task {:.0f} ms, localized {:.1f} ms "
+        "(prefetched in {:.0f} ms)",
+        len(sources),
+        size // (1024 * 1024),
+        1e3 * before,
+        1e3 * after,
+        1e3 * prefetch,
+    )
@@ -0,0 +1,204 @@
+"""Benchmark macro substitution on the path patterns of the experiment config."""
+import os
+import timeit
+
+import pandas as pd
+import pytest
+
+from experiment.config_parser import ParsedConfig
+from experiment.datetime_utils import as_datetime
+from experiment.logs import logger
+from experiment.toolbox import MacroSubstitution, Platform
+
+TIMES = [
+    (as_datetime("2023-01-01T03:00:00Z"), as_datetime("2023-01-01T03:00:00Z")),
+    (as_datetime("2023-01-01T03:00:00Z"), as_datetime("2023-01-02T06:30:00Z")),
+    (None, None),
+]
+
+
+def reference_substitute(platform, pattern, basetime=None, validtime=None):
+    """Substitute macros one by one, as Platform.substitute used to do."""
+    config = platform.config
+    if not isinstance(pattern, str):
+        return pattern
+    for macro in platform.get_macros():
+        pattern = platform.sub_value(
+            pattern, macro, config.get_value(f"platform.{macro}")
+        )
+    for macro in platform.get_system_macros():
+        pattern = platform.sub_value(pattern, macro, config.get_value(f"system.{macro}"))
+    for macro in platform.get_os_macros():
+        if macro in os.environ:
+            pattern = platform.sub_value(pattern, macro, os.environ[macro])
+    pattern = platform.sub_value(pattern, "domain", config.get_value("domain.name"))
+    pattern = platform.sub_value(pattern, "case", config.get_value("general.case"))
+    realization = config.get_value("general.realization")
+    if realization == "":
+        realization = None
+    if realization is not None and int(realization) >= 0:
+        pattern = platform.sub_value(pattern, "RRR", f"{realization:03d}")
+        pattern = platform.sub_value(pattern, "MRRR", f"mbr{realization:03d}")
+    else:
+        pattern = platform.sub_value(pattern, "RRR", "")
+        pattern = platform.sub_value(pattern, "MRRR", "")
+
+    if basetime is None:
+        basetime = str(config.get_value("general.times.basetime"))
+    if validtime is None:
+        validtime = str(config.get_value("general.times.validtime"))
+    basetime = as_datetime(basetime)
+    validtime = as_datetime(validtime)
+    lead_seconds = int((validtime - basetime).total_seconds())
+    lead_hours = int(lead_seconds / 3600)
+    tstep = config.get_value("general.tstep")
+    steps = [
+        ("YYYY", basetime.strftime("%Y"), True),
+        ("MM", basetime.strftime("%m"), False),
+        ("DD", basetime.strftime("%d"), True),
+        ("HH", basetime.strftime("%H"), True),
+        ("mm", basetime.strftime("%M"), False),
+        ("YYYY_LL", validtime.strftime("%Y"), True),
+        ("MM_LL", validtime.strftime("%m"), False),
+        ("DD_LL", validtime.strftime("%d"), True),
+        ("HH_LL", validtime.strftime("%H"), True),
+        ("mm_LL", validtime.strftime("%M"), False),
+        ("LL", f"{lead_hours:02d}", True),
+        ("LLL", f"{lead_hours:03d}", True),
+        ("LLLL", f"{lead_hours:04d}", True),
+    ]
+    if tstep is not None:
+        lead_step = int(lead_seconds / tstep)
+        steps += [
+            ("TTT", f"{lead_step:03d}", True),
+            ("TTTT", f"{lead_step:04d}", True),
+        ]
+    steps += [
+        ("YMD", basetime.strftime("%Y%m%d"), True),
+        ("YYYY", basetime.strftime("%Y"), True),
+        ("YY", basetime.strftime("%y"), True),
+        ("MM", basetime.strftime("%m"), False),
+        ("DD", basetime.strftime("%d"), True),
+        ("HH", basetime.strftime("%H"), True),
+        ("mm", basetime.strftime("%M"), False),
+    ]
+    for macro, value, ci in steps:
+        pattern = platform.sub_value(pattern, macro, value, ci=ci)
+    cnmexp = config.get_value("general.cnmexp")
+    if cnmexp is not None:
+        pattern = platform.sub_value(pattern, "CNMEXP", cnmexp)
+    return pattern
+
+
+def _patterns(value):
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _patterns(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _patterns(item)
+    elif isinstance(value, str) and "@" in value:
+        yield value
+
+
+@pytest.fixture(scope="module")
+def config(exp_configuration_file):
+    config = ParsedConfig.from_file(exp_configuration_file)
+    return config.copy(update={"general": {"tstep": 60, "cnmexp": "SFX"}})
+
+
+@pytest.fixture(scope="module")
+def patterns(config):
+    patterns = sorted(set(_patterns(config.dict())))
+    patterns += [
+        "@YYYY@@MM@@DD@@hh@@mm@@yyyy_ll@@MM_LL@@DD_LL@@HH_LL@@mm_LL@+@LLL@",
+        "@archive@/@ymd@/@RRR@/@mrrr@/@Case@_@DOMAIN@_@cnmexp@_@TTTT@_@YY@",
+        "@@YYYY@@@MM@@@",
+        "@not_a_macro@@MM@/@USER@/@HOME@/@sfx_exp_data@/@EXP@",
+    ]
+    return patterns
+
+
+def test_substitute_is_identical(config, patterns):
+    platform = Platform(config)
+    for pattern in patterns:
+        for basetime, validtime in TIMES:
+            assert platform.substitute(
+                pattern, basetime=basetime, validtime=validtime
+            ) == reference_substitute(
+                platform, pattern, basetime=basetime, validtime=validtime
+            )
+
+
+def test_substitute_cost(config, patterns):
+    number = 5
+    platform = Platform(config)
+
+    def reference():
+        for pattern in patterns:
+            for basetime, validtime in TIMES:
+                reference_substitute(platform, pattern, basetime, validtime)
+
+    def compiled_cold():
+        # A new config, i.e. a new job: no tables and no memoized results
+        MacroSubstitution(config).substitute(patterns[0])
+        for pattern in patterns:
+            for basetime, validtime in TIMES:
+                MacroSubstitution.from_config(config).substitute(
+                    pattern, basetime, validtime
+                )
+        MacroSubstitution._instances.pop(config, None)
+
+    def compiled_warm():
+        for pattern in patterns:
+            for basetime, validtime in TIMES:
+                platform.substitute(pattern, basetime, validtime)
+
+    nsubs = len(patterns) * len(TIMES)
+    before = timeit.timeit(reference, number=number) / number / nsubs
+    cold = timeit.timeit(compiled_cold, number=number) / number / nsubs
+    compiled_warm()
+    memoized = MacroSubstitution.from_config(config)._substitute.cache_info()
+    warm = timeit.timeit(compiled_warm, number=number) / number / nsubs
+    # All results came from the memoized ones
+    cache_info = MacroSubstitution.from_config(config)._substitute.cache_info()
+    assert cache_info.misses == memoized.misses
+    assert cache_info.hits == memoized.hits + number * nsubs
+    logger.info(
+        "substitute ({} patterns): one by one {:.1f} us, compiled {:.1f} us (first "
+        "use), {:.1f} us (memoized)",
+        len(patterns),
+        1e6 * before,
+        1e6 * cold,
+        1e6 * warm,
+    )
+
+
+@pytest.mark.parametrize("years", [1, 30])
+def test_substitute_many_cost(config, years):
+    pattern = config.get_value("system.archive_dir") + "/SURFOUT.@YYYY@@MM@@DD@@HH@.nc"
+    basetimes = pd.date_range("1991-01-01", periods=years * 365 * 8, freq="3H", tz="UTC")
+    # A fresh copy of the config gets its own memoization tables
+    platform = Platform(config.copy())
+    number = 3
+
+    subset = basetimes[:2000].to_pydatetime()
+    before = timeit.timeit(
+        lambda: [platform.substitute(pattern, basetime, basetime) for basetime in subset],
+        number=1,
+    ) * (len(basetimes) / len(subset))
+    after = (
+        timeit.timeit(lambda: platform.substitute_many(pattern, basetimes), number=number)
+        / number
+    )
+    assert platform.substitute_many(pattern, basetimes[:50]) == [
+        platform.substitute(pattern, basetime, basetime)
+        for basetime in basetimes[:50].to_pydatetime()
+    ]
+    logger.info(
+        "{} archive paths: substitute loop {:.0f} ms (extrapolated), substitute_many "
+        "{:.0f} ms",
+        len(basetimes),
+        1e3 * before,
+        1e3 * after,
+    )
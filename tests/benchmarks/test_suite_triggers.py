@@ -0,0 +1,53 @@
+"""Benchmark building the cycles and triggers of SurfexSuite.
+
+The 50k cycle suite takes minutes to build, set BENCHMARK_LARGE=1 to run it.
+"""
+import os
+import time
+
+import pytest
+
+from experiment.config_parser import ParsedConfig
+from experiment.cycles import CycleCalendar, cycle_hours_from_length
+from experiment.datetime_utils import as_timedelta, datetime2ecflow
+from experiment.logs import logger
+from experiment.scheduler.submission import TaskSettings
+from experiment.suites import HOURS_AHEAD, SurfexSuite
+
+LARGE = pytest.mark.skipif(
+    os.environ.get("BENCHMARK_LARGE") != "1", reason="Set BENCHMARK_LARGE=1 to run"
+)
+
+
+@pytest.fixture(scope="module")
+def config(exp_configuration_file):
+    return ParsedConfig.from_file(exp_configuration_file)
+
+
+def reanalysis_dtgs(ncycles):
+    return CycleCalendar(
+        "2000-01-01T00:00:00Z",
+        "2100-01-01T00:00:00Z",
+        cycle_hours_from_length(as_timedelta("PT3H")),
+    ).basetimes()[:ncycles]
+
+
+@pytest.mark.parametrize("ncycles", [1000, 10000, pytest.param(50000, marks=LARGE)])
+def test_surfex_suite_triggers(config, ncycles, mocker, tmp_path):
+    mocker.patch("experiment.scheduler.submission.TaskSettings.parse_job")
+    dtgs = reanalysis_dtgs(ncycles)
+    tic = time.perf_counter()
+    suite = SurfexSuite("suite", config, tmp_path.as_posix(), TaskSettings(config), dtgs)
+    built = time.perf_counter() - tic
+
+    # The last cycle does not run more than HOURS_AHEAD ahead of the predictions
+    paths = {suite.dag.path(node_id): node_id for node_id in range(len(suite.dag))}
+    prepare_cycle = paths[f"/suite/{datetime2ecflow(dtgs[-1])}/PrepareCycle"]
+    prediction = paths[f"/suite/{datetime2ecflow(dtgs[-1] - HOURS_AHEAD)}/Prediction"]
+    assert prediction in suite.dag.upstream[prepare_cycle]
+    logger.info(
+        "Build SurfexSuite with {} cycles: {:.1f} ms ({:.2f} ms/cycle)",
+        ncycles,
+        1e3 * built,
+        1e3 * built / ncycles,
+    )
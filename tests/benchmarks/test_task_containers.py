@@ -0,0 +1,83 @@
+"""Benchmark writing the ecflow task containers of a suite."""
+import os
+import time
+
+import pytest
+
+from experiment.config_parser import ParsedConfig
+from experiment.logs import logger
+from experiment.scheduler.submission import TaskSettings
+
+TASKS = [
+    "PrepareCycle",
+    "Forcing",
+    "Prefetch",
+    "FirstGuess",
+    "FirstGuess4OI",
+    "QualityControl",
+    "OptimalInterpolation",
+    "Oi2soda",
+    "Soda",
+    "Forecast",
+    "LogProgress",
+    "LogProgressPP",
+]
+
+
+@pytest.fixture(scope="module")
+def config(exp_configuration_file):
+    return ParsedConfig.from_file(exp_configuration_file)
+
+
+def count_files(path):
+    return sum(len(files) for __, __, files in os.walk(path))
+
+
+def test_task_containers(config, tmp_path):
+    ncycles = 200
+    template = (
+        f"{config.get_value('system.pysurfex_experiment')}"
+        "/experiment/templates/ecflow/default.py"
+    )
+
+    task_settings = TaskSettings(config)
+    ecf_files = (tmp_path / "per_task").as_posix()
+    tic = time.perf_counter()
+    for cycle in range(ncycles):
+        for task in TASKS:
+            task_settings.parse_job(
+                task,
+                config,
+                template,
+                f"{ecf_files}/suite/{cycle}/{task}.py",
+                variables=task_settings.get_settings(task),
+            )
+    per_task = time.perf_counter() - tic
+    per_task_files = count_files(ecf_files)
+
+    task_settings = TaskSettings(config)
+    ecf_files = (tmp_path / "shared").as_posix()
+    tic = time.perf_counter()
+    for __ in range(ncycles):
+        for task in TASKS:
+            task_settings.shared_job(
+                task,
+                config,
+                template,
+                ecf_files,
+                variables=task_settings.get_settings(task),
+            )
+    shared = time.perf_counter() - tic
+    shared_files = count_files(ecf_files)
+
+    logger.info(
+        "Containers for {} cycles: per task {:.1f} ms ({} files), "
+        "shared {:.1f} ms ({} files), {:.1f}x",
+        ncycles,
+        1e3 * per_task,
+        per_task_files,
+        1e3 * shared,
+        shared_files,
+        per_task / shared,
+    )
+    assert shared_files == len(TASKS)
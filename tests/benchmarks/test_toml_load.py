@@ -0,0 +1,28 @@
+"""Benchmark loading the toml config files at setup time."""
+import timeit
+
+from experiment.experiment import ExpFromFiles
+from experiment.logs import logger
+
+
+def test_setup_config_files(exp_dependencies):
+    number = 20
+    config_files = exp_dependencies["config"]["config_files"]
+    blocks = exp_dependencies["config"]["blocks"]
+
+    def merge(preserve):
+        merged = ExpFromFiles.get_config_files(config_files, blocks, preserve=preserve)
+        merged = ExpFromFiles.merge_config_files_dict(merged)
+        return ExpFromFiles.merge_dict_from_config_dicts(merged)
+
+    assert merge(False) == merge(True)
+    before = timeit.timeit(lambda: merge(True), number=number) / number
+    after = timeit.timeit(lambda: merge(False), number=number) / number
+    logger.info(
+        "Load and merge {} config files: tomlkit {:.1f} ms, tomllib {:.1f} ms "
+        "({:.1f}x)",
+        len(config_files),
+        1e3 * before,
+        1e3 * after,
+        before / after,
+    )
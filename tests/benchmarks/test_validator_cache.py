@@ -0,0 +1,37 @@
+"""Benchmark config parsing at job startup with and without the validator cache."""
+import timeit
+
+import experiment.config_parser
+from experiment.config_parser import ParsedConfig
+from experiment.logs import logger
+
+
+def test_job_startup_with_validator_cache(
+    exp_configuration_file, tmp_path, monkeypatch, mocker
+):
+    number = 20
+    cache_dir = tmp_path / "cache"
+
+    def startup():
+        # A new job process starts without any validators in memory
+        monkeypatch.setattr(experiment.config_parser, "_VALIDATORS", {})
+        config = ParsedConfig.from_file(exp_configuration_file)
+        config.copy(update={"general": {"stream": "1"}})
+
+    monkeypatch.setenv("PYSURFEX_EXPERIMENT_CACHE_DIR", "")
+    cold = timeit.timeit(startup, number=number) / number
+
+    monkeypatch.setenv("PYSURFEX_EXPERIMENT_CACHE_DIR", cache_dir.as_posix())
+    startup()
+    compile_schema = mocker.spy(experiment.config_parser.fastjsonschema, "compile")
+    warm = timeit.timeit(startup, number=number) / number
+    # The schemas were not compiled again
+    assert compile_schema.call_count == 0
+
+    logger.info(
+        "config parsing at job startup: cold {:.2f} ms, warm {:.2f} ms ({:.1f}x)",
+        1e3 * cold,
+        1e3 * warm,
+        cold / warm,
+    )
+    assert list((cache_dir / "validators").glob("validator_*.py"))
@@ -1,10 +1,25 @@
 """Unit testing."""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pysurfex
 import pytest
+import tomlkit
 
 from experiment import PACKAGE_NAME
+from experiment.config_parser import (
+    ConfigFileValidationError,
+    ParsedConfig,
+    _load_validator,
+    _update_nested_dict,
+    config_snapshot_path,
+    get_cache_dir,
+    get_validator,
+    read_toml,
+)
 from experiment.configuration import Configuration
 from experiment.experiment import ExpFromFiles
 from experiment.logs import logger
@@ -110,3 +125,121 @@ class TestConfig:
         ExpFromFiles.write_exp_config(
             exp_dependencies, configuration="sekf", configuration_file=None
         )
+
+    def test_get_value_is_memoized(self, sfx_exp):
+        config = sfx_exp.config
+        assert config.get_value("compile.test_setting") == "SETTING"
+        assert config.get_value("compile.test_setting") == "SETTING"
+        assert getattr(config, "compile.test_values") == (1, 2, 4)
+        assert config.get_value("compile.not_a_setting", default=None) is None
+        assert config.get_value("compile.not_a_setting", default=1) == 1
+        with pytest.raises(AttributeError):
+            config.get_value("compile.not_a_setting")
+        assert config.copy().get_value("compile.test_true") is True
+
+    def test_copy_with_update_shares_untouched_sections(self, sfx_exp):
+        config = sfx_exp.config
+        update = {
+            "SURFEX": {"ASSIM": {"OBS": {"NNCO": [1, 0, 0, 0, 1]}}},
+            "compile": {"test_setting": None},
+        }
+        new_config = config.copy(update=update)
+        assert new_config.get_value("SURFEX.ASSIM.OBS.NNCO") == (1, 0, 0, 0, 1)
+        assert new_config.get_value("compile.test_setting", default=None) is None
+        assert config.get_value("compile.test_setting") == "SETTING"
+        assert new_config.general is config.general
+        assert new_config.SURFEX.IO is config.SURFEX.IO
+        assert new_config.SURFEX is not config.SURFEX
+        assert (
+            new_config.dict()
+            == ParsedConfig.parse_obj(
+                _update_nested_dict(config.dict(), update),
+                json_schema=config.json_schema,
+            ).dict()
+        )
+
+    def test_copy_with_update_validates_updated_sections(self, sfx_exp):
+        config = sfx_exp.config
+        with pytest.raises(ConfigFileValidationError):
+            config.copy(update={"general": {"times": {"cycle_length": "3H"}}})
+        with pytest.raises(ConfigFileValidationError):
+            config.copy(update={"general": None})
+
+    def test_validators_are_cached_on_disk(self, sfx_exp, tmp_path, monkeypatch):
+        monkeypatch.setenv("PYSURFEX_EXPERIMENT_CACHE_DIR", tmp_path.as_posix())
+        monkeypatch.setattr("experiment.config_parser._VALIDATORS", {})
+        config = ParsedConfig.parse_obj(
+            sfx_exp.config.dict(), json_schema=sfx_exp.config.json_schema
+        )
+        validators = list((tmp_path / "validators").glob("validator_*.py"))
+        assert len(validators) == 1
+
+        monkeypatch.setattr("experiment.config_parser._VALIDATORS", {})
+        validate = get_validator(config.json_schema)
+        assert validate.__module__ == validators[0].stem
+        assert get_validator(config.json_schema) is validate
+        with pytest.raises(ConfigFileValidationError):
+            config.copy(update={"general": {"times": {"cycle_length": "3H"}}})
+
+    def test_validators_are_written_by_threads(self, tmp_path, mocker):
+        json_schema = {"type": "object", "properties": {"case": {"type": "string"}}}
+        module_path = tmp_path / "validators" / "validator_test.py"
+        nthreads = 4
+        # All threads have written the module before any of them replaces it
+        barrier = threading.Barrier(nthreads, timeout=10)
+        replace = os.replace
+
+        def replace_together(src, dst):
+            barrier.wait()
+            replace(src, dst)
+
+        mocker.patch("experiment.config_parser.os.replace", side_effect=replace_together)
+        with ThreadPoolExecutor(max_workers=nthreads) as executor:
+            futures = [
+                executor.submit(_load_validator, module_path, json_schema)
+                for __ in range(nthreads)
+            ]
+            validators = [future.result() for future in futures]
+        for validate in validators:
+            assert validate({"case": "test"}) == {"case": "test"}
+        assert not list(module_path.parent.glob("*.tmp"))
+
+    def test_cache_dir(self, monkeypatch):
+        monkeypatch.delenv("PYSURFEX_EXPERIMENT_CACHE_DIR", raising=False)
+        monkeypatch.setenv("HOME", "/home/user")
+        assert get_cache_dir() == Path("/home/user/.experiment/cache")
+        monkeypatch.delenv("HOME")
+        assert get_cache_dir() is None
+        monkeypatch.setenv("PYSURFEX_EXPERIMENT_CACHE_DIR", "")
+        assert get_cache_dir() is None
+
+    def test_config_snapshot(self, sfx_exp, tmp_path):
+        config_file = tmp_path / "exp_configuration.json"
+        sfx_exp.dump_json(config_file.as_posix(), indent=2)
+        config = ParsedConfig.from_file(config_file)
+        config.get_value("compile.not_a_setting", default=None)
+        snapshot = config.write_snapshot()
+        assert snapshot == config_snapshot_path(config_file)
+
+        from_snapshot = ParsedConfig.from_file(config_file)
+        assert from_snapshot.dict() == config.dict()
+        assert from_snapshot.json_schema == config.json_schema
+        assert from_snapshot.get_value("compile.not_a_setting", default=1) == 1
+        assert from_snapshot.copy(update={"general": {"stream": "1"}}).general.stream
+
+        # Changed contents invalidate the snapshot
+        with open(config_file, mode="r", encoding="utf-8") as fhandler:
+            raw_config = json.load(fhandler)
+        raw_config["general"]["case"] = "new_case"
+        with open(config_file, mode="w", encoding="utf-8") as fhandler:
+            json.dump(raw_config, fhandler)
+        assert ParsedConfig.from_file(config_file).general.case == "new_case"
+        assert ParsedConfig._read_snapshot(config_file.resolve()) is None
+
+    def test_read_toml(self, exp_dependencies):
+        config_file = exp_dependencies["config"]["config_files"]["config_exp.toml"]
+        document = read_toml(config_file, preserve=True)
+        values = read_toml(config_file)
+        assert isinstance(document, tomlkit.TOMLDocument)
+        assert type(values) is dict and type(values["general"]) is dict
+        assert values == document
@@ -0,0 +1,143 @@
+"""Unit tests for the cycle calendar."""
+import pytest
+
+from experiment import PACKAGE_NAME
+from experiment.config_parser import ParsedConfig
+from experiment.configuration import Configuration
+from experiment.cycles import CycleCalendar, cycle_hours_from_length, parse_ll_list
+from experiment.datetime_utils import as_datetime, as_timedelta
+from experiment.logs import logger
+from experiment.suites import get_calendar
+
+logger.enable(PACKAGE_NAME)
+
+
+@pytest.fixture()
+def eps_config():
+    return ParsedConfig.parse_obj(
+        {
+            "general": {
+                "realizations": [0, 1],
+                "hh_list": "06",
+                "ll_list": "24,6",
+                "times": {
+                    "cycle_length": "PT6H",
+                    "basetime": "2022-01-01T00:00:00Z",
+                    "start": "2022-01-01T00:00:00Z",
+                    "end": "2022-01-02T00:00:00Z",
+                },
+            },
+            "eps": {
+                "member_settings": {
+                    "general": {
+                        "times": {"cycle_length": {"1": "PT3H"}},
+                        "ll_list": {"1": "3"},
+                    }
+                }
+            },
+        },
+        json_schema={},
+    )
+
+
+def test_cycle_hours_from_length():
+    cycle_length = as_timedelta("PT6H")
+    assert cycle_hours_from_length(cycle_length) == [0, 6, 12, 18]
+    anchor = as_datetime("2022-01-01T13:00:00Z")
+    assert cycle_hours_from_length(cycle_length, anchor=anchor) == [1, 7, 13, 19]
+    # The cycles repeat every five days
+    assert cycle_hours_from_length(as_timedelta("PT5H")) == list(range(0, 120, 5))
+    assert cycle_hours_from_length(as_timedelta("P2D")) == [0]
+    with pytest.raises(ValueError):
+        cycle_hours_from_length(as_timedelta("PT0S"))
+
+
+@pytest.mark.parametrize("cycle_length", ["PT5H", "PT36H", "P2D"])
+def test_cycle_calendar_cycle_length(eps_config, cycle_length):
+    basetime = as_datetime("2022-01-01T01:00:00Z")
+    times = {"cycle_length": cycle_length, "basetime": basetime, "end": "2022-01-20"}
+    config = eps_config.copy(update={"general": {"realizations": [], "times": times}})
+    calendar = CycleCalendar.from_config(config)
+    step = as_timedelta(cycle_length)
+    basetimes = calendar.basetimes()
+    assert basetimes[0] == basetime
+    assert all(
+        later - earlier == step for earlier, later in zip(basetimes, basetimes[1:])
+    )
+    assert basetimes[-1] + step > as_datetime("2022-01-20")
+    assert calendar.shift(basetime, 3) == basetime + 3 * step
+    assert calendar.next(basetime + step / 2) == basetime + step
+
+
+def test_parse_ll_list():
+    assert parse_ll_list("48,3,3,3,3,3,3,3", 8) == [48, 3, 3, 3, 3, 3, 3, 3]
+    assert parse_ll_list("24,6", 4) == [24, 6, 24, 6]
+    assert parse_ll_list("3", 2) == [3, 3]
+
+
+def test_cycle_calendar():
+    calendar = CycleCalendar(
+        "2000-01-01T00:00:00Z",
+        "2019-12-31T21:00:00Z",
+        cycle_hours_from_length(as_timedelta("PT3H")),
+        lead_times=dict(zip([0, 12], [48, 3])),
+    )
+    assert len(calendar) == 7305 * 8
+    basetimes = calendar.basetimes()
+    assert basetimes[0] == as_datetime("2000-01-01T00:00:00Z")
+    assert basetimes[-1] == as_datetime("2019-12-31T21:00:00Z")
+    assert basetimes[1] - basetimes[0] == as_timedelta("PT3H")
+
+    dtg = as_datetime("2010-05-05T03:00:00Z")
+    assert dtg in calendar
+    assert as_datetime("2010-05-05T04:00:00Z") not in calendar
+    assert calendar.index(dtg) == basetimes.index(dtg)
+    assert calendar.previous(dtg) == as_datetime("2010-05-05T00:00:00Z")
+    assert calendar.next(dtg) == as_datetime("2010-05-05T06:00:00Z")
+    assert calendar.ahead(dtg, 7) == as_datetime("2010-05-05T12:00:00Z")
+    assert calendar.fcint(dtg) == as_timedelta("PT3H")
+    # Only the 00 and 12 cycles have a forecast, the 00 cycle reaches dtg
+    assert calendar.first_guess(dtg) == as_datetime("2010-05-05T00:00:00Z")
+    assert calendar.first_guess(as_datetime("2010-05-05T15:00:00Z")) == as_datetime(
+        "2010-05-05T12:00:00Z"
+    )
+    assert calendar.lead_time(as_datetime("2010-05-05T12:00:00Z")) == as_timedelta("PT3H")
+    with pytest.raises(ValueError):
+        calendar.index(as_datetime("2020-01-01T00:00:00Z"))
+
+
+def test_cycle_calendar_from_config(eps_config):
+    calendar = CycleCalendar.from_config(eps_config)
+    basetimes = calendar.basetimes()
+    assert len(basetimes) == 9
+    assert basetimes[1] == as_datetime("2022-01-01T03:00:00Z")
+    assert calendar.lead_time(basetimes[0]) == as_timedelta("PT24H")
+    assert calendar.lead_time(basetimes[1]) == as_timedelta("PT3H")
+
+    calendar = CycleCalendar.from_config(eps_config, realization=0)
+    assert len(calendar) == 5
+
+    # The cycles follow the cycle length from the start, not hh_list
+    start = as_datetime("2022-01-01T01:00:00Z")
+    calendar = CycleCalendar.from_config(eps_config, start=start, realization=0)
+    assert calendar.basetimes() == [
+        as_datetime(f"2022-01-01T{hour:02d}:00:00Z") for hour in [1, 7, 13, 19]
+    ]
+
+
+def test_get_calendar(eps_config):
+    times = {"basetime": "2022-01-01T01:00:00Z"}
+    config = eps_config.copy(update={"general": {"realizations": [], "times": times}})
+    assert get_calendar(config).basetimes() == [
+        as_datetime(f"2022-01-01T{hour:02d}:00:00Z") for hour in [1, 7, 13, 19]
+    ]
+
+    times = {"basetime": "2022-01-02T06:00:00Z"}
+    config = eps_config.copy(update={"general": {"times": times}})
+    with pytest.raises(ValueError):
+        get_calendar(config)
+
+
+def test_total_unique_cycle_list(eps_config):
+    settings = Configuration(eps_config)
+    assert settings.get_total_unique_cycle_list() == settings.get_cycle_list()
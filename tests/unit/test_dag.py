@@ -0,0 +1,76 @@
+"""Unit tests for the workflow graph of a suite."""
+import pytest
+
+from experiment.scheduler.dag import (
+    FAMILY,
+    SUITE,
+    TASK,
+    SuiteDag,
+    evaluate_trigger,
+    graph_dump,
+    local_plan,
+    trigger_string,
+)
+
+
+@pytest.fixture()
+def dag():
+    dag = SuiteDag()
+    suite = dag.add_node("suite", SUITE, variables={"DTG": "202201010000"})
+    first = dag.add_node("first", FAMILY, parent=suite)
+    dag.add_node("a", TASK, parent=first)
+    dag.add_node("b", TASK, parent=first, variables={"DTG": "202201010300"})
+    second = dag.add_node("second", FAMILY, parent=suite)
+    task_c = dag.add_node("c", TASK, parent=second)
+    dag.add_trigger(second, ("AND", ((first, "complete"),)))
+    extern = dag.add_extern("/other/task")
+    dag.add_trigger(task_c, ("AND", ((extern, "complete"),)), mode="OR")
+    return dag
+
+
+def test_suite_dag(dag):
+    assert len(dag) == 7
+    assert dag.path(3) == "/suite/first/b"
+    assert dag.children[0] == [1, 4]
+    assert dag.tasks() == [2, 3, 5]
+    assert dag.tasks(1) == [2, 3]
+    assert dag.ancestors(5) == [4, 0]
+    assert dag.externs() == [6]
+    assert dag.add_extern("/other/task") == 6
+    assert dag.upstream[4] == [1]
+    assert dag.downstream()[6] == [5]
+    with pytest.raises(NotImplementedError):
+        dag.add_node("meter", "meter", parent=0)
+
+
+def test_trigger_string(dag):
+    assert trigger_string(dag, dag.nodes[4].trigger) == "(/suite/first == complete)"
+    assert trigger_string(dag, ("OR", (("AND", ((2, "complete"),)), (3, "active")))) == (
+        "((/suite/first/a == complete) OR /suite/first/b == active)"
+    )
+
+
+def test_evaluate_trigger():
+    states = {1: "complete", 2: "active"}.get
+    assert evaluate_trigger(("AND", ((1, "complete"),)), states)
+    assert not evaluate_trigger(("AND", ((1, "complete"), (2, "complete"))), states)
+    assert evaluate_trigger(("OR", (("AND", ((2, "complete"),)), (2, "active"))), states)
+
+
+def test_local_plan(dag):
+    plan = local_plan(dag)
+    assert [task.name for task in plan] == ["a", "b", "c"]
+    assert plan[1].variables == {"DTG": "202201010300"}
+    assert plan[2].dependencies == [2, 3]
+    assert len(plan[2].triggers) == 2
+
+    dag.add_trigger(1, ("AND", ((5, "complete"),)))
+    with pytest.raises(RuntimeError):
+        local_plan(dag)
+
+
+def test_graph_dump(dag):
+    dump = graph_dump(dag)
+    assert dump.startswith("digraph suite {")
+    assert "  n0 -> n1;" in dump
+    assert "  n6 -> n5 [style=dashed];" in dump
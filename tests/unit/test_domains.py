@@ -0,0 +1,75 @@
+"""Unit tests for the domain catalogue."""
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+from pysurfex.geo import ConfProj
+
+from experiment import PACKAGE_NAME, domains
+from experiment.config_parser import ParsedConfig
+from experiment.domains import DomainCatalogue, bbox_from_ranges, conf_proj_dict
+from experiment.logs import logger
+from experiment.tasks.gmtedsoil import get_domain_properties
+
+logger.enable(PACKAGE_NAME)
+
+DOMAIN_FILE = (
+    f"{str(((Path(__file__).parent).parent).parent)}"
+    "/data/config/domains/Harmonie_domains.json"
+)
+
+
+@pytest.fixture()
+def domain_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("PYSURFEX_EXPERIMENT_CACHE_DIR", f"{tmp_path}/cache")
+    monkeypatch.setattr(domains, "_INDEXES", {})
+    domain_file = tmp_path / "Harmonie_domains.json"
+    shutil.copy(DOMAIN_FILE, domain_file)
+    return domain_file
+
+
+def test_domain_catalogue(domain_file, monkeypatch):
+    catalogue = DomainCatalogue(domain_file)
+    assert "DRAMMEN" in catalogue
+    assert catalogue.get("DRAMMEN")["NLON"] == 50
+    domain = catalogue.surfex_domain("DRAMMEN")
+    assert domain["nimax"] == 50 and domain["ilone"] == 0
+    with pytest.raises(KeyError):
+        catalogue.get("NOT_A_DOMAIN")
+
+    geo = ConfProj(conf_proj_dict(domain))
+    properties = catalogue.properties("DRAMMEN")
+    assert properties["bbox"] == bbox_from_ranges(geo.lonrange, geo.latrange)
+
+    # A new process reads the index, including the derived properties
+    monkeypatch.setattr(domains, "_INDEXES", {})
+    monkeypatch.setattr(domains, "ConfProj", None)
+    with monkeypatch.context() as patch:
+        patch.setattr(domains.json, "load", None)
+        assert DomainCatalogue(domain_file).properties("DRAMMEN") == properties
+
+    # A changed domain file invalidates the index
+    with open(domain_file, mode="r", encoding="utf-8") as fhandler:
+        domain_props = json.load(fhandler)
+    domain_props["DRAMMEN"]["NLON"] = 60
+    with open(domain_file, mode="w", encoding="utf-8") as fhandler:
+        json.dump(domain_props, fhandler)
+    assert DomainCatalogue(domain_file).surfex_domain("DRAMMEN")["nimax"] == 60
+
+
+def test_domain_properties_not_in_catalogue(domain_file):
+    domain = DomainCatalogue(domain_file).surfex_domain("DRAMMEN")
+    domain.update({"name": "DRAMMEN", "nimax": 60})
+    config = ParsedConfig.parse_obj(
+        {"system": {"domain_file": domain_file.as_posix()}, "domain": domain},
+        json_schema={},
+    )
+    geo = ConfProj(conf_proj_dict(domain))
+    bbox = bbox_from_ranges(geo.lonrange, geo.latrange)
+    assert get_domain_properties(geo, config) == bbox
+    assert get_domain_properties(lambda: geo, config) == bbox
+
+    # The geometry is not built for a domain from the catalogue
+    config = config.copy(update={"domain": {"nimax": 50}})
+    assert get_domain_properties(None, config) != bbox
@@ -0,0 +1,175 @@
+"""Unit tests for the field cache."""
+import http.server
+import io
+import os
+import re
+import threading
+
+import netCDF4
+import numpy as np
+import pytest
+from pysurfex.geo import Geo
+
+from experiment import PACKAGE_NAME
+from experiment.config_parser import ParsedConfig
+from experiment.field_cache import FieldStore, RemoteFieldCache, get_field_cache
+from experiment.logs import logger
+
+logger.enable(PACKAGE_NAME)
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve files with byte ranges, like thredds does for "#mode=bytes"."""
+
+    requests = []
+
+    def send_head(self):
+        self.requests.append(self.path)
+        path = self.translate_path(self.path)
+        byte_range = self.headers.get("Range")
+        if byte_range is None or not os.path.isfile(path):
+            return super().send_head()
+        with open(path, mode="rb") as fhandler:
+            data = fhandler.read()
+        start, end = re.match(r"bytes=(\d+)-(\d*)", byte_range).groups()
+        start = int(start)
+        end = int(end) if end else len(data) - 1
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        return io.BytesIO(data[start : end + 1])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def thredds(tmp_path):
+    """Local stand-in for thredds serving a forcing file."""
+    with netCDF4.Dataset(tmp_path / "analysis.nc", mode="w") as dataset:
+        dataset.createDimension("time", 2)
+        dataset.createDimension("y", 20)
+        dataset.createDimension("x", 30)
+        times = dataset.createVariable("time", "f8", ("time",))
+        times.units = "seconds since 1970-01-01 00:00:00"
+        times[:] = [0, 3600]
+        lons, lats = np.meshgrid(np.linspace(5, 15, 30), np.linspace(55, 65, 20))
+        dataset.createVariable("longitude", "f8", ("y", "x"))[:] = lons
+        dataset.createVariable("latitude", "f8", ("y", "x"))[:] = lats
+        t2m = dataset.createVariable("air_temperature_2m", "f4", ("time", "y", "x"))
+        t2m.units = "K"
+        t2m[:] = 270 + lons[None] + np.arange(2)[:, None, None]
+        snow = dataset.createVariable(
+            "surface_snow_thickness", "f4", ("time", "y", "x"), fill_value=-999.0
+        )
+        snow.units = "m"
+        mask = np.broadcast_to(lons > 9, (2, 20, 30))
+        snow[:] = np.ma.masked_array(np.full((2, 20, 30), 0.5), mask=mask)
+
+    def handler(*args, **kwargs):
+        return RangeRequestHandler(*args, directory=tmp_path.as_posix(), **kwargs)
+
+    RangeRequestHandler.requests = []
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/analysis.nc#mode=bytes"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def domain():
+    lons, lats = np.meshgrid(np.linspace(8, 10, 5), np.linspace(59, 61, 5))
+    return Geo(lons, lats)
+
+
+def test_remote_field_cache(thredds, domain, tmp_path):
+    store = FieldStore(tmp_path / "fields")
+    cache = RemoteFieldCache(3600, store, geo=domain)
+    assert cache.file_open(thredds)
+    field, geo_in = cache.get_file_handler(thredds).field(
+        "air_temperature_2m", validtime=1
+    )
+    requests = len(RangeRequestHandler.requests)
+    assert requests > 0
+    assert store.counts == {"hits": 0, "misses": 1}
+
+    # Subset to the domain with a margin
+    assert field.shape == geo_in.lons.shape
+    assert field.shape[0] < 30 and field.shape[1] < 20
+    assert geo_in.lons.min() < 8 and geo_in.lons.max() > 10
+    assert geo_in.lats.min() < 59 and geo_in.lats.max() > 61
+    np.testing.assert_allclose(field, 271 + geo_in.lons)
+
+    # Another task reads the field from disk
+    other_store = FieldStore(tmp_path / "fields")
+    cache = RemoteFieldCache(3600, other_store, geo=domain)
+    cached_field, cached_geo = cache.get_file_handler(thredds).field(
+        "air_temperature_2m", validtime=1
+    )
+    assert len(RangeRequestHandler.requests) == requests
+    assert other_store.counts == {"hits": 1, "misses": 0}
+    np.testing.assert_array_equal(cached_field, field)
+    np.testing.assert_array_equal(cached_geo.lats, geo_in.lats)
+    cached_field += 1
+
+    # Expired fields are read again
+    expired_store = FieldStore(tmp_path / "fields", ttl=0)
+    cache = RemoteFieldCache(3600, expired_store, geo=domain)
+    expired_field, __ = cache.get_file_handler(thredds).field(
+        "air_temperature_2m", validtime=1
+    )
+    assert len(RangeRequestHandler.requests) > requests
+    assert expired_store.counts == {"hits": 0, "misses": 1}
+    np.testing.assert_array_equal(expired_field, field)
+
+
+def test_remote_field_cache_masked(thredds, domain, tmp_path):
+    fields = []
+    for __ in range(2):
+        store = FieldStore(tmp_path / "fields")
+        cache = RemoteFieldCache(3600, store, geo=domain)
+        field, geo_in = cache.get_file_handler(thredds).field(
+            "surface_snow_thickness", validtime=1
+        )
+        fields.append((field, geo_in))
+    assert store.counts == {"hits": 1, "misses": 0}
+
+    # The field from the file and from the cache are masked the same way
+    (field, geo_in), (cached_field, __) = fields
+    assert isinstance(field, np.ma.MaskedArray)
+    assert isinstance(cached_field, np.ma.MaskedArray)
+    np.testing.assert_array_equal(field.mask, geo_in.lons > 9)
+    np.testing.assert_array_equal(cached_field.mask, field.mask)
+    np.testing.assert_array_equal(cached_field.compressed(), field.compressed())
+
+
+def test_field_store_masked(tmp_path):
+    store = FieldStore(tmp_path)
+    field = np.ma.masked_array(np.arange(4, dtype="i4"), mask=[0, 1, 0, 0])
+    store.put(["masked"], {"field": field, "lons": np.arange(4.0)})
+    arrays = store.get(["masked"])
+    assert arrays["field"].dtype == np.dtype("i4")
+    np.testing.assert_array_equal(arrays["field"].mask, field.mask)
+    np.testing.assert_array_equal(arrays["field"].compressed(), [0, 2, 3])
+    assert not isinstance(arrays["lons"], np.ma.MaskedArray)
+
+
+def test_field_store_size(tmp_path):
+    store = FieldStore(tmp_path, max_size=20000)
+    for index in range(3):
+        store.put(["field", index], {"field": np.full(1000, index, dtype="f8")})
+    assert store.get(["field", 0]) is None
+    assert store.get(["field", 1])["field"][0] == 1
+    assert store.get(["field", 2])["field"][0] == 2
+    assert store.counts == {"hits": 2, "misses": 1}
+
+
+def test_field_store_disabled():
+    config = ParsedConfig.parse_obj(
+        {"general": {"field_cache": {"directory": ""}}}, json_schema={}
+    )
+    assert FieldStore.from_config(config) is None
+    assert not isinstance(get_field_cache(config, 3600), RemoteFieldCache)
@@ -1,17 +1,30 @@
 #!/usr/bin/env python3
 """Unit tests for the config file parsing module."""
+import json
 import os
+import time
 from pathlib import Path
 
+import pandas as pd
 import pysurfex
 import pytest
 
 from experiment import PACKAGE_NAME
+from experiment.archive import ArchiveQueue, DirectoryArchive
+from experiment.cli import transfer_metrics
 from experiment.datetime_utils import as_datetime
 from experiment.experiment import Exp, ExpFromFiles
 from experiment.logs import logger
+from experiment.metrics import aggregate_metrics, read_metrics
 from experiment.system import System
-from experiment.toolbox import FileManager
+from experiment.tasks.inputs import forcing_inputs, localized_forcing_pattern
+from experiment.toolbox import (
+    FileManager,
+    InputCache,
+    LocalFileOnDisk,
+    ProviderError,
+    StatCache,
+)
 
 logger.enable(PACKAGE_NAME)
 
@@ -273,3 +286,435 @@ class TestFileManager:
         ostring = f"{platform_value}:my_dir:DOMAIN:UNIT:2023:02:15:01:30:0002"
         test = fmanager.platform.substitute(istring)
         assert test == ostring
+
+    def test_substitution_in_turn(self, sfx_exp_config):
+        """Values substituted for one macro may contain macros substituted later."""
+        test_config = {
+            "general": {
+                "times": {
+                    "basetime": "2023-02-15T01:30:00Z",
+                    "validtime": "2023-02-15T03:30:00Z",
+                },
+            },
+            "platform": {"first": "@YYYY@", "second": "YYYY"},
+        }
+        config = sfx_exp_config.copy(update=test_config)
+        platform = FileManager(config).platform
+        istring = "@FIRST@-@MM@@DD@-@x@@second@@x@"
+        ostring = "2023-0215-@x2023x@"
+        assert platform.substitute(istring) == ostring
+        assert platform.substitute(istring) == ostring
+        assert platform.substitute("@yyyy@@mm@@MM@") == "20233002"
+        assert (
+            platform.substitute(
+                "@YYYY@@MM@@DD@@HH@+@LL@",
+                basetime=as_datetime("2023-02-16T00:00:00Z"),
+                validtime=as_datetime("2023-02-16T06:00:00Z"),
+            )
+            == "2023021600+06"
+        )
+
+    def test_substitute_many(self, sfx_exp_config):
+        """Test substitution for many times."""
+        platform = FileManager(sfx_exp_config).platform
+        basetimes = pd.date_range("2023-01-01", periods=10, freq="3H", tz="UTC")
+        validtimes = basetimes + pd.Timedelta(hours=6)
+        for pattern in [
+            "@ARCHIVE@/@YYYY@@MM@@DD@@HH@/ICMSH@CNMEXP@+@LLLL@_@HH_LL@",
+            "@BINDIR@/MASTERODB",
+            12,
+        ]:
+            expected = [
+                platform.substitute(pattern, basetime=basetime, validtime=validtime)
+                for basetime, validtime in zip(
+                    basetimes.to_pydatetime(), validtimes.to_pydatetime()
+                )
+            ]
+            assert platform.substitute_many(pattern, basetimes, validtimes) == expected
+        assert platform.substitute_many(
+            "@YYYY@@MM@@DD@@HH@+@LL@", ["2023-01-01T03:00:00Z"]
+        ) == ["2023010103+00"]
+        with pytest.raises(ValueError):
+            platform.substitute_many("@YYYY@", basetimes, validtimes[:2])
+
+    def test_input_output_many(self, sfx_exp_config, tmp_path):
+        """Test batch transfers."""
+        fmanager = FileManager(sfx_exp_config)
+        sources = []
+        for index in range(5):
+            source = tmp_path / f"source_{index}"
+            source.write_text(str(index))
+            sources.append(source.as_posix())
+        (tmp_path / "symlinks").mkdir()
+        (tmp_path / "symlinks/source_0").symlink_to(tmp_path / "dangling")
+        transfers = [
+            (source, f"{tmp_path}/symlinks/{os.path.basename(source)}")
+            for source in sources
+        ]
+        transfers.append((f"{tmp_path}/missing", f"{tmp_path}/symlinks/missing"))
+
+        statuses = fmanager.input_many(transfers, provider_id="symlink")
+        assert [status.success for status in statuses] == [True] * 5 + [False]
+        assert isinstance(statuses[-1].error, ProviderError)
+        for index, source in enumerate(sources):
+            assert os.readlink(f"{tmp_path}/symlinks/source_{index}") == source
+
+        statuses = fmanager.input_many(
+            [
+                {"target": source, "destination": f"{tmp_path}/copy_@YYYY@_{index}"}
+                for index, source in enumerate(sources)
+            ],
+            max_workers=2,
+            provider_id="copy",
+        )
+        assert all(status.success for status in statuses)
+        assert statuses[1].resource.identifier == f"{tmp_path}/copy_2000_1"
+        assert (tmp_path / "copy_2000_1").read_text() == "1"
+        assert not (tmp_path / "copy_2000_1").is_symlink()
+
+        (tmp_path / "moved").mkdir()
+        statuses = fmanager.output_many(
+            [(source, f"{tmp_path}/moved") for source in sources]
+        )
+        assert all(status.success for status in statuses)
+        assert not os.path.exists(sources[0])
+        assert (tmp_path / "moved/source_4").read_text() == "4"
+
+    def test_copy_methods(self, sfx_exp_config, tmp_path):
+        """Test the copy provider."""
+        platform = FileManager(sfx_exp_config).platform
+        source = tmp_path / "PGD.fa"
+        source.write_bytes(os.urandom(10000))
+        source.chmod(0o640)
+
+        provider = platform.get_provider("copy", str(source))
+        destination = LocalFileOnDisk(sfx_exp_config, f"{tmp_path}/copy")
+        assert provider.create_resource(destination)
+        assert provider.method in ["reflink", "copy_file_range", "stream"]
+        copy = tmp_path / "copy"
+        assert copy.read_bytes() == source.read_bytes()
+        assert copy.stat().st_mode == source.stat().st_mode
+        assert copy.stat().st_ino != source.stat().st_ino
+
+        provider = platform.get_provider("readonly_copy", str(source))
+        destination = LocalFileOnDisk(sfx_exp_config, f"{tmp_path}/readonly")
+        assert provider.create_resource(destination)
+        assert provider.method in ["reflink", "hardlink"]
+        assert (tmp_path / "readonly").read_bytes() == source.read_bytes()
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_input_cache(self, sfx_exp_config, tmp_path):
+        """Test the cache provider."""
+        cache_dir = tmp_path / "cache"
+        config = sfx_exp_config.copy(
+            update={
+                "general": {
+                    "input_cache": {
+                        "directory": cache_dir.as_posix(),
+                        "max_size": 25000,
+                        "lease": 0,
+                    }
+                }
+            }
+        )
+        fmanager = FileManager(config)
+        sources = []
+        for index in range(3):
+            source = tmp_path / f"soilgrid_{index}.tif"
+            source.write_bytes(os.urandom(10000))
+            sources.append(source)
+        duplicate = tmp_path / "duplicate.tif"
+        duplicate.write_bytes(sources[0].read_bytes())
+
+        provider, resource = fmanager.get_input(
+            sources[0].as_posix(), f"{tmp_path}/cycle1_0", provider_id="cache"
+        )
+        assert not provider.hit
+        assert provider.method in ["reflink", "hardlink"]
+        assert (tmp_path / "cycle1_0").read_bytes() == sources[0].read_bytes()
+        provider, resource = fmanager.get_input(
+            sources[0].as_posix(), f"{tmp_path}/cycle2_0", provider_id="cache"
+        )
+        assert provider.hit
+        provider, resource = fmanager.get_input(
+            duplicate.as_posix(), f"{tmp_path}/cycle2_duplicate", provider_id="cache"
+        )
+        assert not provider.hit
+        assert len(list((cache_dir / "objects").glob("*/*"))) == 1
+
+        # Concurrent requests for the same file fetch it once
+        statuses = fmanager.input_many(
+            [(sources[1].as_posix(), f"{tmp_path}/many_{index}") for index in range(4)],
+            provider_id="cache",
+        )
+        assert sorted(status.provider.hit for status in statuses) == [
+            False,
+            True,
+            True,
+            True,
+        ]
+
+        # The least recently used file is evicted
+        fmanager.input(sources[2].as_posix(), f"{tmp_path}/cycle3_2", provider_id="cache")
+        assert len(list((cache_dir / "objects").glob("*/*"))) == 2
+        provider, resource = fmanager.get_input(
+            sources[0].as_posix(), f"{tmp_path}/cycle3_0", provider_id="cache"
+        )
+        assert not provider.hit
+        # A file linked before it was evicted is still there
+        assert (tmp_path / "cycle1_0").read_bytes() == sources[0].read_bytes()
+
+        # Changed files are fetched again
+        sources[2].write_bytes(os.urandom(10000))
+        provider, resource = fmanager.get_input(
+            sources[2].as_posix(), f"{tmp_path}/cycle4_2", provider_id="cache"
+        )
+        assert not provider.hit
+        assert (tmp_path / "cycle4_2").read_bytes() == sources[2].read_bytes()
+
+    def test_input_cache_lease(self, tmp_path):
+        """Test that files used within the lease are not evicted."""
+        cache = InputCache(tmp_path / "cache", max_size=25000, lease=3600)
+        sources = []
+        for index in range(3):
+            source = tmp_path / f"soilgrid_{index}.tif"
+            source.write_bytes(os.urandom(10000))
+            sources.append(source.as_posix())
+            cache.get(source.as_posix())
+        assert all(cache.lookup(source) is not None for source in sources)
+
+        # The first file is no longer leased
+        cached = cache.lookup(sources[0])
+        os.utime(cached, (time.time() - 7200, time.time() - 7200))
+        cache.evict()
+        assert cache.lookup(sources[0]) is None
+        assert cache.lookup(sources[1]) is not None
+
+    def test_input_cache_disabled(self, sfx_exp_config, tmp_path):
+        """Test that the cache provider copies the file without a cache directory."""
+        config = sfx_exp_config.copy(
+            update={"general": {"input_cache": {"directory": ""}}}
+        )
+        assert InputCache.from_config(config) is None
+        source = tmp_path / "soilgrid.tif"
+        source.write_bytes(os.urandom(1000))
+        provider, resource = FileManager(config).get_input(
+            source.as_posix(), f"{tmp_path}/cycle1", provider_id="cache"
+        )
+        assert not provider.hit
+        assert (tmp_path / "cycle1").read_bytes() == source.read_bytes()
+
+    def test_archive_queue(self, sfx_exp_config, tmp_path):
+        """Test archiving through the archive queue."""
+        config = sfx_exp_config.copy(
+            update={
+                "general": {
+                    "archive": {
+                        "backend": "directory",
+                        "directory": f"{tmp_path}/ecfs",
+                        "queue": f"{tmp_path}/queue",
+                    }
+                }
+            }
+        )
+        fmanager = FileManager(config)
+        output = tmp_path / "ICMSHUNIT+0024"
+        output.write_bytes(os.urandom(1000))
+        content = output.read_bytes()
+        os.makedirs(fmanager.platform.substitute("@ARCHIVE@"), exist_ok=True)
+        provider, aprovider, resource = fmanager.get_output(
+            output.as_posix(), "@ARCHIVE@/OUT_ICMSH@CNMEXP@+@LLLL@", archive=True
+        )
+        # Queued, not archived yet
+        assert len(aprovider.queue.pending()) == 1
+        assert not (tmp_path / "ecfs").exists()
+
+        assert fmanager.drain_archive() == {"archived": 1, "failed": 0}
+        archived = tmp_path / "ecfs/ectmp/2000/01/01/00/OUT_ICMSHUNIT+0024"
+        assert archived.read_bytes() == content
+        assert not aprovider.queue.pending()
+
+        # Fetch from the archive
+        os.remove(provider.identifier)
+        provider, resource = fmanager.get_input(
+            "@ARCHIVE@/OUT_ICMSH@CNMEXP@+@LLLL@",
+            f"{tmp_path}/fetched",
+            check_archive=True,
+        )
+        assert (tmp_path / "fetched").read_bytes() == content
+
+    def test_archive_queue_retries(self, tmp_path):
+        """Test retries and failures when draining the archive queue."""
+
+        class FlakyArchive(DirectoryArchive):
+            def __init__(self, directory):
+                DirectoryArchive.__init__(self, directory)
+                self.calls = 0
+
+            def checksum(self, remote):
+                self.calls += 1
+                if self.calls == 1:
+                    return "corrupted"
+                return DirectoryArchive.checksum(self, remote)
+
+        queue = ArchiveQueue(tmp_path / "queue")
+        local_file = tmp_path / "SURFOUT.nc"
+        local_file.write_bytes(b"surfout")
+        queue.put(local_file.as_posix(), "ectmp:/SURFOUT.nc")
+        queue.put(f"{tmp_path}/missing.nc", "ectmp:/missing.nc")
+
+        backend = FlakyArchive(tmp_path / "ecfs")
+        summary = queue.drain(backend, max_workers=2, max_attempts=2, retry_delay=0.01)
+        assert summary == {"archived": 1, "failed": 1}
+        assert backend.calls == 2
+        assert (tmp_path / "ecfs/ectmp/SURFOUT.nc").read_bytes() == b"surfout"
+        assert len(queue.failed()) == 1
+        assert not queue.pending()
+
+    def test_archive_queue_changed_file(self, tmp_path):
+        """Test that a file changed after it was queued is not archived."""
+        queue = ArchiveQueue(tmp_path / "queue")
+        local_file = tmp_path / "SURFOUT.nc"
+        local_file.write_bytes(b"surfout")
+        queue.put(local_file.as_posix(), "ectmp:/SURFOUT.nc")
+        local_file.write_bytes(b"SURFOUT")
+        # Both writes may fall within one tick of the file system clock
+        stat = local_file.stat()
+        os.utime(local_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        backend = DirectoryArchive(tmp_path / "ecfs")
+        summary = queue.drain(backend, max_attempts=3, retry_delay=0.01)
+        assert summary == {"archived": 0, "failed": 1}
+        assert not (tmp_path / "ecfs/ectmp/SURFOUT.nc").exists()
+        with open(queue.failed()[0], mode="r", encoding="utf-8") as fhandler:
+            entry = json.load(fhandler)
+        assert entry["attempts"] == 1
+        assert "changed since it was queued" in entry["error"]
+
+    def test_stat_cache_unlisted_directory(self, tmp_path, monkeypatch):
+        """Test checks in a directory that can be traversed but not listed."""
+        (tmp_path / "PGD.nc").write_bytes(b"pgd")
+
+        def scandir(path):
+            raise PermissionError(f"Permission denied: '{path}'")
+
+        monkeypatch.setattr("experiment.toolbox.os.scandir", scandir)
+        stat_cache = StatCache()
+        assert stat_cache.exists(f"{tmp_path}/PGD.nc")
+        assert not stat_cache.exists(f"{tmp_path}/SURFOUT.nc")
+        assert stat_cache.getsize(f"{tmp_path}/PGD.nc") == 3
+        assert stat_cache.counts == {"checks": 3, "scandir": 1, "stat": 3}
+
+    def test_stat_cache(self, sfx_exp_config, tmp_path):
+        """Test the cached existence checks."""
+        fmanager = FileManager(sfx_exp_config)
+        for index in range(10):
+            (tmp_path / f"PGD_{index}.nc").write_bytes(b"0" * index)
+        (tmp_path / "broken").symlink_to(tmp_path / "missing")
+
+        assert all(fmanager.exists(f"{tmp_path}/PGD_{index}.nc") for index in range(10))
+        assert fmanager.getsize(f"{tmp_path}/PGD_3.nc") == 3
+        assert not fmanager.exists(f"{tmp_path}/PGD_10.nc")
+        assert not fmanager.exists(f"{tmp_path}/broken")
+        assert not fmanager.exists(f"{tmp_path}/missing_dir/PGD_0.nc")
+        assert fmanager.exists("/")
+        with pytest.raises(FileNotFoundError):
+            fmanager.getsize(f"{tmp_path}/broken")
+        assert fmanager.stat_cache.counts == {"checks": 15, "scandir": 2, "stat": 2}
+        assert fmanager.stat_cache.stat_calls_avoided == 11
+
+        # Changes by others are seen after a refresh
+        (tmp_path / "PGD_10.nc").touch()
+        assert not fmanager.exists(f"{tmp_path}/PGD_10.nc")
+        fmanager.refresh(f"{tmp_path}/PGD_10.nc")
+        assert fmanager.exists(f"{tmp_path}/PGD_10.nc")
+
+        # Own transfers invalidate the listings
+        fmanager.input(f"{tmp_path}/PGD_1.nc", f"{tmp_path}/PGD_linked.nc")
+        assert fmanager.exists(f"{tmp_path}/PGD_linked.nc")
+        assert fmanager.getsize(f"{tmp_path}/PGD_linked.nc") == 1
+
+    def test_prefetch(self, sfx_exp_config, tmp_path):
+        """Test prefetching of the forcing of the next cycle."""
+        forcing_dir = tmp_path / "forcing"
+        forcing_dir.mkdir()
+        basetime = as_datetime("2023-01-01T03:00:00Z")
+        for hour in range(3, 7):
+            (forcing_dir / f"analysis_20230101T{hour:02d}Z.nc").write_bytes(
+                os.urandom(1000)
+            )
+        config = sfx_exp_config.copy(
+            update={
+                "general": {"input_cache": {"directory": f"{tmp_path}/cache"}},
+                "forcing": {
+                    "pattern": f"{forcing_dir}/analysis_@YYYY@@MM@@DD@T@HH@Z.nc",
+                    "timestep": 3600,
+                },
+            }
+        )
+        fmanager = FileManager(config)
+        fcint = pd.Timedelta("3H").to_pytimedelta()
+        sources = forcing_inputs(config, fmanager.platform, basetime, fcint)
+        assert len(sources) == 4
+
+        # Not all files are cached
+        local_dir = f"{tmp_path}/local"
+        pattern = config.get_value("forcing.pattern")
+        assert fmanager.prefetch(sources[:2]) == {"fetched": 2, "cached": 0, "skipped": 0}
+        assert localized_forcing_pattern(fmanager, basetime, fcint, local_dir) == pattern
+
+        summary = fmanager.prefetch(
+            sources + [f"{tmp_path}/missing.nc", "https://thredds.met.no/data.nc"]
+        )
+        assert summary == {"fetched": 2, "cached": 2, "skipped": 2}
+        localized = localized_forcing_pattern(fmanager, basetime, fcint, local_dir)
+        assert localized == local_dir + pattern
+        for source in sources:
+            assert Path(local_dir + source).read_bytes() == Path(source).read_bytes()
+
+    def test_transfer_metrics(self, sfx_exp_config, tmp_path):
+        """Test the metrics of the transfers of a task."""
+        config = sfx_exp_config.copy(
+            update={
+                "general": {"input_cache": {"directory": f"{tmp_path}/cache"}},
+                "system": {"joboutdir": f"{tmp_path}/job"},
+            }
+        )
+        fmanager = FileManager(config, task="Forcing")
+        source = tmp_path / "PGD.nc"
+        source.write_bytes(os.urandom(1000))
+        fmanager.input(source.as_posix(), f"{tmp_path}/copy.nc", provider_id="copy")
+        fmanager.input(source.as_posix(), f"{tmp_path}/cached1.nc", provider_id="cache")
+        fmanager.input(source.as_posix(), f"{tmp_path}/cached2.nc", provider_id="cache")
+        with pytest.raises(ProviderError):
+            fmanager.input(f"{tmp_path}/missing.nc", f"{tmp_path}/missing.nc")
+
+        metrics_file = tmp_path / "job/metrics/2000010100/Forcing.jsonl"
+        assert fmanager.metrics.path == metrics_file
+        records = list(read_metrics([tmp_path / "job/metrics"]))
+        assert [record["provider"] for record in records] == [
+            "LocalFileSystemCopy",
+            "LocalFileCache",
+            "LocalFileCache",
+        ]
+        assert [record["hit"] for record in records] == [None, False, True]
+        assert all(record["bytes"] == 1000 for record in records)
+        assert all(record["task"] == "Forcing" for record in records)
+
+        summaries = aggregate_metrics(records, by="provider")
+        assert summaries["LocalFileCache"]["transfers"] == 2
+        assert summaries["LocalFileCache"]["hits"] == 1
+        assert summaries["LocalFileCache"]["misses"] == 1
+        assert fmanager.metrics.totals["bytes"] == 3000
+
+        output = tmp_path / "summary.json"
+        with pytest.raises(SystemExit):
+            transfer_metrics(paths=[])
+        transfer_metrics(
+            paths=[metrics_file.as_posix()],
+            basetime="2000-01-01T00:00:00Z",
+            by="task",
+            output=output.as_posix(),
+        )
+        with open(output, mode="r", encoding="utf-8") as fhandler:
+            assert json.load(fhandler)["Forcing"]["transfers"] == 3
@@ -7,13 +7,22 @@ import pytest
 
 from experiment import PACKAGE_NAME
 from experiment.config_parser import ParsedConfig
-from experiment.datetime_utils import as_datetime
+from experiment.cycles import CycleCalendar
+from experiment.datetime_utils import as_datetime, datetime2ecflow
 from experiment.experiment import ExpFromFiles
 from experiment.logs import logger
+from experiment.scheduler.dag import EXTERN, local_plan, trigger_string
 from experiment.scheduler.scheduler import EcflowServer, EcflowTask
 from experiment.scheduler.submission import TaskSettings
 from experiment.scheduler.suites import EcflowSuite, EcflowSuiteFamily, EcflowSuiteTask
-from experiment.suites import SurfexSuite
+from experiment.suites import (
+    CycleNodes,
+    SurfexSuite,
+    advance_window,
+    chunk_dtgs,
+    family_dtgs,
+    stitch_defs,
+)
 
 TESTDATA = f"{str((Path(__file__).parent).parent)}/testdata"
 ROOT = f"{str((Path(__file__).parent).parent)}"
@@ -175,7 +184,7 @@ class TestFlow:
         dtg2 = as_datetime("2022-01-01 T06:00:00Z")
         dtgs = [dtg1, dtg2]
         dtgbeg = dtg1
-        SurfexSuite(
+        suite = SurfexSuite(
             suite_name,
             config,
             joboutdir,
@@ -184,3 +193,180 @@ class TestFlow:
             dtgbeg=dtgbeg,
             ecf_micro="%",
         )
+
+        paths = {suite.dag.path(node_id): node_id for node_id in range(len(suite.dag))}
+        initialization = paths["/suite/202201010600/Initialization"]
+        assert (
+            paths["/suite/202201010300/Prediction"] in suite.dag.upstream[initialization]
+        )
+        plan = [task.path for task in local_plan(suite.dag)]
+        assert plan.index("/suite/StaticData/Pgd") < plan.index(
+            "/suite/202201010300/Initialization/Prep"
+        )
+        assert plan.index("/suite/202201010300/Prediction/Forecast") < plan.index(
+            "/suite/202201010600/Prediction/Forecast"
+        )
+
+    @pytest.mark.usefixtures("_mockers_for_ecflow")
+    def test_rolling_sufex_suite(self, tmp_path_factory, get_exp_from_files):
+        joboutdir = f"{tmp_path_factory.getbasetemp().as_posix()}"
+        config = get_exp_from_files
+        task_settings = TaskSettings(config)
+        dtgs = [as_datetime(f"2022-01-01 T{hour:02d}:00:00Z") for hour in (3, 6, 9)]
+        suite = SurfexSuite(
+            "suite",
+            config,
+            joboutdir,
+            task_settings,
+            dtgs[2:],
+            dtgbeg=dtgs[0],
+            context=dtgs[:2],
+        )
+        externs = [suite.dag.path(node_id) for node_id in suite.dag.externs()]
+        assert "/suite/202201010600/Prediction" in externs
+        assert "/suite/202201010300/PostProcessing" in externs
+
+    @pytest.mark.usefixtures("_mockers_for_ecflow")
+    def test_rolling_sufex_suite_advance_window(
+        self, tmp_path_factory, get_exp_from_files
+    ):
+        joboutdir = f"{tmp_path_factory.getbasetemp().as_posix()}"
+        config = get_exp_from_files
+        task_settings = TaskSettings(config)
+        dtgs = [as_datetime(f"2022-01-01 T{hour:02d}:00:00Z") for hour in (3, 6, 9)]
+        suite = SurfexSuite(
+            "suite",
+            config,
+            joboutdir,
+            task_settings,
+            dtgs[1:],
+            dtgbeg=dtgs[0],
+            context=dtgs[:1],
+            rolling=True,
+        )
+        paths = {suite.dag.path(node_id): node_id for node_id in range(len(suite.dag))}
+        # The AdvanceWindow tasks run one at a time
+        for previous, dtg in zip(dtgs[:-1], dtgs[1:]):
+            advance_window = paths[f"/suite/{datetime2ecflow(dtg)}/AdvanceWindow"]
+            upstream = paths[f"/suite/{datetime2ecflow(previous)}/AdvanceWindow"]
+            assert upstream in suite.dag.upstream[advance_window]
+        externs = [suite.dag.path(node_id) for node_id in suite.dag.externs()]
+        assert "/suite/202201010300/AdvanceWindow" in externs
+
+
+def test_cycle_nodes():
+    nodes = CycleNodes()
+    dtgs = [
+        as_datetime(f"2022-01-0{day}T{hour:02d}:00:00Z")
+        for day in (1, 2)
+        for hour in (0, 12)
+    ]
+    nodes.add(dtgs[0], "node0")
+    nodes.add(dtgs[2], "node2")
+    nodes.add(dtgs[1], "node1")
+    assert nodes.dtgs == dtgs[:3]
+    assert dtgs[1] in nodes and dtgs[3] not in nodes
+    assert nodes[dtgs[1]] == "node1"
+    assert nodes.get(dtgs[3]) is None
+    assert nodes.at_or_before(dtgs[3]) == "node2"
+    assert nodes.at_or_before(as_datetime("2022-01-01T11:00:00Z")) == "node0"
+    assert nodes.at_or_before(as_datetime("2021-12-31T00:00:00Z")) is None
+
+
+def test_advance_window():
+    calendar = CycleCalendar(
+        "2022-01-01T00:00:00Z", "2022-01-03T00:00:00Z", [0, 6, 12, 18]
+    )
+    dtgs = calendar.basetimes()
+    families = {"Compilation": "complete", "StaticData": "complete"}
+    for dtg in dtgs[:8]:
+        families[dtg.strftime("%Y%m%d%H%M")] = "complete"
+    families["202201020000"] = "active"
+    assert family_dtgs(families)["202201011200"] == dtgs[2]
+
+    # Cycle 2022-01-02 06 completed. 2022-01-02 00 is still post processing.
+    add_dtgs, retire = advance_window(calendar, dtgs[5], families, 3, 2)
+    assert add_dtgs == dtgs[8:]
+    # Keep the cycles within a day, a later cycle can trigger on them
+    assert retire == ["202201010000"]
+    add_dtgs, retire = advance_window(calendar, dtgs[7], families, 3, 2)
+    assert add_dtgs == dtgs[8:]
+    assert retire == ["202201010000", "202201010600", "202201011200"]
+    add_dtgs, retire = advance_window(calendar, dtgs[7], families, 3, 8)
+    assert retire == []
+
+
+def test_chunk_dtgs():
+    calendar = CycleCalendar("2022-01-01T00:00:00Z", "2022-01-10T00:00:00Z", [0, 12])
+    dtgs = calendar.basetimes()
+    chunks = chunk_dtgs(dtgs, 8, dtgbeg=dtgs[0])
+    assert [chunk for chunk, __ in chunks] == [dtgs[0:8], dtgs[8:16], dtgs[16:]]
+    assert chunks[0][1] == []
+    # Two days back and the first cycle with Prep
+    assert chunks[1][1] == [dtgs[0]] + dtgs[4:8]
+    assert chunks[2][1] == [dtgs[0]] + dtgs[12:16]
+
+
+def test_stitch_defs():
+    def suite_text(dtgs, externs):
+        lines = ["#5.11.4"]
+        lines += [f"extern /suite/{extern}/Prediction" for extern in externs]
+        lines += ["suite suite", "  edit EXP 'test'", "  family StaticData"]
+        lines += ["    task Pgd", "  endfamily"]
+        for dtg in dtgs:
+            lines += [f"  family {dtg}", "    family Prediction", "      task Forecast"]
+            lines += ["    endfamily", "  endfamily"]
+        lines += ["endsuite", "# enddef"]
+        return "\n".join(lines) + "\n"
+
+    def_text = stitch_defs(
+        [
+            suite_text(["202201010000", "202201010600"], []),
+            suite_text(["202201011200"], ["202201010600"]),
+            suite_text(["202201011800"], ["202201010600", "202201011200"]),
+        ]
+    )
+    assert def_text == suite_text(
+        ["202201010000", "202201010600", "202201011200", "202201011800"], []
+    )
+
+
+def dag_triggers(dag):
+    """Return the trigger strings of the nodes of a graph by path."""
+    triggers = {}
+    for node in dag.nodes:
+        if node.kind != EXTERN:
+            trigger = node.trigger
+            if trigger is not None:
+                trigger = trigger_string(dag, trigger)
+            triggers[dag.path(node.node_id)] = trigger
+    return triggers
+
+
+@pytest.mark.usefixtures("_mockers_for_ecflow")
+def test_chunked_suite_triggers(tmp_path, get_exp_from_files):
+    config = get_exp_from_files
+    task_settings = TaskSettings(config)
+    dtgs = CycleCalendar(
+        "2022-01-01T00:00:00Z", "2022-01-05T21:00:00Z", [0, 3, 6, 9, 12, 15, 18, 21]
+    ).basetimes()
+    serial = SurfexSuite(
+        "suite", config, tmp_path.as_posix(), task_settings, dtgs, dtgbeg=dtgs[0]
+    )
+    expected = dag_triggers(serial.dag)
+
+    # The cycles built in chunks trigger on the same nodes as in one suite
+    chunked = {}
+    for chunk, context in chunk_dtgs(dtgs, 10, dtgbeg=dtgs[0]):
+        suite = SurfexSuite(
+            "suite",
+            config,
+            tmp_path.as_posix(),
+            task_settings,
+            chunk,
+            dtgbeg=dtgs[0],
+            context=context,
+        )
+        for path, trigger in dag_triggers(suite.dag).items():
+            assert chunked.setdefault(path, trigger) == trigger
+    assert chunked == expected
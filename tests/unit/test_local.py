@@ -0,0 +1,96 @@
+"""Unit tests for running a suite in local processes."""
+import os
+import sys
+
+import pytest
+
+from experiment.scheduler.dag import FAMILY, SUITE, TASK, SuiteDag
+from experiment.scheduler.local import LocalCheckpoint, LocalExecutor
+
+
+def touch_runner(config, name, variables):
+    """Record the task in a file, and fail if it was run before."""
+    if name in variables["FAIL"].split(","):
+        raise RuntimeError(f"Task {name} failed")
+    if name in variables["EXIT"].split(","):
+        sys.exit(1)
+    with open(f"{variables['OUT']}/{name}", mode="x", encoding="utf-8") as fhandler:
+        fhandler.write(str(os.getpid()))
+
+
+@pytest.fixture()
+def dag(tmp_path):
+    dag = SuiteDag()
+    suite = dag.add_node("suite", SUITE, variables={"DTG": "202201010000"})
+    for cycle in range(2):
+        family = dag.add_node(f"cycle{cycle}", FAMILY, parent=suite)
+        for name in ["forcing", "forecast"]:
+            dag.add_node(f"{name}{cycle}", TASK, parent=family)
+        forcing, forecast = dag.children[family]
+        dag.add_trigger(forecast, ("AND", ((forcing, "complete"),)))
+    # The forecast of the second cycle waits for the first cycle
+    dag.add_trigger(6, ("AND", ((1, "complete"),)))
+    return dag
+
+
+def run(dag, tmp_path, fail="", exit_tasks="", **kwargs):
+    dag.add_variable(0, "OUT", tmp_path.as_posix())
+    dag.add_variable(0, "FAIL", fail)
+    dag.add_variable(0, "EXIT", exit_tasks)
+    checkpoint = LocalCheckpoint((tmp_path / "checkpoint" / "run.sqlite").as_posix())
+    executor = LocalExecutor(dag, None, checkpoint, runner=touch_runner, **kwargs)
+    return executor.run(), checkpoint.states()
+
+
+def test_checkpoint(tmp_path):
+    path = (tmp_path / "run.sqlite").as_posix()
+    checkpoint = LocalCheckpoint(path)
+    checkpoint.set_state("/suite/task", "active")
+    checkpoint.set_state("/suite/task", "complete")
+    checkpoint.close()
+    assert LocalCheckpoint(path).states() == {"/suite/task": "complete"}
+
+
+def test_local_executor(dag, tmp_path):
+    completed, states = run(dag, tmp_path, max_workers=2, limits={"forecast0": 1})
+    assert completed
+    assert set(states.values()) == {"complete"}
+    assert sorted(os.listdir(tmp_path)) == [
+        "checkpoint",
+        "forcing0",
+        "forcing1",
+        "forecast0",
+        "forecast1",
+    ]
+
+    # Each task runs in a process of its own
+    pids = set()
+    for name in ["forcing0", "forcing1", "forecast0", "forecast1"]:
+        with open(tmp_path / name, mode="r", encoding="utf-8") as fhandler:
+            pids.add(fhandler.read())
+    assert len(pids) == 4 and str(os.getpid()) not in pids
+
+
+def test_local_executor_resume(dag, tmp_path):
+    completed, states = run(dag, tmp_path, fail="forecast0", max_workers=2)
+    assert not completed
+    assert states["/suite/cycle0/forecast0"] == "aborted"
+    assert states["/suite/cycle1/forcing1"] == "complete"
+    assert "/suite/cycle1/forecast1" not in states
+
+    # The completed tasks are not run again, or they would fail
+    completed, states = run(dag, tmp_path, max_workers=2)
+    assert completed
+    assert os.path.exists(tmp_path / "forecast1")
+
+
+def test_local_executor_limits(dag, tmp_path):
+    with pytest.raises(ValueError):
+        run(dag, tmp_path, limits={"forecast0": 0})
+
+
+def test_local_executor_exit(dag, tmp_path):
+    completed, states = run(dag, tmp_path, exit_tasks="forcing0", max_workers=2)
+    assert not completed
+    assert states["/suite/cycle0/forcing0"] == "aborted"
+    assert states["/suite/cycle1/forcing1"] == "complete"
@@ -1,7 +1,13 @@
 """Test setup of an experiment and merging of input."""
+import json
+import os
 from pathlib import Path
 
+import pysurfex
+
+from experiment.cli import update_config
 from experiment.experiment import ExpFromFiles
+from experiment.setup.batch import ExperimentBatch, read_overrides
 
 TESTDATA = f"{str((Path(__file__).parent).parent)}/testdata"
 ROOT = f"{str((Path(__file__).parent).parent)}"
@@ -40,3 +46,81 @@ def test_merge():
     }
     dict_n3 = ExpFromFiles.merge_dict(dict1, dict2)
     assert dict3 == dict_n3
+
+
+def test_incremental_setup(tmp_path):
+    """Test that a new setup only rewrites outdated config files."""
+    wdir = f"{tmp_path}/exp"
+    pysurfex_path = f"{str((Path(pysurfex.__file__).parent).parent)}"
+
+    def setup(configuration=None):
+        exp_dependencies = ExpFromFiles.setup_files(
+            wdir, "exp", "ECMWF-atos", pysurfex_path, ROOT + "/.."
+        )
+        written = ExpFromFiles.write_exp_config(
+            exp_dependencies, configuration=configuration, incremental=True
+        )
+        return exp_dependencies, set(written)
+
+    written = setup()[1]
+    assert "config_exp.toml" in written and "config_exp_surfex.toml" in written
+    assert os.path.exists(f"{wdir}/config/.setup_manifest.json")
+
+    # Nothing changed
+    assert setup()[1] == set()
+
+    # Changed input file and changed settings
+    eps_file = f"{wdir}/config/config_exp_eps.toml"
+    with open(eps_file, mode="a", encoding="utf-8") as fhandler:
+        fhandler.write("\n# Modified\n")
+    assert setup()[1] == {"config_exp_eps.toml"}
+    assert setup(configuration="sekf")[1] == {"config_exp.toml", "config_exp_surfex.toml"}
+    exp_dependencies, written = setup(configuration="sekf")
+    assert written == set()
+
+    # The json configuration is only updated if an input changed
+    ExpFromFiles.dump_exp_dependencies(exp_dependencies, f"{wdir}/exp_dependencies.json")
+    update_config(wd=wdir)
+    config_file = f"{wdir}/exp_configuration.json"
+    mtime = os.stat(config_file).st_mtime_ns
+    update_config(wd=wdir)
+    assert os.stat(config_file).st_mtime_ns == mtime
+    with open(f"{wdir}/config/config_exp.toml", mode="a", encoding="utf-8") as fhandler:
+        fhandler.write("\n# Modified\n")
+    update_config(wd=wdir)
+    assert os.stat(config_file).st_mtime_ns != mtime
+
+
+def test_batch_setup(tmp_path):
+    """Test setting up a batch of experiments from a table of overrides."""
+    overrides_file = tmp_path / "sweep.csv"
+    overrides_file.write_text(
+        "name,SURFEX.ISBA.SCHEME,forcing.timestep\n" "base,,\n" 'dif,"DIF",1800\n'
+    )
+    experiments = read_overrides(overrides_file.as_posix())
+    assert experiments == {
+        "base": {},
+        "dif": {"SURFEX": {"ISBA": {"SCHEME": "DIF"}}, "forcing": {"timestep": 1800}},
+    }
+
+    pysurfex_path = f"{str((Path(pysurfex.__file__).parent).parent)}"
+    batch = ExperimentBatch.from_host("ECMWF-atos", pysurfex_path, ROOT + "/..")
+    config_files = batch.write(f"{tmp_path}/sweep", experiments, max_workers=2)
+    assert set(config_files) == {"base", "dif"}
+
+    configs = {}
+    for exp_name, config_file in config_files.items():
+        with open(config_file, mode="r", encoding="utf-8") as fhandler:
+            configs[exp_name] = json.load(fhandler)
+        exp_dir = f"{tmp_path}/sweep/{exp_name}"
+        assert configs[exp_name]["general"]["case"] == exp_name
+        assert configs[exp_name]["domain"]["nimax"] > 0
+        exp_dependencies_file = f"{exp_dir}/exp_dependencies.json"
+        with open(exp_dependencies_file, mode="r", encoding="utf-8") as fhandler:
+            exp_dependencies = json.load(fhandler)
+        assert exp_dependencies["exp_dir"] == exp_dir
+        for fname in exp_dependencies["config"]["config_files"].values():
+            assert fname.startswith(exp_dir) and os.path.exists(fname)
+    assert configs["base"]["SURFEX"]["ISBA"]["SCHEME"] == "3-L"
+    assert configs["dif"]["SURFEX"]["ISBA"]["SCHEME"] == "DIF"
+    assert configs["dif"]["forcing"]["timestep"] == 1800
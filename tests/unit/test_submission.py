@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 """Unit tests for the config file parsing module."""
+import os
 from pathlib import Path
 
 import pysurfex
@@ -12,6 +13,9 @@ from experiment.logs import logger
 from experiment.scheduler.submission import NoSchedulerSubmission, TaskSettings
 from experiment.system import System
 
+# Other tests mock parse_job for the whole session
+PARSE_JOB = TaskSettings.parse_job
+
 logger.enable(PACKAGE_NAME)
 
 
@@ -217,3 +221,65 @@ class TestSubmission:
         sub = NoSchedulerSubmission(background)
         with pytest.raises(Exception, match="Task not found:"):
             sub.submit(task, config, template_job, task_job, output)
+
+    def test_shared_job(self, config, tmp_path, mocker):
+        parse_job = mocker.patch.object(TaskSettings, "parse_job")
+        ecf_files = tmp_path.as_posix()
+        pysurfex_experiment = config.get_value("system.pysurfex_experiment")
+        template = f"{pysurfex_experiment}/experiment/templates/ecflow/default.py"
+        task_settings = TaskSettings(config)
+        job_dirs = {}
+        for task in ["Forcing", "Forecast"] * 10:
+            variables = task_settings.get_settings(task)
+            job_dir = task_settings.shared_job(
+                task, config, template, ecf_files, variables=variables
+            )
+            assert job_dirs.setdefault(task, job_dir) == job_dir
+            assert job_dir.startswith(f"{ecf_files}/containers/")
+
+        task_jobs = [call.args[3] for call in parse_job.call_args_list]
+        assert task_jobs == [
+            f"{job_dirs['Forcing']}/Forcing.py",
+            f"{job_dirs['Forecast']}/Forecast.py",
+        ]
+
+        # Other batch settings give another container
+        update = {
+            "submission": {
+                "submit_types": ["unittest"],
+                "default_submit_type": "unittest",
+                "unittest": {"BATCH": {"TEST": "#SBATCH UNITTEST"}},
+            }
+        }
+        job_dir = TaskSettings(config.copy(update=update)).shared_job(
+            "Forcing",
+            config,
+            template,
+            ecf_files,
+            variables=task_settings.get_settings("Forcing"),
+        )
+        assert job_dir != job_dirs["Forcing"]
+
+    def test_shared_job_exists(self, config, tmp_path, mocker):
+        mocker.patch.object(TaskSettings, "parse_job", PARSE_JOB)
+        ecf_files = tmp_path.as_posix()
+        pysurfex_experiment = config.get_value("system.pysurfex_experiment")
+        template = f"{pysurfex_experiment}/experiment/templates/ecflow/default.py"
+        variables = TaskSettings(config).get_settings("Forcing")
+        job_dir = TaskSettings(config).shared_job(
+            "Forcing", config, template, ecf_files, variables=variables
+        )
+        assert os.listdir(job_dir) == ["Forcing.py"]
+        assert os.access(f"{job_dir}/Forcing.py", os.X_OK)
+
+        # The container of a suite built earlier is not rewritten
+        with open(f"{job_dir}/Forcing.py", mode="a", encoding="utf-8") as fhandler:
+            fhandler.write("# In use\n")
+        assert (
+            TaskSettings(config).shared_job(
+                "Forcing", config, template, ecf_files, variables=variables
+            )
+            == job_dir
+        )
+        with open(f"{job_dir}/Forcing.py", mode="r", encoding="utf-8") as fhandler:
+            assert fhandler.read().endswith("# In use\n")